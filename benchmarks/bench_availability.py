@@ -0,0 +1,98 @@
+"""Parking throughput while dashboards poll availability.
+
+Writer threads park and return cars as fast as they can while reader
+threads poll the free slots at a fixed rate, either through
+`available_slots()` (which collects expired holds and copies the slot
+counts) or through the published `availability()` snapshot. Tickets live
+in memory, so the numbers show the parking path itself.
+
+Run with:
+    python -m benchmarks.bench_availability [--readers 4] [--rate 1000]
+"""
+
+import argparse
+import threading
+import time
+
+from benchmarks.suite import summarize
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_columns import TicketColumnStore
+
+READ_PATHS = {
+    "none": None,
+    "available_slots": lambda parking: parking.available_slots(),
+    "snapshot": lambda parking: parking.availability(),
+}
+
+
+def run(
+    read_path: str, writers: int, readers: int, rate: float, seconds: float
+) -> tuple[dict[str, float], dict[str, float]]:
+    """Returns the write (park+return) and read latency summaries."""
+    parking = CarParking(
+        get_parking_slots(1000, 1000, 1000, concurrent=True), TicketColumnStore()
+    )
+    read = READ_PATHS[read_path]
+    stop = threading.Event()
+    write_latencies: list[list[float]] = [[] for _ in range(writers)]
+    read_latencies: list[list[float]] = [[] for _ in range(readers)]
+
+    def write(index: int) -> None:
+        car_size = list(Size)[index % len(Size)]
+        latencies = write_latencies[index]
+        while not stop.is_set():
+            began = time.perf_counter()
+            ticket_id, _ = parking.park_car(car_size)
+            parking.return_car(ticket_id)
+            latencies.append(time.perf_counter() - began)
+
+    def poll(index: int) -> None:
+        latencies = read_latencies[index]
+        next_read = time.perf_counter()
+        while not stop.is_set():
+            began = time.perf_counter()
+            read(parking)
+            latencies.append(time.perf_counter() - began)
+            next_read += 1 / rate
+            delay = next_read - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    if read is not None:
+        threads += [threading.Thread(target=poll, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    writes = summarize([t for ts in write_latencies for t in ts], seconds)
+    reads = [t for ts in read_latencies for t in ts]
+    return writes, summarize(reads, seconds) if reads else {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1000, help="reads/s per reader")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'reads via':<16} {'cycles/s':>9} {'write p99 µs':>13}"
+        f" {'reads/s':>8} {'read p50 µs':>12} {'read p99 µs':>12}"
+    )
+    for read_path in READ_PATHS:
+        writes, reads = run(read_path, args.writers, args.readers, args.rate, args.seconds)
+        print(
+            f"{read_path:<16} {writes['ops_per_s']:>9.0f} {writes['p99_us']:>13.1f}"
+            f" {reads.get('ops_per_s', 0):>8.0f} {reads.get('p50_us', 0):>12.2f}"
+            f" {reads.get('p99_us', 0):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Throughput of CarParking under a thread pool of valet terminals.
+
+Run with: python -m benchmarks.bench_concurrency [--threads 1 2 4 8]
+"""
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.exceptions import CarSizeError
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJournalFileStorage
+
+
+def run(threads: int, operations: int, slots_per_size: int) -> float:
+    """Returns park+return cycles per second for the given thread count."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = TicketJournalFileStorage(Path(tmp) / "tickets.jsonl")
+        slots = get_parking_slots(
+            slots_per_size, slots_per_size, slots_per_size, concurrent=True
+        )
+        parking = CarParking(slots, storage)
+        sizes = list(Size)
+
+        def terminal(index: int) -> None:
+            car_size = sizes[index % len(sizes)]
+            for _ in range(operations // threads):
+                try:
+                    ticket_id, slot_name = parking.park_car(car_size)
+                except CarSizeError:
+                    continue
+                parking.return_car(ticket_id, Size[slot_name])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(terminal, range(threads)))
+        elapsed = time.perf_counter() - start
+        storage.close()
+    return operations / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--operations", type=int, default=20_000)
+    parser.add_argument("--slots", type=int, default=1_000)
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        rate = run(threads, args.operations, args.slots)
+        print(f"threads={threads:<3} cycles/s={rate:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
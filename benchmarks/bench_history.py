@@ -0,0 +1,58 @@
+"""Query time of the ticket history over millions of archived stays.
+
+Archives synthetic stays (a car returned every `--gap` seconds, exponential
+dwell times) and times range counts, dwell-time percentiles and hourly peak
+occupancy over the whole archive and over one day, on the first query
+after opening it (partitions read from disk) and on a repeat.
+
+Run with: python -m benchmarks.bench_history [--stays 2000000] [--gap 1.3]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.parking_slots import Size
+from src.ticket_history import TicketHistory
+
+START = 1_700_006_400.0
+
+
+def fill(directory: Path, stays: int, gap: float) -> float:
+    """Archives the stays and returns the end of the archived time range."""
+    rng = random.Random(1)
+    history = TicketHistory(directory)
+    sizes = list(Size)
+    for number in range(stays):
+        returned = START + number * gap
+        parked = returned - rng.expovariate(1 / 7200)
+        history.add("", rng.choice(sizes), number % 100, parked, returned)
+    history.close()
+    return START + stays * gap
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stays", type=int, default=2_000_000)
+    parser.add_argument("--gap", type=float, default=1.3, help="seconds between returns")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        began = time.perf_counter()
+        end = fill(Path(tmp), args.stays, args.gap)
+        print(f"archived {args.stays} stays in {time.perf_counter() - began:.1f} s")
+        history = TicketHistory(Path(tmp))
+        ranges = {"all": (START, end), "one day": (START + 86400, START + 2 * 86400)}
+        for run in ("first", "repeat"):
+            for name, (start, stop) in ranges.items():
+                for query in ("count", "dwell_percentiles", "hourly_occupancy"):
+                    began = time.perf_counter()
+                    getattr(history, query)(start, stop)
+                    elapsed = time.perf_counter() - began
+                    print(f"{run:<7} {name:<8} {query:<18} {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Load generator for the HTTP service: requests/s and latency percentiles.
+
+Each client thread keeps one connection alive and alternates park and
+return requests. Without --port a service is started in-process.
+
+Run with: python -m benchmarks.bench_http [--clients 8] [--port 8080]
+"""
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from pathlib import Path
+from typing import Optional
+
+from src.http_service import ParkingHTTPServer
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJournalFileStorage
+
+
+def client(host: str, port: int, requests: int, index: int, latencies: list[float]) -> None:
+    """Sends `requests` park/return requests over one kept-alive connection."""
+    connection = HTTPConnection(host, port)
+    headers = {"Content-Type": "application/json"}
+    size = list(Size)[index % len(Size)].name
+    ticket: Optional[dict] = None
+    for _ in range(requests):
+        if ticket is None:
+            path, body = "/park", {"size": size}
+        else:
+            path, body = "/return", ticket
+        start = time.perf_counter()
+        connection.request("POST", path, body=json.dumps(body), headers=headers)
+        response = connection.getresponse()
+        payload = json.loads(response.read())
+        latencies.append(time.perf_counter() - start)
+        if path == "/park" and response.status == 200:
+            ticket = {"ticket_id": payload["ticket_id"], "size": payload["slot_size"]}
+        else:
+            ticket = None
+    connection.close()
+
+
+def run(host: str, port: int, clients: int, requests: int) -> tuple[float, list[float]]:
+    """Returns requests per second and the sorted request latencies."""
+    latencies: list[list[float]] = [[] for _ in range(clients)]
+    threads = [
+        threading.Thread(target=client, args=(host, port, requests // clients, i, latencies[i]))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    merged = sorted(latency for per_client in latencies for latency in per_client)
+    return len(merged) / elapsed, merged
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    """Returns the latency below which `fraction` of the requests finished."""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--slots", type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = storage = None
+        port = args.port
+        if port is None:
+            storage = TicketJournalFileStorage(Path(tmp) / "tickets.jsonl")
+            slots = get_parking_slots(args.slots, args.slots, args.slots, concurrent=True)
+            server = ParkingHTTPServer(
+                (args.host, 0), CarParking(slots, storage), workers=args.workers
+            )
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            port = server.server_port
+
+        rate, latencies = run(args.host, port, args.clients, args.requests)
+        print(f"clients={args.clients:<3} requests/s={rate:,.0f}")
+        print(f"p50={percentile(latencies, 0.50) * 1e3:.2f} ms")
+        print(f"p99={percentile(latencies, 0.99) * 1e3:.2f} ms")
+
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Cost of metrics: park+return cycles with and without instrumentation.
+
+Run with: python -m benchmarks.bench_metrics [--operations 50000]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from src.metrics import InstrumentedParking, InstrumentedStorage, ParkingMetrics
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking, ValetParking
+from src.ticket_storage import TicketJournalFileStorage
+
+
+def cycle_time(parking: ValetParking, operations: int) -> float:
+    """Returns the mean microseconds of one park+return cycle."""
+    start = time.perf_counter()
+    for _ in range(operations):
+        ticket_id, slot_name = parking.park_car(Size.SMALL)
+        parking.return_car(ticket_id, Size[slot_name])
+    return (time.perf_counter() - start) / operations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = TicketJournalFileStorage(Path(tmp) / "plain.jsonl")
+        plain = cycle_time(CarParking(get_parking_slots(10, 10, 10), storage), args.operations)
+        storage.close()
+
+        metrics = ParkingMetrics()
+        slots = get_parking_slots(10, 10, 10)
+        metrics.track_slots(slots)
+        storage = TicketJournalFileStorage(Path(tmp) / "metered.jsonl")
+        parking = InstrumentedParking(
+            CarParking(slots, InstrumentedStorage(storage, metrics)), metrics
+        )
+        metered = cycle_time(parking, args.operations)
+        storage.close()
+
+    print(f"without metrics: {plain:.2f} µs/cycle")
+    print(f"with metrics:    {metered:.2f} µs/cycle (+{metered - plain:.2f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Open time and return latency of the file-backed ticket storages.
+
+Fills each storage with active tickets, then times reopening it and
+returning single cars, which rewrite the whole file on the JSON backend,
+append a line on the journal backend and flip one byte on the mmap backend.
+
+Run with: python -m benchmarks.bench_mmap_storage [--tickets 200000]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.suite import close_storage
+from src.config import STORAGE_BACKENDS
+from src.parking_slots import Size
+from src.ticket_ids import TicketIdGenerator
+
+BACKENDS = ("json", "journal", "mmap")
+
+
+def run(backend: str, tickets: int, returns: int) -> tuple[float, float]:
+    """Returns seconds to open the filled storage and µs per return."""
+    generate = TicketIdGenerator()
+    ticket_ids = [generate(Size.SMALL) for _ in range(tickets)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"tickets.{backend}"
+        storage = STORAGE_BACKENDS[backend](path)
+        with storage.batch():
+            storage.save_many(
+                [(ticket_id, Size.SMALL, n) for n, ticket_id in enumerate(ticket_ids)]
+            )
+        close_storage(storage)
+
+        start = time.perf_counter()
+        storage = STORAGE_BACKENDS[backend](path)
+        opened = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for ticket_id in ticket_ids[:returns]:
+            storage.retrieve(ticket_id, Size.SMALL)
+        per_return = (time.perf_counter() - start) / returns * 1e6
+        close_storage(storage)
+    return opened, per_return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--returns", type=int, default=200)
+    args = parser.parse_args()
+
+    for backend in BACKENDS:
+        opened, per_return = run(backend, args.tickets, args.returns)
+        print(f"{backend:<8} open {opened * 1e3:9.1f} ms  return {per_return:10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Restart time: journal open plus slot restore, with and without a snapshot.
+
+Writes `--records` historical park/return records (most cars already
+returned), then measures a cold start the way src.config does it.
+
+Run with: python -m benchmarks.bench_restore [--records 1000000]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from src.parking_slots import Size, Slots
+from src.parking_system import CarParking
+from src.slot_snapshot import restore_parking_slots, save_slots_snapshot
+from src.ticket_storage import TicketJournalFileStorage
+
+
+def fill_history(journal: Path, snapshot: Path, slots: Slots, records: int) -> None:
+    """Parks and returns cars until `records` operations are in the journal."""
+    storage = TicketJournalFileStorage(journal)
+    parking_slots = restore_parking_slots(slots, storage)
+    parking = CarParking(parking_slots, storage)
+    parked: list[tuple[str, str]] = []
+    written = 0
+    while written < records:
+        with storage.batch():
+            for result in parking.park_cars([Size.SMALL] * 5_000):
+                if result.ticket_id is not None:
+                    parked.append((result.ticket_id, Size[result.slot_size]))
+            returning, parked = parked[: len(parked) * 9 // 10], parked[len(parked) * 9 // 10 :]
+            parking.return_cars(returning)
+        written += 5_000 + len(returning)
+        if written % 100_000 < 10_000:
+            save_slots_snapshot(parking_slots, storage, snapshot)
+    save_slots_snapshot(parking_slots, storage, snapshot)
+    storage.close()
+
+
+def cold_start(journal: Path, snapshot: Path, slots: Slots) -> float:
+    """Returns seconds to open the journal and restore slot availability."""
+    start = time.perf_counter()
+    storage = TicketJournalFileStorage(journal)
+    restore_parking_slots(slots, storage, snapshot=snapshot)
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--bays", type=int, default=50_000)
+    args = parser.parse_args()
+    slots = Slots(args.bays, args.bays, args.bays)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal, snapshot = Path(tmp) / "tickets.jsonl", Path(tmp) / "slots.snapshot"
+        fill_history(journal, snapshot, slots, args.records)
+        print(f"journal size: {journal.stat().st_size / 1e6:.1f} MB")
+        print(f"restart with snapshot:    {cold_start(journal, snapshot, slots):.3f} s")
+        snapshot.unlink()
+        print(f"restart without snapshot: {cold_start(journal, snapshot, slots):.3f} s")
+
+
+if __name__ == "__main__":
+    main()
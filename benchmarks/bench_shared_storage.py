@@ -0,0 +1,79 @@
+"""Throughput of the shared JSON ticket file with many gate processes.
+
+Every process parks and returns cars through its own TicketSharedFileStorage
+on one file; the run checks that no ticket was lost.
+
+Run with: python -m benchmarks.bench_shared_storage [--processes 1 2 4 8 16]
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from src.parking_slots import Size
+from src.ticket_ids import TicketIdGenerator
+from src.ticket_storage import TicketSharedFileStorage
+
+
+def gate(jsonfile: Path, operations: int, kept: "multiprocessing.Queue") -> None:
+    """Saves tickets and returns every other one; reports the ones kept."""
+    storage = TicketSharedFileStorage(jsonfile)
+    generate = TicketIdGenerator()
+    active = []
+    for number in range(operations // 2):
+        ticket_id = generate(Size.SMALL)
+        storage.save(ticket_id, Size.SMALL, number)
+        active.append(ticket_id)
+        if number % 2:
+            storage.retrieve(active.pop(0), Size.SMALL)
+    storage.close()
+    kept.put(active)
+
+
+def run(processes: int, operations: int, preload: int) -> tuple[float, bool]:
+    """Returns operations per second over all gates and whether all tickets survived."""
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonfile = Path(tmp) / "tickets.json"
+        storage = TicketSharedFileStorage(jsonfile)
+        generate = TicketIdGenerator()
+        storage.save_many([(generate(Size.LARGE), Size.LARGE, n) for n in range(preload)])
+        kept: multiprocessing.Queue = multiprocessing.Queue()
+        gates = [
+            multiprocessing.Process(target=gate, args=(jsonfile, operations, kept))
+            for _ in range(processes)
+        ]
+        start = time.perf_counter()
+        for process in gates:
+            process.start()
+        expected = {ticket for _ in gates for ticket in kept.get()}
+        for process in gates:
+            process.join()
+        elapsed = time.perf_counter() - start
+        stored = {
+            record["ticket_id"]
+            for record in storage.records()
+            if record["slot_size"] == Size.SMALL
+        }
+        storage.close()
+    return processes * operations / elapsed, stored == expected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--operations", type=int, default=400, help="per process")
+    parser.add_argument("--preload", type=int, default=100, help="active tickets")
+    args = parser.parse_args()
+
+    for processes in args.processes:
+        ops_per_s, intact = run(processes, args.operations, args.preload)
+        print(
+            f"{processes:>3} processes  {ops_per_s:8.0f} ops/s  "
+            f"{'no tickets lost' if intact else 'TICKETS LOST'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
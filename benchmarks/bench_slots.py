@@ -0,0 +1,76 @@
+"""Memory and latency of the bitmap slot allocator against plain counters.
+
+Run with: python -m benchmarks.bench_slots [--bays 100 10000 100000]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from src.parking_slots import Size, get_parking_slots
+
+
+class CounterSlots:
+    """The former counter model: one free count per size, no slot numbers."""
+
+    def __init__(self, bays: int) -> None:
+        self._free = dict.fromkeys(Size, bays)
+
+    def reserve(self, size: Size) -> bool:
+        if self._free[size] <= 0:
+            return False
+        self._free[size] -= 1
+        return True
+
+    def release(self, size: Size) -> None:
+        self._free[size] += 1
+
+
+def measure_memory(factory) -> int:
+    """Returns the bytes allocated while building the slots."""
+    tracemalloc.start()
+    slots = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del slots
+    return size
+
+
+def measure_latency(slots, bays: int, operations: int, addressed: bool) -> float:
+    """Returns the mean nanoseconds per reserve+release on a half-full lot."""
+    held = [slots.reserve(Size.MEDIUM) for _ in range(bays // 2)]
+    rng = random.Random(0)
+    start = time.perf_counter_ns()
+    for _ in range(operations):
+        index = rng.randrange(len(held))
+        if addressed:
+            slots.release(Size.MEDIUM, held[index])
+        else:
+            slots.release(Size.MEDIUM)
+        held[index] = slots.reserve(Size.MEDIUM)
+    return (time.perf_counter_ns() - start) / operations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bays", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--operations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for bays in args.bays:
+        bitmap_memory = measure_memory(lambda: get_parking_slots(bays, bays, bays))
+        counter_memory = measure_memory(lambda: CounterSlots(bays))
+        bitmap_ns = measure_latency(
+            get_parking_slots(bays, bays, bays), bays, args.operations, True
+        )
+        counter_ns = measure_latency(CounterSlots(bays), bays, args.operations, False)
+        print(
+            f"bays={bays:<8} "
+            f"bitmap: {bitmap_memory:>8,} B {bitmap_ns:>6.0f} ns/op   "
+            f"counters: {counter_memory:>6,} B {counter_ns:>6.0f} ns/op"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Import and startup time of the package, measured in fresh interpreters.
+
+Run with: python -m benchmarks.bench_startup [--runs 20]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "python (baseline)": "pass",
+    "import src": "import src",
+    "import src.config": "import src.config",
+    "build parking": (
+        "from src.config import build_parking, load_config; "
+        "build_parking(load_config())"
+    ),
+}
+
+
+def measure(code: str, runs: int) -> float:
+    """Returns the median wall time in milliseconds of running `code`."""
+    timings = []
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=tmp, env=env, check=True)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, code in SCENARIOS.items():
+        print(f"{name:<20} {measure(code, args.runs):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Memory per active ticket: column store against the dict-of-records index.
+
+Run with: python -m benchmarks.bench_ticket_memory [--tickets 1000000]
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable
+
+from src.parking_slots import Size
+from src.ticket_columns import TicketColumnStore
+from src.ticket_ids import TicketIdGenerator
+
+
+def dict_index(ticket_ids: list[str]) -> dict:
+    """Builds the index the JSON and journal storages keep in memory."""
+    tickets = {}
+    for number, ticket_id in enumerate(ticket_ids):
+        tickets[ticket_id] = {
+            "date": str(datetime.now()),
+            "ticket_id": ticket_id,
+            "slot_size": Size.SMALL,
+            "slot_number": number,
+        }
+    return tickets
+
+
+def column_store(ticket_ids: list[str]) -> TicketColumnStore:
+    store = TicketColumnStore()
+    for number, ticket_id in enumerate(ticket_ids):
+        store.save(ticket_id, Size.SMALL, number)
+    return store
+
+
+def measure(build: Callable[[list[str]], object], count: int) -> tuple[float, float]:
+    """Returns bytes per ticket and seconds to load `count` tickets.
+
+    The ticket ID strings are created before tracing starts, so only what
+    the index itself keeps is counted. Loading is timed in a separate,
+    untraced run.
+    """
+    generate = TicketIdGenerator()
+    ticket_ids = [generate(Size.SMALL) for _ in range(count)]
+    start = time.perf_counter()
+    build(ticket_ids)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    index = build(ticket_ids)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+    # The dict index holds on to the ID strings; the column store doesn't.
+    if build is dict_index:
+        current += sum(sys.getsizeof(ticket_id) for ticket_id in ticket_ids)
+    return current / count, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for name, build in (("dict of records", dict_index), ("column store", column_store)):
+        per_ticket, elapsed = measure(build, args.tickets)
+        print(f"{name:<16} {per_ticket:7.1f} bytes/ticket  load {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-car latency of park and return with and without write-back buffering.
+
+Each car is returned right after it parks, so with write-back most tickets
+are saved and retrieved within one window and never reach the storage;
+this is the best case for buffering.
+
+Run with: python -m benchmarks.bench_write_back [--cars 2000] [--active 5000]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.suite import close_storage, summarize
+from src.config import STORAGE_BACKENDS
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.write_back import WriteBackTicketStorage
+
+
+def run(backend: str, write_back: bool, cars: int, active: int) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = STORAGE_BACKENDS[backend](Path(tmp) / f"tickets.{backend}")
+        if write_back:
+            storage = WriteBackTicketStorage(storage, max_pending=100, max_delay=0.05)
+        parking = CarParking(get_parking_slots(active + cars, 0, 0), storage)
+        with storage.batch():
+            parking.park_cars([Size.SMALL] * active)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(cars):
+            began = time.perf_counter()
+            ticket_id, _ = parking.park_car(Size.SMALL)
+            parking.return_car(ticket_id)
+            latencies.append(time.perf_counter() - began)
+        stats = summarize(latencies, time.perf_counter() - start)
+        close_storage(storage)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--active", type=int, default=5000)
+    parser.add_argument("--backends", nargs="+", default=["json", "journal", "sqlite"])
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        for write_back in (False, True):
+            stats = run(backend, write_back, args.cars, args.active)
+            mode = "write-back" if write_back else "direct"
+            print(
+                f"{backend:<8} {mode:<10} p50 {stats['p50_us']:9.1f} µs  "
+                f"p99 {stats['p99_us']:9.1f} µs  {stats['ops_per_s']:8.0f} cars/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Benchmark suite for the parking and storage hot paths.
+
+Sweeps lot sizes, active-ticket counts, storage backends and thread counts,
+times `park_car`, `return_car` and the storage `save`/`retrieve` calls, and
+writes the results as JSON. With --baseline it exits with status 1 when a
+tracked operation is slower than the baseline by more than --tolerance.
+
+Run with:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --quick --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --quick --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from src.config import STORAGE_BACKENDS
+from src.exceptions import CarSizeError
+from src.operation_trace import summarize
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_ids import TicketIdGenerator
+from src.ticket_storage import TicketStorage, close_storage
+
+# Metric compared against the baseline; the median is the least noisy one.
+TRACKED_METRIC = "p50_us"
+
+FULL_SWEEP = {"lots": [50_000, 500_000], "active": [1_000, 10_000, 100_000]}
+QUICK_SWEEP = {"lots": [5_000], "active": [1_000]}
+
+
+def open_storage(backend: str, directory: Path) -> TicketStorage:
+    """Opens an empty storage of the given backend in `directory`."""
+    return STORAGE_BACKENDS[backend](directory / f"tickets.{backend}")
+
+
+def fill(parking: CarParking, storage: TicketStorage, active: int) -> None:
+    """Parks `active` cars so the benchmark runs against a populated storage."""
+    remaining = active
+    while remaining:
+        chunk = min(remaining, 10_000)
+        with storage.batch():
+            parking.park_cars([Size.SMALL] * chunk)
+        remaining -= chunk
+
+
+def bench_parking(
+    parking: CarParking, threads: int, operations: int
+) -> dict[str, dict[str, float]]:
+    """Times park_car and return_car cycles spread over `threads` terminals."""
+    parks: list[list[float]] = [[] for _ in range(threads)]
+    returns: list[list[float]] = [[] for _ in range(threads)]
+
+    def terminal(index: int) -> None:
+        car_size = list(Size)[index % len(Size)]
+        for _ in range(operations // threads):
+            start = time.perf_counter()
+            try:
+                ticket_id, slot_name = parking.park_car(car_size)
+            except CarSizeError:
+                continue
+            parked = time.perf_counter()
+            parking.return_car(ticket_id, Size[slot_name])
+            parks[index].append(parked - start)
+            returns[index].append(time.perf_counter() - parked)
+
+    workers = [threading.Thread(target=terminal, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "park_car": summarize([t for per in parks for t in per], elapsed),
+        "return_car": summarize([t for per in returns for t in per], elapsed),
+    }
+
+
+def bench_storage(storage: TicketStorage, operations: int) -> dict[str, dict[str, float]]:
+    """Times the storage save and retrieve calls on their own."""
+    saves: list[float] = []
+    retrieves: list[float] = []
+    generate = TicketIdGenerator()
+    start = time.perf_counter()
+    for _ in range(operations):
+        ticket_id = generate(Size.MEDIUM)
+        began = time.perf_counter()
+        storage.save(ticket_id, Size.MEDIUM, None)
+        saved = time.perf_counter()
+        storage.retrieve(ticket_id, Size.MEDIUM)
+        saves.append(saved - began)
+        retrieves.append(time.perf_counter() - saved)
+    elapsed = time.perf_counter() - start
+    return {
+        "storage.save": summarize(saves, elapsed),
+        "storage.retrieve": summarize(retrieves, elapsed),
+    }
+
+
+def run_case(
+    backend: str, lot: int, active: int, threads: int, operations: int
+) -> dict[str, dict[str, float]]:
+    """Runs one point of the sweep in a fresh temporary directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = open_storage(backend, Path(tmp))
+        slots = get_parking_slots(lot, lot, lot, concurrent=threads > 1)
+        parking = CarParking(slots, storage)
+        fill(parking, storage, active)
+        results = bench_parking(parking, threads, operations)
+        if threads == 1:
+            results.update(bench_storage(storage, operations))
+        close_storage(storage)
+    return results
+
+
+def run_suite(
+    backends: Iterable[str],
+    lots: Iterable[int],
+    actives: Iterable[int],
+    threads: Iterable[int],
+    operations: int,
+) -> dict[str, dict[str, float]]:
+    """Runs the whole sweep and returns results keyed by case name."""
+    results: dict[str, dict[str, float]] = {}
+    for backend in backends:
+        for lot in lots:
+            for active in actives:
+                if active > 3 * lot - operations:
+                    continue
+                for thread_count in threads:
+                    case = f"{backend}/lot={lot}/active={active}/threads={thread_count}"
+                    print(f"running {case}", file=sys.stderr)
+                    for operation, stats in run_case(
+                        backend, lot, active, thread_count, operations
+                    ).items():
+                        results[f"{case}/{operation}"] = stats
+    return results
+
+
+def find_regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Lists the cases slower than the baseline by more than `tolerance`.
+
+    Cases missing from either side are not compared.
+    """
+    regressions = []
+    for case, stats in results.items():
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        limit = reference[TRACKED_METRIC] * (1 + tolerance)
+        if stats[TRACKED_METRIC] > limit:
+            regressions.append(
+                f"{case}: {TRACKED_METRIC} {stats[TRACKED_METRIC]:.1f} > "
+                f"{reference[TRACKED_METRIC]:.1f} (+{tolerance:.0%})"
+            )
+    return regressions
+
+
+def report(results: dict[str, dict[str, float]]) -> dict[str, Any]:
+    """Wraps the results with the environment they were measured in."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--quick", action="store_true", help="small sweep for CI")
+    parser.add_argument("--backends", nargs="+", default=list(STORAGE_BACKENDS))
+    parser.add_argument("--lots", type=int, nargs="+", help="slots per size")
+    parser.add_argument("--active", type=int, nargs="+", help="active tickets")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--output", type=Path, help="write JSON results here")
+    parser.add_argument("--baseline", type=Path, help="compare with these results")
+    parser.add_argument("--save-baseline", type=Path, help="store results as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    sweep = QUICK_SWEEP if args.quick else FULL_SWEEP
+    results = run_suite(
+        args.backends,
+        args.lots or sweep["lots"],
+        args.active or sweep["active"],
+        args.threads,
+        args.operations,
+    )
+
+    output = json.dumps(report(results), indent=2)
+    if args.output:
+        args.output.write_text(output)
+    if args.save_baseline:
+        args.save_baseline.write_text(output)
+    if not args.output and not args.save_baseline:
+        print(output)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,10 @@
-from src import manage_car, ManageCarError, Size
-from src.config import parking
+import argparse
+import sys
+from pathlib import Path
+from src import manage_car, save_slots_snapshot, ManageCarError, Size
+from src.batch_commands import run_commands
+from src.exceptions import ParkingInitError, SlotsError
+from src.config import build_parking, configure_logging, load_config
 import logging
 
 log = logging.getLogger(__name__)
@@ -7,6 +12,33 @@ log = logging.getLogger(__name__)
 
 def main():
     """Here you can try to launch parking system actions and check its work"""
+    parser = argparse.ArgumentParser(description="Valet parking system")
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="run JSONL park/return commands from FILE (or stdin) and print "
+        "JSONL results",
+    )
+    args = parser.parse_args()
+
+    try:
+        config = load_config()
+        configure_logging(config)
+        parking, slots, storage = build_parking(config)
+    except (SlotsError, ParkingInitError) as e:
+        log.error(f"Parking initialization error: {e}")
+        print(e, file=sys.stderr)
+        exit(1)
+
+    if args.batch is not None:
+        commands = sys.stdin if args.batch == "-" else open(args.batch)
+        with commands:
+            sys.stdout.writelines(run_commands(parking, commands, storage))
+        save_slots_snapshot(slots, storage, Path(config.snapshot_path))
+        return
+
     try:
         manage_car(
             parking,
@@ -18,6 +50,7 @@ def main():
         log.error(f"Car management error: {e}")
         print(e)
         exit(1)
+    save_slots_snapshot(slots, storage, Path(config.snapshot_path))
 
 
 if __name__ == "__main__":
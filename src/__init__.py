@@ -1,7 +1,67 @@
-from .parking_slots import Size, ParkingSlots, get_parking_slots
-from .parking_system import ValetParking, CarParking, parking_init, manage_car
+from .parking_slots import (
+    Size,
+    Slots,
+    ParkingSlots,
+    ConcurrentParkingSlots,
+    get_parking_slots,
+)
+from .allocation import (
+    OverflowThreshold,
+    best_fit,
+    exact_fit,
+    worst_fit,
+)
+from .parking_system import (
+    ValetParking,
+    CarParking,
+    CarBatchResult,
+    parking_init,
+    manage_car,
+)
+from .ticket_storage import (
+    TicketStorage,
+    TicketJsonFileStorage,
+    TicketJournalFileStorage,
+    TicketSqliteStorage,
+    TicketMmapStorage,
+    TicketSharedFileStorage,
+)
+from .ticket_columns import (
+    TicketColumnStore,
+    CachedTicketStorage,
+)
+from .write_back import WriteBackTicketStorage
+from .slot_snapshot import (
+    PeriodicSlotSnapshot,
+    restore_parking_slots,
+    save_slots_snapshot,
+)
+from .metrics import (
+    ParkingMetrics,
+    InstrumentedParking,
+    InstrumentedStorage,
+)
 from .exceptions import *
 
+# Modules pulling in asyncio or multiprocessing are imported on first use,
+# so a plain `import src` stays cheap for CLI runs and worker processes.
+_LAZY_IMPORTS = {
+    "ParkingCluster": ".parking_cluster",
+    "ShardProcess": ".parking_cluster",
+    "cluster_init": ".parking_cluster",
+    "AsyncCarParking": ".async_parking",
+    "AsyncTicketStorage": ".async_parking",
+    "GroupCommitStorage": ".async_parking",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        import importlib
+
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "CarParking",
@@ -0,0 +1,59 @@
+from typing import Callable, Mapping, Sequence
+from src.parking_slots import Size
+
+# Takes the car size and the free slots of each size, and returns the slot
+# sizes to try in order. The parking takes a slot of the first size in the
+# list that still has one; an empty list turns the car away.
+AllocationPolicy = Callable[[Size, Mapping[Size, int]], Sequence[Size]]
+
+_FITTING = {car: [size for size in Size if size >= car] for car in Size}
+_FITTING_LARGEST_FIRST = {car: sizes[::-1] for car, sizes in _FITTING.items()}
+
+
+def best_fit(car_size: Size, free: Mapping[Size, int]) -> Sequence[Size]:
+    """Tries the smallest slot that fits the car first (the default)."""
+    return _FITTING[car_size]
+
+
+def worst_fit(car_size: Size, free: Mapping[Size, int]) -> Sequence[Size]:
+    """Tries the largest slot first, keeping small slots for small cars."""
+    return _FITTING_LARGEST_FIRST[car_size]
+
+
+def exact_fit(car_size: Size, free: Mapping[Size, int]) -> Sequence[Size]:
+    """Only parks a car in a slot of its own size."""
+    return _FITTING[car_size][:1]
+
+
+class OverflowThreshold:
+    """Best fit, but keeps some slots of each size for cars of that size.
+
+    A car only overflows into a bigger slot while more than `keep[size]`
+    slots of that size are free; `OverflowThreshold({Size.LARGE: 5})`
+    holds the last five large bays back for large cars.
+    """
+
+    def __init__(self, keep: Mapping[Size, int]) -> None:
+        self._keep = {size: keep.get(size, 0) for size in Size}
+
+    def __call__(self, car_size: Size, free: Mapping[Size, int]) -> Sequence[Size]:
+        return [
+            size
+            for size in _FITTING[car_size]
+            if size == car_size or free[size] > self._keep[size]
+        ]
+
+    def __repr__(self) -> str:
+        keep = ", ".join(f"{size.name}={count}" for size, count in self._keep.items())
+        return f"OverflowThreshold({keep})"
+
+
+# Policies whose order depends on the car size only: whether a car can park
+# under them changes only when a slot size runs out or frees up again.
+SIZE_ONLY_POLICIES = frozenset({best_fit, worst_fit, exact_fit})
+
+ALLOCATION_POLICIES: dict[str, AllocationPolicy] = {
+    "best_fit": best_fit,
+    "worst_fit": worst_fit,
+    "exact_fit": exact_fit,
+}
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Dict, Optional
+from src.allocation import AllocationPolicy, best_fit
+from src.parking_slots import Size, ParkingSlots
+from src.parking_system import SlotKeeper
+from src.reservations import ReservationBook
+from src.ticket_ids import TicketIdGenerator, resolve_ticket
+from src.exceptions import CarSizeError, ManageCarError
+from src.ticket_storage import TicketIdRecord, TicketStorage
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTicketStorage:
+    """Interface for any storage used from an asyncio event loop."""
+
+    async def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        raise NotImplementedError
+
+    async def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        raise NotImplementedError
+
+    async def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+
+class GroupCommitStorage(AsyncTicketStorage):
+    """Runs a TicketStorage off the event loop and commits requests in groups.
+
+    Requests arriving within `window` seconds are applied together inside one
+    `TicketStorage.batch()` on a worker thread, so they share one flush of the
+    underlying storage. A group is flushed early once it holds `max_batch`
+    requests. Groups are applied one after another, in arrival order.
+    """
+
+    def __init__(
+        self, storage: TicketStorage, window: float = 0.002, max_batch: int = 512
+    ):
+        self._storage = storage
+        self._window = window
+        self._max_batch = max_batch
+        self._pending: list[tuple[str, tuple, asyncio.Future]] = []
+        self._group_full = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        return await self._submit("save", (ticket_id, slot_size, slot_number))
+
+    async def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        return await self._submit("retrieve", (ticket_id, slot_size))
+
+    async def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        return await asyncio.to_thread(self._storage.get, ticket_id)
+
+    async def close(self) -> None:
+        """Waits until every pending request is committed."""
+        if self._flusher is not None:
+            await self._flusher
+
+    def _submit(self, op: str, args: tuple) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, args, future))
+        if len(self._pending) >= self._max_batch:
+            self._group_full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_pending())
+        return future
+
+    async def _flush_pending(self) -> None:
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._group_full.wait(), self._window)
+            except asyncio.TimeoutError:
+                pass
+            self._group_full.clear()
+            # Requests cancelled while waiting are dropped; ones cancelled
+            # during the commit still happen, their result is just not wanted.
+            group = [
+                request
+                for request in self._pending[: self._max_batch]
+                if not request[2].done()
+            ]
+            del self._pending[: self._max_batch]
+            if not group:
+                continue
+            requests = [(op, args) for op, args, _ in group]
+            try:
+                results = await asyncio.to_thread(self._commit, requests)
+            except Exception as e:
+                for *_, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (*_, future), result in zip(group, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    def _commit(self, requests: list[tuple[str, tuple]]) -> list[bool]:
+        with self._storage.batch():
+            return [
+                self._storage.save(*args)
+                if op == "save"
+                else self._storage.retrieve(*args)
+                for op, args in requests
+            ]
+
+
+class AsyncCarParking(SlotKeeper):
+    """Asyncio counterpart of CarParking for serving many gates from one loop.
+
+    Slots are picked by the same allocation `policy`, and expired holds and
+    availability are handled by the same SlotKeeper code as CarParking.
+    """
+
+    def __init__(
+        self,
+        slots: ParkingSlots,
+        storage: AsyncTicketStorage,
+        policy: AllocationPolicy = best_fit,
+        reservations: Optional[ReservationBook] = None,
+    ):
+        super().__init__(slots, policy, reservations)
+        self._storage = storage
+        self._generate_ticket_id = TicketIdGenerator()
+
+    async def park_car(self, car_size: Size) -> tuple[str, str]:
+        """Finds a slot, waits for the ticket to be stored and parks the car."""
+        self._expire_reservations()
+        reserved = self._reserve_slot(car_size)
+        if reserved is None:
+            logger.warning(
+                "Failed to park car size %s: No suitable slots found.",
+                car_size.name,
+                extra={"size": car_size.name},
+            )
+            raise CarSizeError
+        slot_size, slot_number = reserved
+        ticket_id = self._generate_ticket_id(slot_size)
+        save = asyncio.ensure_future(
+            self._storage.save(ticket_id, slot_size, slot_number)
+        )
+        settle = partial(self._settle_save, ticket_id, slot_size, slot_number)
+        try:
+            # A cancelled caller doesn't cancel the save: the slot is
+            # committed or rolled back once its outcome is known.
+            await asyncio.shield(save)
+        except Exception as e:
+            # A storage failure must not keep the slot reserved.
+            settle(save)
+            raise ManageCarError(f"Ticket {ticket_id} not saved: {e}") from e
+        finally:
+            if not save.done():
+                save.add_done_callback(settle)
+        if not settle(save):
+            raise ManageCarError(f"Ticket {ticket_id} not saved")
+        logger.info(
+            "Parked car size %s in slot %s #%d. Ticket: %s",
+            car_size.name,
+            slot_size.name,
+            slot_number,
+            ticket_id,
+            extra={
+                "ticket_id": ticket_id,
+                "size": slot_size.name,
+                "slot_number": slot_number,
+            },
+        )
+        return (ticket_id, slot_size.name)
+
+    async def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        """Returns the slot size and number where the ticket's car is parked."""
+        slot = self._active_tickets.get(ticket_id)
+        if slot is None:
+            # Tickets issued before a restart are only known to the storage.
+            record = await self._storage.get(ticket_id)
+            if record is not None and record["slot_number"] is not None:
+                slot = (Size(record["slot_size"]), record["slot_number"])
+        return slot
+
+    async def return_car(
+        self, ticket_id: str, slot_size: Optional[Size] = None
+    ) -> bool:
+        """Retrieves the ticket from storage and frees the slot."""
+        ticket_id, slot_size = resolve_ticket(ticket_id, slot_size)
+        if slot_size is None:
+            logger.warning(
+                "Failed to return car: Ticket %s is not valid.",
+                ticket_id,
+                extra={"ticket_id": ticket_id},
+            )
+            return False
+        slot = await self.locate_car(ticket_id)
+        if await self._storage.retrieve(ticket_id, slot_size):
+            self._free_slot(ticket_id, slot_size, slot)
+            self.publish_availability()
+            logger.info(
+                "Returned car with ticket %s. Freed slot %s.",
+                ticket_id,
+                slot_size.name,
+                extra={"ticket_id": ticket_id, "size": slot_size.name},
+            )
+            return True
+        logger.warning(
+            "Failed to return car: Ticket %s not found.",
+            ticket_id,
+            extra={"ticket_id": ticket_id, "size": slot_size.name},
+        )
+        return False
+
+    def _settle_save(
+        self, ticket_id: str, slot_size: Size, slot_number: int, save: asyncio.Future
+    ) -> bool:
+        """Commits the reserved slot if its ticket was saved, else rolls it back."""
+        if save.cancelled() or save.exception() is not None or not save.result():
+            self._slots.rollback(slot_size, slot_number)
+            self.publish_availability()
+            return False
+        self._slots.commit(slot_size, slot_number)
+        self._active_tickets[ticket_id] = (slot_size, slot_number)
+        self.publish_availability()
+        return True
@@ -0,0 +1,72 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+from src.allocation import SIZE_ONLY_POLICIES, AllocationPolicy
+from src.parking_slots import Size
+
+_SIZES = tuple(Size)
+
+
+class Availability(NamedTuple):
+    """Free slots of a parking system at one moment, with what it can park.
+
+    A parking system publishes a new snapshot after each change and never
+    alters a published one, so readers on any thread use it without a lock.
+    `version` grows by one with every published change. `can_park[size]`
+    tells whether a car of that size would get a slot under the parking's
+    allocation policy.
+    """
+
+    version: int
+    free: Mapping[Size, int]
+    can_park: Mapping[Size, bool]
+
+    @classmethod
+    def of(
+        cls, version: int, free: Mapping[Size, int], policy: AllocationPolicy
+    ) -> "Availability":
+        """Builds a snapshot of the free slot counts, evaluating the policy."""
+        free = dict(free)
+        can_park = {
+            car_size: any(map(free.__getitem__, policy(car_size, free)))
+            for car_size in _SIZES
+        }
+        return cls(version, MappingProxyType(free), MappingProxyType(can_park))
+
+    def updated(self, free: dict[Size, int], policy: AllocationPolicy) -> "Availability":
+        """Builds the next snapshot from new free slot counts (kept, not copied).
+
+        The can-park table is kept when the policy only looks at the car
+        size and no size ran out of slots or got its first free one back.
+        """
+        if policy in SIZE_ONLY_POLICIES and (
+            # Usually every size has a free slot before and after.
+            (0 not in free.values() and 0 not in self.free.values())
+            or [free[size] == 0 for size in _SIZES]
+            == [self.free[size] == 0 for size in _SIZES]
+        ):
+            return Availability(self.version + 1, MappingProxyType(free), self.can_park)
+        return Availability.of(self.version + 1, free, policy)
+
+    @classmethod
+    def combine(cls, snapshots: list["Availability"]) -> "Availability":
+        """Adds up the snapshots of several lots (a car fits if any lot has room)."""
+        return cls(
+            sum(snapshot.version for snapshot in snapshots),
+            MappingProxyType(
+                {size: sum(s.free[size] for s in snapshots) for size in Size}
+            ),
+            MappingProxyType(
+                {size: any(s.can_park[size] for s in snapshots) for size in Size}
+            ),
+        )
+
+    def __reduce__(self):
+        # Read-only mappings can't be pickled; shard processes send plain
+        # dicts, wrapped again on arrival.
+        return _unpickle, (self.version, dict(self.free), dict(self.can_park))
+
+
+def _unpickle(
+    version: int, free: dict[Size, int], can_park: dict[Size, bool]
+) -> Availability:
+    return Availability(version, MappingProxyType(free), MappingProxyType(can_park))
@@ -0,0 +1,112 @@
+"""Streaming park/return commands through one parking system.
+
+Commands are JSON lines such as
+    {"action": "park", "size": "SMALL", "id": "gate-3/0042"}
+    {"action": "return", "ticket_id": "1X02F6DQ34NA8"}
+and every command gives one JSON result line, in input order:
+    {"line": 1, "id": "gate-3/0042", "ok": true, "ticket_id": "...", ...}
+    {"line": 2, "ok": false, "error": "Ticket ... not found."}
+An `id` field is copied to the result for matching. Lines are read, run
+and written as a stream, so memory doesn't grow with the input.
+"""
+
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional, Union
+from src.parking_slots import Size
+from src.parking_system import ValetParking
+from src.exceptions import CarSizeError, ParkingSystemErrors
+from src.ticket_storage import TicketStorage
+
+# Commands run inside one storage batch, so a file-based storage is
+# written once per chunk instead of once per command.
+CHUNK_SIZE = 1000
+
+
+def parse_commands(lines: Iterable[str]) -> Iterator[tuple[int, Union[dict, str]]]:
+    """Yields (line number, command) for non-blank lines.
+
+    A line that isn't a JSON object gives an error message instead.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(command, dict):
+            yield line_number, "A command must be a JSON object."
+        else:
+            yield line_number, command
+
+
+def run_command(
+    parking: ValetParking, line_number: int, command: Union[dict, str]
+) -> dict[str, Any]:
+    """Runs one parsed command and returns its result."""
+    result: dict[str, Any] = {"line": line_number}
+    if isinstance(command, str):
+        return {**result, "ok": False, "error": command}
+    if "id" in command:
+        result["id"] = command["id"]
+    action = command.get("action")
+    try:
+        if action == "park":
+            ticket_id, slot_size = parking.park_car(_size(command["size"]))
+            location = parking.locate_car(ticket_id)
+            result.update(
+                ok=True,
+                ticket_id=ticket_id,
+                slot_size=slot_size,
+                slot_number=None if location is None else location[1],
+            )
+        elif action == "return":
+            ticket_id = str(command["ticket_id"]).strip()
+            size = command.get("size")
+            ok = parking.return_car(ticket_id, None if size is None else _size(size))
+            result.update(ok=ok, ticket_id=ticket_id)
+            if not ok:
+                result["error"] = f"Ticket {ticket_id} not found."
+        else:
+            result.update(ok=False, error=f"Unknown action {action!r}.")
+    except KeyError as e:
+        result.update(ok=False, error=f"Missing or invalid field {e}.")
+    except CarSizeError:
+        result.update(ok=False, error="No suitable slots found.")
+    except ParkingSystemErrors as e:
+        result.update(ok=False, error=str(e))
+    return result
+
+
+def run_commands(
+    parking: ValetParking,
+    lines: Iterable[str],
+    storage: Optional[TicketStorage] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """Runs JSONL commands and yields JSONL results, one per command.
+
+    With the parking's `storage`, each chunk of commands runs in one storage
+    batch and its results are only yielded once the batch is written.
+    """
+    commands = parse_commands(lines)
+    while True:
+        chunk = list(islice(commands, chunk_size))
+        if not chunk:
+            return
+        if storage is None:
+            results = [run_command(parking, *command) for command in chunk]
+        else:
+            with storage.batch():
+                results = [run_command(parking, *command) for command in chunk]
+        for result in results:
+            yield json.dumps(result) + "\n"
+
+
+def _size(name: Any) -> Size:
+    try:
+        return Size[str(name).upper()]
+    except KeyError:
+        raise KeyError("size")
@@ -1,11 +1,29 @@
+import atexit
+import json
 import logging
-from src import (
-    CarParking,
-    parking_init,
-    get_parking_slots,
-    SlotsError,
-    ParkingInitError,
+import logging.handlers
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Mapping, NamedTuple, Optional
+from src.metrics import InstrumentedParking, InstrumentedStorage, ParkingMetrics
+from src.operation_trace import TraceRecorder
+from src.ticket_history import HistoryTicketStorage, TicketHistory
+from src.write_back import WriteBackTicketStorage
+from src.parking_slots import ParkingSlots, Slots
+from src.parking_system import CarParking, ValetParking, parking_init
+from src.slot_snapshot import PeriodicSlotSnapshot, restore_parking_slots
+from src.ticket_columns import CachedTicketStorage
+from src.ticket_storage import (
+    TicketStorage,
+    TicketJsonFileStorage,
+    TicketJournalFileStorage,
+    TicketMmapStorage,
+    TicketSharedFileStorage,
+    TicketSqliteStorage,
 )
+from src.exceptions import ParkingInitError
 
 # MAIN VARIABLES THAT CAN BE CHANGED
 ########################################################
@@ -14,27 +32,246 @@ SMALL_SLOTS = 10
 MEDIUM_SLOTS = 20
 LARGE_SLOTS = 30
 
+# Share slots safely between threads (one terminal per thread)
+CONCURRENT_SLOTS = False
+
 # Parking class
 PARKING_CLASS = CarParking
 
+# Ticket storage backend ("json", "journal", "sqlite", "mmap", or "shared"
+# for a JSON file used by several processes at once) and its file
+STORAGE_BACKEND = "json"
+STORAGE_PATH = "tickets.json"
+
+# Keep active tickets in a compact in-memory column store in front of the
+# storage backend (useful with "sqlite", which has no in-memory index)
+TICKET_CACHE = False
+
+# Buffer storage writes and flush them every WRITE_BACK_OPS operations or
+# WRITE_BACK_MS milliseconds; a crash can lose that window (0 = write through)
+WRITE_BACK_OPS = 0
+WRITE_BACK_MS = 50
+
+# Binary snapshot of slot availability used for a fast restart, saved
+# every SNAPSHOT_INTERVAL seconds, after each compaction and at exit
+# (0 = only when the program saves it)
+SNAPSHOT_PATH = "slots.snapshot"
+SNAPSHOT_INTERVAL = 60.0
+
+# Log file
+LOG_FILE = "parking.log"
+
+# Write log records to the file from a background thread
+ASYNC_LOGGING = True
+
+# Record latency histograms, counters and slot gauges
+METRICS = False
+
+# Write a trace of park and return operations to this file ("" = off)
+TRACE_PATH = ""
+
+# Archive retrieved tickets in this directory, one file per day ("" = off)
+HISTORY_PATH = ""
+
 ########################################################
-logging.basicConfig(
-    filename="parking.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    encoding="utf-8",
-)
+STORAGE_BACKENDS: dict[str, type[TicketStorage]] = {
+    "json": TicketJsonFileStorage,
+    "journal": TicketJournalFileStorage,
+    "sqlite": TicketSqliteStorage,
+    "mmap": TicketMmapStorage,
+    "shared": TicketSharedFileStorage,
+}
+
+# Environment variables that override the defaults above
+ENV_PREFIX = "VALET_"
+
+
+class ParkingConfig(NamedTuple):
+    """Settings needed to build a parking system."""
+
+    small_slots: int = SMALL_SLOTS
+    medium_slots: int = MEDIUM_SLOTS
+    large_slots: int = LARGE_SLOTS
+    concurrent_slots: bool = CONCURRENT_SLOTS
+    storage_backend: str = STORAGE_BACKEND
+    storage_path: str = STORAGE_PATH
+    ticket_cache: bool = TICKET_CACHE
+    write_back_ops: int = WRITE_BACK_OPS
+    write_back_ms: int = WRITE_BACK_MS
+    snapshot_path: str = SNAPSHOT_PATH
+    snapshot_interval: float = SNAPSHOT_INTERVAL
+    log_file: str = LOG_FILE
+    async_logging: bool = ASYNC_LOGGING
+    metrics: bool = METRICS
+    trace_path: str = TRACE_PATH
+    history_path: str = HISTORY_PATH
+
+
+def load_config(
+    config_file: Optional[Path] = None,
+    env: Optional[Mapping[str, str]] = None,
+    **overrides: Any,
+) -> ParkingConfig:
+    """Builds the config from defaults, a JSON file, the environment and arguments.
+
+    Later sources win: arguments override environment variables (for example
+    VALET_SMALL_SLOTS), which override the file, which overrides the defaults.
+    """
+    values: dict[str, Any] = {}
+    if config_file is not None:
+        try:
+            values.update(json.loads(Path(config_file).read_text()))
+        except (OSError, ValueError) as e:
+            raise ParkingInitError(f"Can't read config file {config_file}: {e}")
+    env = os.environ if env is None else env
+    for field in ParkingConfig._fields:
+        if ENV_PREFIX + field.upper() in env:
+            values[field] = env[ENV_PREFIX + field.upper()]
+    values.update(overrides)
+
+    unknown = set(values) - set(ParkingConfig._fields)
+    if unknown:
+        raise ParkingInitError(f"Unknown config options: {', '.join(sorted(unknown))}")
+    try:
+        for field in ("small_slots", "medium_slots", "large_slots"):
+            if field in values:
+                values[field] = int(values[field])
+    except ValueError as e:
+        raise ParkingInitError(f"Invalid number of slots: {e}")
+    try:
+        for field in ("write_back_ops", "write_back_ms"):
+            if field in values:
+                values[field] = int(values[field])
+    except ValueError as e:
+        raise ParkingInitError(f"Invalid write-back setting: {e}")
+    try:
+        if "snapshot_interval" in values:
+            values["snapshot_interval"] = float(values["snapshot_interval"])
+    except ValueError as e:
+        raise ParkingInitError(f"Invalid snapshot interval: {e}")
+    for field in ("concurrent_slots", "ticket_cache", "async_logging", "metrics"):
+        if isinstance(values.get(field), str):
+            values[field] = values[field].lower() in ("1", "true", "yes")
+    if values.get("storage_backend", STORAGE_BACKEND) not in STORAGE_BACKENDS:
+        raise ParkingInitError(f"Unknown storage backend {values['storage_backend']}")
+    return ParkingConfig(**values)
+
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are, leaving all formatting to the listener.
+
+    The queue never leaves the process, so the record's arguments and
+    structured fields don't have to be rendered in the caller's thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(
+    config: ParkingConfig,
+) -> Optional[logging.handlers.QueueListener]:
+    """Sends the parking logs to the configured file.
+
+    With `config.async_logging` the calling thread only puts the record on a
+    queue; a listener thread formats it and writes the file, so a slow disk
+    doesn't delay parking. The listener is returned (and stopped at exit).
+    """
+    if not config.async_logging:
+        logging.basicConfig(
+            filename=config.log_file,
+            level=logging.INFO,
+            format=LOG_FORMAT,
+            encoding="utf-8",
+        )
+        return None
+
+    file_handler = logging.FileHandler(config.log_file, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, respect_handler_level=True
+    )
+    root = logging.getLogger()
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def build_parking(
+    config: ParkingConfig,
+    metrics: Optional[ParkingMetrics] = None,
+) -> tuple[ValetParking, ParkingSlots, TicketStorage]:
+    """Opens the storage, restores the slots and builds the parking system.
+
+    With `metrics` (or `config.metrics`) the parking system and its storage
+    are instrumented; with `config.trace_path` its operations are recorded
+    (the trace is finished at exit), and with `config.history_path` its
+    retrieved tickets are archived. Storages with a history get a slot
+    snapshot saved in the background. Raises SlotsError or ParkingInitError if
+    the config can't be used.
+    """
+    if metrics is None and config.metrics:
+        metrics = ParkingMetrics()
+    storage = STORAGE_BACKENDS[config.storage_backend](Path(config.storage_path))
+    if config.ticket_cache:
+        storage = CachedTicketStorage(storage)
+    if config.write_back_ops:
+        storage = WriteBackTicketStorage(
+            storage,
+            max_pending=config.write_back_ops,
+            max_delay=config.write_back_ms / 1000,
+            metrics=metrics,
+        )
+        # Buffered operations are written on a normal exit.
+        atexit.register(storage.close)
+    if config.history_path:
+        # Outside the write-back buffer, which drops tickets returned
+        # before they were ever written.
+        storage = HistoryTicketStorage(storage, TicketHistory(Path(config.history_path)))
+        atexit.register(storage.history.close)
+    # Tickets still in storage keep their slots after a restart.
+    slots = restore_parking_slots(
+        Slots(config.small_slots, config.medium_slots, config.large_slots),
+        storage,
+        snapshot=Path(config.snapshot_path),
+        concurrent=config.concurrent_slots,
+    )
+    if config.snapshot_interval > 0 and storage.checkpoint() is not None:
+        snapshots = PeriodicSlotSnapshot(
+            slots, storage, Path(config.snapshot_path), config.snapshot_interval
+        )
+        snapshots.start()
+        atexit.register(snapshots.stop)
+    if metrics is not None:
+        metrics.track_slots(slots)
+        storage = InstrumentedStorage(storage, metrics)
+    parking = parking_init(parking_class=PARKING_CLASS, slots=slots, storage=storage)
+    if metrics is not None:
+        parking = InstrumentedParking(parking, metrics)
+    if config.trace_path:
+        parking = TraceRecorder(parking, Path(config.trace_path))
+        atexit.register(parking.close)
+    return parking, slots, storage
+
+
+_parking: Optional[ValetParking] = None
+_parking_lock = threading.Lock()
+
+
+def get_parking(config: Optional[ParkingConfig] = None) -> ValetParking:
+    """Returns the process-wide parking system, building it on first use.
 
-try:
-    slots = get_parking_slots(small=SMALL_SLOTS, medium=MEDIUM_SLOTS, large=LARGE_SLOTS)
-except SlotsError as e:
-    logging.error(f"Slots initialization error: {e}")
-    print(e)
-    exit(1)
-
-try:
-    parking = parking_init(parking_class=PARKING_CLASS, slots=slots)
-except ParkingInitError as e:
-    logging.error(f"Parking initialization error: {e}")
-    print(e)
-    exit(1)
+    Without a config, settings come from `load_config()`.
+    """
+    global _parking
+    if _parking is None:
+        with _parking_lock:
+            if _parking is None:
+                _parking, *_ = build_parking(config or load_config())
+    return _parking
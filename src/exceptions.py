@@ -50,3 +50,18 @@ class RetrieveStorageError(TicketStorageErrors):
 class TicketNotFoundError(RetrieveStorageError):
     def __init__(self, message="Ticket not found in storage."):
         super().__init__(message)
+
+
+class StorageLockError(TicketStorageErrors):
+    def __init__(self, message="Ticket storage is locked by another process."):
+        super().__init__(message)
+
+
+class InvalidTicketError(ParkingSystemErrors):
+    def __init__(self, message="Ticket id is not valid."):
+        super().__init__(message)
+
+
+class ReservationError(ParkingSystemErrors):
+    def __init__(self, message="Reservation not found or expired."):
+        super().__init__(message)
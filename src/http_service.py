@@ -0,0 +1,298 @@
+"""Local HTTP/JSON front end for one long-lived parking system.
+
+Endpoints:
+    POST /park          {"size": "SMALL"}
+    POST /return        {"ticket_id": "..."}
+    GET  /availability
+    GET  /metrics       (Prometheus text, when metrics are enabled)
+
+Run with: python -m src.http_service [--host 127.0.0.1] [--port 8080]
+"""
+
+import argparse
+import json
+import logging
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Optional
+from src.metrics import ParkingMetrics
+from src.parking_slots import Size
+from src.parking_system import ValetParking
+from src.exceptions import CarSizeError, ParkingSystemErrors
+
+logger = logging.getLogger(__name__)
+
+
+class ParkingRequestHandler(BaseHTTPRequestHandler):
+    """Serves park, return and availability requests as JSON.
+
+    HTTP/1.1 keeps connections alive, so a gate terminal reuses one
+    connection for all its requests. Each `handle` serves a single request;
+    the server watches a kept-alive connection for the next one.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Bounds how long a request that stalls half-sent can hold a worker.
+    timeout = 5
+    # Headers and body are written separately; without TCP_NODELAY each
+    # kept-alive response waits for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    server: "ParkingHTTPServer"
+
+    def handle(self) -> None:
+        self.close_connection = True
+        self.handle_one_request()
+
+    def finish(self) -> None:
+        # A kept-alive connection stays open, with its buffered reader, until
+        # the server hands it to a worker again.
+        if self.close_connection:
+            super().finish()
+        else:
+            self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path == "/availability":
+            # The published snapshot is read without a lock; its version is
+            # the ETag, so pollers get a bodiless 304 until it changes.
+            availability = self.server.parking.availability()
+            etag = f'"{availability.version}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self._reply(
+                HTTPStatus.OK,
+                {size.name: free for size, free in availability.free.items()},
+                {"ETag": etag},
+            )
+        elif self.path == "/metrics" and self.server.metrics is not None:
+            data = self.server.metrics.to_prometheus().encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        body = self._read_json()
+        if body is None:
+            return
+        try:
+            if self.path == "/park":
+                self._park(body)
+            elif self.path == "/return":
+                self._return(body)
+            else:
+                self._reply(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+        except (KeyError, TypeError) as e:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {e}"})
+        except ParkingSystemErrors as e:
+            self._reply(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)})
+
+    def _park(self, body: dict) -> None:
+        car_size = Size[body["size"]]
+        try:
+            ticket_id, slot_size = self.server.parking.park_car(car_size)
+        except CarSizeError as e:
+            self._reply(HTTPStatus.CONFLICT, {"error": str(e)})
+            return
+        location = self.server.parking.locate_car(ticket_id)
+        self._reply(
+            HTTPStatus.OK,
+            {
+                "ticket_id": ticket_id,
+                "slot_size": slot_size,
+                "slot_number": None if location is None else location[1],
+            },
+        )
+
+    def _return(self, body: dict) -> None:
+        ticket_id = str(body["ticket_id"])
+        # Only tickets issued before compact IDs need their size.
+        slot_size = Size[body["size"]] if "size" in body else None
+        if self.server.parking.return_car(ticket_id, slot_size):
+            self._reply(HTTPStatus.OK, {"returned": True})
+        else:
+            self._reply(HTTPStatus.NOT_FOUND, {"returned": False})
+
+    def _read_json(self) -> Optional[dict]:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Where the body ends is unknown, so the connection can't be reused.
+            self._reply(
+                HTTPStatus.BAD_REQUEST,
+                {"error": "Invalid Content-Length"},
+                {"Connection": "close"},
+            )
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": "Body must be a JSON object"})
+            return None
+        return body
+
+    def _reply(
+        self, status: HTTPStatus, payload: Any, headers: Optional[dict[str, str]] = None
+    ) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format, *args)
+
+
+class ParkingHTTPServer(HTTPServer):
+    """HTTP server handing requests to a bounded pool of worker threads.
+
+    At most `workers` requests are served at once; further requests wait in
+    the pool's queue until a worker is free. Between requests, kept-alive
+    connections are watched by one thread instead of holding a worker, and
+    are closed after `idle_timeout` seconds without a request.
+    """
+
+    daemon_threads = True
+    idle_timeout = 30.0
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        parking: ValetParking,
+        workers: int = 16,
+        metrics: Optional[ParkingMetrics] = None,
+    ):
+        super().__init__(address, ParkingRequestHandler)
+        self.parking = parking
+        self.metrics = metrics
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._closing = False
+        self._idle: deque[ParkingRequestHandler] = deque()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup, self._wake = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._watcher = threading.Thread(target=self._watch_idle, daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self._pool.submit(self._serve, request, client_address)
+
+    def _serve(
+        self,
+        request: Any,
+        client_address: Any,
+        handler: Optional[ParkingRequestHandler] = None,
+    ) -> None:
+        """Serves one request of a connection, then parks it if kept alive."""
+        try:
+            if handler is None:
+                handler = self.RequestHandlerClass(request, client_address, self)
+            else:
+                handler.handle()
+                handler.finish()
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection:
+            self.shutdown_request(request)
+        elif self._has_buffered_request(handler):
+            self._pool.submit(self._serve, request, client_address, handler)
+        else:
+            handler.idle_since = time.monotonic()
+            self._idle.append(handler)
+            self._wake.send(b"\0")
+
+    @staticmethod
+    def _has_buffered_request(handler: ParkingRequestHandler) -> bool:
+        # A pipelined request may already sit in the reader's buffer, where
+        # the selector can't see it. Peeking without blocking finds it.
+        handler.connection.settimeout(0)
+        try:
+            return bool(handler.rfile.peek(1))
+        finally:
+            handler.connection.settimeout(handler.timeout)
+
+    def _watch_idle(self) -> None:
+        """Hands connections to a worker when their next request arrives."""
+        while not self._closing:
+            for key, _ in self._selector.select(timeout=1.0):
+                if key.fileobj is self._wakeup:
+                    self._wakeup.recv(4096)
+                    continue
+                self._selector.unregister(key.fileobj)
+                handler = key.data
+                self._pool.submit(
+                    self._serve, handler.request, handler.client_address, handler
+                )
+            while self._idle:
+                handler = self._idle.popleft()
+                self._selector.register(handler.request, selectors.EVENT_READ, handler)
+            expired = time.monotonic() - self.idle_timeout
+            for key in list(self._selector.get_map().values()):
+                if key.data is not None and key.data.idle_since < expired:
+                    self._selector.unregister(key.fileobj)
+                    self.shutdown_request(key.fileobj)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._closing = True
+        self._wake.send(b"\0")
+        self._watcher.join()
+        for key in list(self._selector.get_map().values()):
+            if key.data is not None:
+                self.shutdown_request(key.fileobj)
+        self._selector.close()
+        self._wakeup.close()
+        self._wake.close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main() -> None:
+    from src.config import build_parking, configure_logging, load_config
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    config = load_config(concurrent_slots=True)
+    configure_logging(config)
+    metrics = ParkingMetrics() if config.metrics else None
+    parking, _, _ = build_parking(config, metrics)
+    server = ParkingHTTPServer(
+        (args.host, args.port), parking, workers=args.workers, metrics=metrics
+    )
+    logger.info("Serving parking on http://%s:%d", args.host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Any, Iterable, Optional, Union
+from src.availability import Availability
+from src.parking_slots import Size, ParkingSlots
+from src.parking_system import CarBatchResult, ValetParking
+from src.ticket_ids import resolve_ticket, split_tickets
+from src.ticket_storage import ForwardingTicketStorage, TicketStorage
+
+# Upper bounds (seconds) of the latency histogram buckets, plus +Inf.
+LATENCY_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+# Size label of bulk operations, which cover cars of every size.
+ALL_SIZES = "ALL"
+
+# Size label of returns whose ticket names no size.
+UNKNOWN_SIZE = "UNKNOWN"
+
+_PREFIX = "valet"
+
+# Storages may hand back plain ints; IntEnum members hash like them.
+_SIZE_NAMES = {size: size.name for size in Size}
+
+
+class ParkingMetrics:
+    """Latency histograms, outcome counters and slot gauges of a parking system.
+
+    Operations are labelled by name and Size. Gauges are read from the
+    tracked slots only when the metrics are exported, so they add nothing
+    to the request path. Without a ParkingMetrics nothing is wrapped and
+    instrumentation costs nothing at all.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # (operation, size) -> per-bucket counts, the last one being +Inf
+        self._histograms: dict[tuple[str, str], list[int]] = {}
+        self._sums: dict[tuple[str, str], float] = {}
+        # (operation, size, outcome) -> count
+        self._counters: dict[tuple[str, str, str], int] = {}
+        # name -> running total, for amounts that aren't operations
+        self._totals: dict[str, float] = {}
+        self._slots: Optional[ParkingSlots] = None
+
+    def track_slots(self, slots: ParkingSlots) -> None:
+        """Reports the occupancy of these slots as gauges."""
+        self._slots = slots
+
+    def observe(self, operation: str, size: str, seconds: float, ok: bool) -> None:
+        """Records one operation with its latency and outcome."""
+        bucket = bisect_left(self._buckets, seconds)
+        key = (operation, size)
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(self._buckets) + 1)
+                self._sums[key] = 0.0
+            counts[bucket] += 1
+            self._sums[key] += seconds
+            self._count(operation, size, ok)
+
+    def count(self, operation: str, size: str, ok: bool) -> None:
+        """Records the outcome of an operation timed elsewhere."""
+        with self._lock:
+            self._count(operation, size, ok)
+
+    def add(self, name: str, amount: float) -> None:
+        """Adds to a running total, such as the number of operations flushed."""
+        with self._lock:
+            self._totals[name] = self._totals.get(name, 0) + amount
+
+    def _count(self, operation: str, size: str, ok: bool) -> None:
+        key = (operation, size, "success" if ok else "failure")
+        self._counters[key] = self._counters.get(key, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns the current values as plain dicts.
+
+        Histogram buckets are cumulative and keyed by their upper bound.
+        """
+        with self._lock:
+            histograms = {key: list(counts) for key, counts in self._histograms.items()}
+            sums = dict(self._sums)
+            counters = dict(self._counters)
+            totals = dict(self._totals)
+
+        operations: dict[str, dict[str, dict[str, Any]]] = {}
+        for (operation, size), counts in histograms.items():
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self._buckets + (float("inf"),), counts):
+                cumulative += count
+                buckets[bound] = cumulative
+            operations.setdefault(operation, {})[size] = {
+                "count": cumulative,
+                "sum_seconds": sums[(operation, size)],
+                "buckets": buckets,
+            }
+        for (operation, size, outcome), count in counters.items():
+            stats = operations.setdefault(operation, {}).setdefault(size, {})
+            stats[outcome] = count
+        return {"operations": operations, "totals": totals, "slots": self._slot_gauges()}
+
+    def _slot_gauges(self) -> dict[str, dict[str, int]]:
+        slots = self._slots
+        if slots is None:
+            return {}
+        gauges = {}
+        for size in Size:
+            free, reserved, capacity = slots[size], slots.reserved(size), slots.capacity(size)
+            held = slots.held(size)
+            gauges[size.name] = {
+                "free": free,
+                "reserved": reserved,
+                "held": held,
+                "occupied": capacity - free - reserved - held,
+                "capacity": capacity,
+            }
+        return gauges
+
+    def to_prometheus(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {_PREFIX}_operation_duration_seconds Latency of parking and storage operations.",
+            f"# TYPE {_PREFIX}_operation_duration_seconds histogram",
+        ]
+        for operation, sizes in sorted(snapshot["operations"].items()):
+            for size, stats in sorted(sizes.items()):
+                if "buckets" not in stats:
+                    continue
+                labels = f'operation="{operation}",size="{size}"'
+                for bound, count in stats["buckets"].items():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f'{_PREFIX}_operation_duration_seconds_bucket{{{labels},le="{le}"}} {count}'
+                    )
+                lines.append(
+                    f"{_PREFIX}_operation_duration_seconds_sum{{{labels}}} {stats['sum_seconds']!r}"
+                )
+                lines.append(
+                    f"{_PREFIX}_operation_duration_seconds_count{{{labels}}} {stats['count']}"
+                )
+
+        lines.append(f"# HELP {_PREFIX}_operations_total Parking and storage operations by outcome.")
+        lines.append(f"# TYPE {_PREFIX}_operations_total counter")
+        for operation, sizes in sorted(snapshot["operations"].items()):
+            for size, stats in sorted(sizes.items()):
+                for outcome in ("success", "failure"):
+                    if outcome in stats:
+                        lines.append(
+                            f'{_PREFIX}_operations_total{{operation="{operation}",'
+                            f'size="{size}",outcome="{outcome}"}} {stats[outcome]}'
+                        )
+
+        for name, total in sorted(snapshot["totals"].items()):
+            lines.append(f"# TYPE {_PREFIX}_{name}_total counter")
+            lines.append(f"{_PREFIX}_{name}_total {total}")
+
+        for gauge in ("free", "reserved", "held", "occupied", "capacity"):
+            if not snapshot["slots"]:
+                break
+            lines.append(f"# HELP {_PREFIX}_slots_{gauge} Number of {gauge} slots.")
+            lines.append(f"# TYPE {_PREFIX}_slots_{gauge} gauge")
+            for size, gauges in snapshot["slots"].items():
+                lines.append(f'{_PREFIX}_slots_{gauge}{{size="{size}"}} {gauges[gauge]}')
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedStorage(ForwardingTicketStorage):
+    """Times `save` and `retrieve` of another storage; the rest is passed on."""
+
+    def __init__(self, storage: TicketStorage, metrics: ParkingMetrics) -> None:
+        super().__init__(storage)
+        self._metrics = metrics
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        start, ok = perf_counter(), False
+        try:
+            ok = self._storage.save(ticket_id, slot_size, slot_number)
+            return ok
+        finally:
+            self._metrics.observe(
+                "storage_save", _SIZE_NAMES[slot_size], perf_counter() - start, ok
+            )
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        start, ok = perf_counter(), False
+        try:
+            ok = self._storage.retrieve(ticket_id, slot_size)
+            return ok
+        finally:
+            self._metrics.observe(
+                "storage_retrieve", _SIZE_NAMES[slot_size], perf_counter() - start, ok
+            )
+
+    def save_many(
+        self, tickets: list[tuple[str, Size, Optional[int]]]
+    ) -> list[bool]:
+        start = perf_counter()
+        saved = self._storage.save_many(tickets)
+        self._metrics.observe("storage_save_many", ALL_SIZES, perf_counter() - start, True)
+        for (_, slot_size, _), ok in zip(tickets, saved):
+            self._metrics.count("storage_save", _SIZE_NAMES[slot_size], ok)
+        return saved
+
+    def retrieve_many(self, tickets: list[tuple[str, Size]]) -> list[bool]:
+        start = perf_counter()
+        retrieved = self._storage.retrieve_many(tickets)
+        self._metrics.observe(
+            "storage_retrieve_many", ALL_SIZES, perf_counter() - start, True
+        )
+        for (_, slot_size), ok in zip(tickets, retrieved):
+            self._metrics.count("storage_retrieve", _SIZE_NAMES[slot_size], ok)
+        return retrieved
+
+
+class InstrumentedParking(ValetParking):
+    """Times park and return calls of another parking system."""
+
+    def __init__(self, parking: ValetParking, metrics: ParkingMetrics) -> None:
+        self._parking = parking
+        self._metrics = metrics
+
+    def park_car(self, car_size: Size) -> tuple[str, str]:
+        start, ok = perf_counter(), False
+        try:
+            ticket = self._parking.park_car(car_size)
+            ok = True
+            return ticket
+        finally:
+            self._metrics.observe(
+                "park_car", _SIZE_NAMES[car_size], perf_counter() - start, ok
+            )
+
+    def return_car(self, ticket_id: str, slot_size: Optional[Size] = None) -> bool:
+        start, ok = perf_counter(), False
+        try:
+            ok = self._parking.return_car(ticket_id, slot_size)
+            return ok
+        finally:
+            size = resolve_ticket(ticket_id, slot_size)[1]
+            self._metrics.observe(
+                "return_car",
+                _SIZE_NAMES.get(size, UNKNOWN_SIZE),
+                perf_counter() - start,
+                ok,
+            )
+
+    def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        return self._parking.locate_car(ticket_id)
+
+    def reserve_slot(self, car_size: Size, duration: float) -> tuple[str, str]:
+        start, ok = perf_counter(), False
+        try:
+            ticket = self._parking.reserve_slot(car_size, duration)
+            ok = True
+            return ticket
+        finally:
+            self._metrics.observe(
+                "reserve_slot", _SIZE_NAMES[car_size], perf_counter() - start, ok
+            )
+
+    def park_reserved(self, ticket_id: str) -> tuple[str, str]:
+        start, ok = perf_counter(), False
+        try:
+            ticket = self._parking.park_reserved(ticket_id)
+            ok = True
+            return ticket
+        finally:
+            size = resolve_ticket(ticket_id)[1]
+            self._metrics.observe(
+                "park_reserved",
+                _SIZE_NAMES.get(size, UNKNOWN_SIZE),
+                perf_counter() - start,
+                ok,
+            )
+
+    def cancel_reservation(self, ticket_id: str) -> bool:
+        return self._parking.cancel_reservation(ticket_id)
+
+    def available_slots(self) -> dict[Size, int]:
+        return self._parking.available_slots()
+
+    def availability(self) -> Availability:
+        return self._parking.availability()
+
+    def park_cars(self, car_sizes: Iterable[Size]) -> list[CarBatchResult]:
+        car_sizes = list(car_sizes)
+        start = perf_counter()
+        results = self._parking.park_cars(car_sizes)
+        self._metrics.observe("park_cars", ALL_SIZES, perf_counter() - start, True)
+        for car_size, result in zip(car_sizes, results):
+            self._metrics.count("park_car", _SIZE_NAMES[car_size], result.error is None)
+        return results
+
+    def return_cars(
+        self, tickets: Iterable[Union[str, tuple[str, Optional[Size]]]]
+    ) -> list[CarBatchResult]:
+        tickets = split_tickets(tickets)
+        start = perf_counter()
+        results = self._parking.return_cars(tickets)
+        self._metrics.observe("return_cars", ALL_SIZES, perf_counter() - start, True)
+        for ticket, result in zip(tickets, results):
+            size = _SIZE_NAMES.get(resolve_ticket(*ticket)[1], UNKNOWN_SIZE)
+            self._metrics.count("return_car", size, result.error is None)
+        return results
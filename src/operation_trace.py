@@ -0,0 +1,287 @@
+"""Recording and replay of parking operation traces.
+
+A TraceRecorder in front of a parking system (config option `trace_path`)
+writes every park and return with its time. `replay_trace` drives any
+parking system from such a trace, as fast as possible or at the recorded
+speed, and reports throughput and latency percentiles.
+
+Run with:
+    python -m src.operation_trace parking.trace --backends json journal sqlite mmap
+    python -m src.operation_trace parking.trace --speed 1 --slots 10 20 30
+"""
+
+import argparse
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from time import perf_counter
+from typing import BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional, Union
+from src.availability import Availability
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarBatchResult, CarParking, ValetParking
+from src.exceptions import ParkingInitError, ParkingSystemErrors
+from src.ticket_ids import resolve_ticket, split_tickets
+from src.ticket_storage import close_storage
+
+_MAGIC = b"VPTR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sH")
+# seconds since the recording started, operation, size (0 = unknown), and
+# for returns the number of the park that issued the ticket (-1 = unknown)
+_RECORD = struct.Struct("<dBBxxi")
+_READ_CHUNK = 65536
+
+PARK = 1
+RETURN = 2
+_OPERATION_NAMES = {PARK: "park_car", RETURN: "return_car"}
+
+# Stand-in for tickets the trace doesn't know; it is never found.
+_UNKNOWN_TICKET = "unknown-ticket"
+
+
+class TraceEvent(NamedTuple):
+    """One recorded operation."""
+
+    time: float
+    operation: int
+    size: Optional[Size]
+    park: int
+
+
+class TraceRecorder(ValetParking):
+    """Writes the park and return calls of another parking system to a trace.
+
+    Tickets are not stored in the trace. A return refers to the park that
+    issued its ticket, so a replay can return the ticket it got itself.
+    """
+
+    def __init__(self, parking: ValetParking, path: Path) -> None:
+        self._parking = parking
+        self._lock = threading.Lock()
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+        self._start = perf_counter()
+        self._park_count = 0
+        self._parks: Dict[str, int] = {}
+
+    def park_car(self, car_size: Size) -> tuple[str, str]:
+        now, ticket_id = perf_counter(), None
+        try:
+            ticket = self._parking.park_car(car_size)
+            ticket_id = ticket[0]
+            return ticket
+        finally:
+            with self._lock:
+                self._record_park(now, car_size, ticket_id)
+
+    def return_car(self, ticket_id: str, slot_size: Optional[Size] = None) -> bool:
+        now = perf_counter()
+        with self._lock:
+            self._record_return(now, ticket_id, slot_size)
+        return self._parking.return_car(ticket_id, slot_size)
+
+    def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        return self._parking.locate_car(ticket_id)
+
+    def reserve_slot(self, car_size: Size, duration: float) -> tuple[str, str]:
+        return self._parking.reserve_slot(car_size, duration)
+
+    def park_reserved(self, ticket_id: str) -> tuple[str, str]:
+        """Parks a booked car; the trace records it as a plain park."""
+        ticket = self._parking.park_reserved(ticket_id)
+        with self._lock:
+            self._record_park(perf_counter(), Size[ticket[1]], ticket[0])
+        return ticket
+
+    def cancel_reservation(self, ticket_id: str) -> bool:
+        return self._parking.cancel_reservation(ticket_id)
+
+    def available_slots(self) -> dict[Size, int]:
+        return self._parking.available_slots()
+
+    def availability(self) -> Availability:
+        return self._parking.availability()
+
+    def park_cars(self, car_sizes: Iterable[Size]) -> list[CarBatchResult]:
+        car_sizes = list(car_sizes)
+        now = perf_counter()
+        results = self._parking.park_cars(car_sizes)
+        with self._lock:
+            for car_size, result in zip(car_sizes, results):
+                self._record_park(now, car_size, result.ticket_id)
+        return results
+
+    def return_cars(
+        self, tickets: Iterable[Union[str, tuple[str, Optional[Size]]]]
+    ) -> list[CarBatchResult]:
+        tickets = split_tickets(tickets)
+        now = perf_counter()
+        with self._lock:
+            for ticket_id, slot_size in tickets:
+                self._record_return(now, ticket_id, slot_size)
+        return self._parking.return_cars(tickets)
+
+    def close(self) -> None:
+        """Finishes the trace and closes the wrapped parking system."""
+        with self._lock:
+            self._file.close()
+        close = getattr(self._parking, "close", None)
+        if close is not None:
+            close()
+
+    def _record_park(self, now: float, car_size: Size, ticket_id: Optional[str]) -> None:
+        # Failed parks are recorded too, so a replay sees the same demand.
+        if ticket_id is not None:
+            self._parks[ticket_id] = self._park_count
+        self._park_count += 1
+        self._write(now, PARK, car_size, -1)
+
+    def _record_return(
+        self, now: float, ticket_id: str, slot_size: Optional[Size]
+    ) -> None:
+        ticket_id, slot_size = resolve_ticket(ticket_id.strip(), slot_size)
+        park = self._parks.pop(ticket_id, -1)
+        self._write(now, RETURN, slot_size, park)
+
+    def _write(self, now: float, operation: int, size: Optional[Size], park: int) -> None:
+        if not self._file.closed:
+            self._file.write(_RECORD.pack(now - self._start, operation, size or 0, park))
+
+
+def read_trace(path: Path) -> Iterator[TraceEvent]:
+    """Yields the operations of a trace written by TraceRecorder."""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size or _HEADER.unpack(header) != (_MAGIC, _VERSION):
+            raise ParkingInitError(f"{path} is not a parking trace.")
+        while True:
+            chunk = f.read(_RECORD.size * _READ_CHUNK)
+            usable = len(chunk) - len(chunk) % _RECORD.size
+            for seconds, operation, size, park in _RECORD.iter_unpack(chunk[:usable]):
+                yield TraceEvent(seconds, operation, Size(size) if size else None, park)
+            if len(chunk) < _RECORD.size * _READ_CHUNK:
+                break
+
+
+class ReplayResult(NamedTuple):
+    """Throughput and latency of a replay, per operation."""
+
+    elapsed: float
+    operations: dict[str, dict[str, float]]
+
+    @property
+    def throughput(self) -> float:
+        """Returns the operations replayed per second."""
+        total = sum(stats["ops"] for stats in self.operations.values())
+        return total / self.elapsed if self.elapsed else 0.0
+
+
+def replay_trace(
+    events: Iterable[TraceEvent],
+    parking: ValetParking,
+    speed: Optional[float] = None,
+) -> ReplayResult:
+    """Replays recorded operations against a parking system.
+
+    Without `speed` the operations run back to back; with it they keep the
+    recorded gaps, divided by `speed` (1.0 is the recorded pace).
+    """
+    tickets: Dict[int, str] = {}
+    parks = 0
+    latencies: Dict[int, list[float]] = {PARK: [], RETURN: []}
+    failures = dict.fromkeys(latencies, 0)
+    start = perf_counter()
+    for event in events:
+        if speed is not None:
+            delay = start + event.time / speed - perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        began = perf_counter()
+        ok = True
+        if event.operation == PARK:
+            try:
+                tickets[parks] = parking.park_car(event.size)[0]
+            except ParkingSystemErrors:
+                ok = False
+            parks += 1
+        else:
+            ticket_id = tickets.pop(event.park, _UNKNOWN_TICKET)
+            try:
+                ok = parking.return_car(ticket_id, event.size)
+            except ParkingSystemErrors:
+                ok = False
+        latencies[event.operation].append(perf_counter() - began)
+        failures[event.operation] += not ok
+    elapsed = perf_counter() - start
+    return ReplayResult(
+        elapsed,
+        {
+            _OPERATION_NAMES[operation]: {
+                **summarize(times, elapsed),
+                "failures": failures[operation],
+            }
+            for operation, times in latencies.items()
+            if times
+        },
+    )
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, float]:
+    """Turns raw latencies (seconds) into throughput and percentiles (µs)."""
+    latencies = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1e6
+
+    return {
+        "ops": len(latencies),
+        "ops_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+    }
+
+
+def main() -> None:
+    from src.config import STORAGE_BACKENDS, load_config
+
+    config = load_config()
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("trace", type=Path)
+    parser.add_argument(
+        "--backends", nargs="+", choices=STORAGE_BACKENDS, default=[config.storage_backend]
+    )
+    parser.add_argument(
+        "--slots",
+        type=int,
+        nargs=3,
+        metavar=("S", "M", "L"),
+        default=[config.small_slots, config.medium_slots, config.large_slots],
+    )
+    parser.add_argument("--speed", type=float, help="1 replays at the recorded pace")
+    args = parser.parse_args()
+
+    print(
+        f"{'backend':<8} {'ops/s':>9}  {'operation':<10} {'ops':>8} {'failed':>7}"
+        f" {'p50 µs':>8} {'p90 µs':>8} {'p99 µs':>8}"
+    )
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = STORAGE_BACKENDS[backend](Path(tmp) / f"tickets.{backend}")
+            parking = CarParking(get_parking_slots(*args.slots), storage)
+            result = replay_trace(read_trace(args.trace), parking, args.speed)
+            close_storage(storage)
+        for operation, stats in result.operations.items():
+            print(
+                f"{backend:<8} {result.throughput:>9.0f}  {operation:<10} {stats['ops']:>8}"
+                f" {stats['failures']:>7} {stats['p50_us']:>8.1f} {stats['p90_us']:>8.1f}"
+                f" {stats['p99_us']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import logging
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+from src.availability import Availability
+from src.parking_slots import Size, Slots
+from src.parking_system import CarBatchResult, CarParking, ValetParking, ticket_shard
+from src.ticket_ids import split_tickets
+from src.exceptions import CarSizeError, ParkingInitError, ReservationError
+from src.slot_snapshot import restore_parking_slots
+from src.ticket_storage import TicketStorage
+
+logger = logging.getLogger(__name__)
+
+
+def _build_shard(
+    shard_id: int, slots: Slots, storage_factory: Callable[[], TicketStorage]
+) -> CarParking:
+    """Opens a shard's storage and takes the slots its active tickets hold."""
+    storage = storage_factory()
+    return CarParking(restore_parking_slots(slots, storage), storage, shard_id=shard_id)
+
+
+def _serve_shard(
+    connection: Connection,
+    shard_id: int,
+    slots: Slots,
+    storage_factory: Callable[[], TicketStorage],
+) -> None:
+    """Runs one CarParking shard in a worker process until told to stop."""
+    parking = _build_shard(shard_id, slots, storage_factory)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            connection.send((True, getattr(parking, method)(*args)))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+class ShardProcess(ValetParking):
+    """A CarParking shard living in its own process.
+
+    Calls are forwarded over a pipe, so shards in different processes serve
+    requests in parallel. The storage is built inside the worker by
+    `storage_factory`, which must be picklable (a class or functools.partial).
+    Only calls through this object change the shard, so its last
+    availability snapshot is kept here and reused until the next such call.
+    """
+
+    def __init__(
+        self,
+        shard_id: int,
+        slots: Slots,
+        storage_factory: Callable[[], TicketStorage],
+    ):
+        self._lock = threading.Lock()
+        self._availability: Optional[Availability] = None
+        self._connection, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve_shard,
+            args=(child, shard_id, slots, storage_factory),
+            daemon=True,
+        )
+        self._process.start()
+        child.close()
+
+    def park_car(self, car_size: Size) -> tuple[str, str]:
+        return self._call("park_car", car_size)
+
+    def return_car(self, ticket_id: str, slot_size: Optional[Size] = None) -> bool:
+        return self._call("return_car", ticket_id, slot_size)
+
+    def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        return self._call("locate_car", ticket_id)
+
+    def reserve_slot(self, car_size: Size, duration: float) -> tuple[str, str]:
+        return self._call("reserve_slot", car_size, duration)
+
+    def park_reserved(self, ticket_id: str) -> tuple[str, str]:
+        return self._call("park_reserved", ticket_id)
+
+    def cancel_reservation(self, ticket_id: str) -> bool:
+        return self._call("cancel_reservation", ticket_id)
+
+    def available_slots(self) -> dict[Size, int]:
+        return self._call("available_slots")
+
+    def availability(self) -> Availability:
+        availability = self._availability
+        if availability is None:
+            availability = self._call("availability")
+        return availability
+
+    def park_cars(self, car_sizes: Iterable[Size]) -> list[CarBatchResult]:
+        return self._call("park_cars", list(car_sizes))
+
+    def return_cars(
+        self, tickets: Iterable[Union[str, tuple[str, Optional[Size]]]]
+    ) -> list[CarBatchResult]:
+        return self._call("return_cars", list(tickets))
+
+    def close(self) -> None:
+        """Stops the worker process."""
+        with self._lock:
+            self._connection.send(None)
+            self._connection.close()
+        self._process.join()
+
+    def _call(self, method: str, *args: Any) -> Any:
+        with self._lock:
+            self._connection.send((method, args))
+            ok, result = self._connection.recv()
+            # Set under the lock, so a snapshot never outlives a later change.
+            if method == "availability":
+                self._availability = result if ok else None
+            elif method != "locate_car":
+                self._availability = None
+        if not ok:
+            raise result
+        return result
+
+
+class ParkingCluster(ValetParking):
+    """Routes parking requests across many lots (shards).
+
+    Each shard tags its ticket IDs with its shard number, so a return goes
+    straight to the owning shard. A car that doesn't fit its preferred shard
+    spills over to the nearest neighbouring shards.
+    """
+
+    def __init__(self, shards: Sequence[ValetParking]):
+        if not shards:
+            raise ParkingInitError("A parking cluster needs at least one shard.")
+        self._shards = list(shards)
+
+    def park_car(self, car_size: Size, preferred_shard: int = 0) -> tuple[str, str]:
+        """Parks the car in the preferred shard or the nearest one with room."""
+        for shard_id in self._neighbours(preferred_shard):
+            try:
+                return self._shards[shard_id].park_car(car_size)
+            except CarSizeError:
+                continue
+        logger.warning(
+            "Failed to park car size %s: All lots are full.",
+            car_size.name,
+            extra={"size": car_size.name},
+        )
+        raise CarSizeError
+
+    def return_car(self, ticket_id: str, slot_size: Optional[Size] = None) -> bool:
+        """Returns the car through the shard encoded in its ticket."""
+        shard = self._shard_for(ticket_id)
+        if shard is None:
+            logger.warning(
+                "Failed to return car: Ticket %s has no lot.",
+                ticket_id,
+                extra={"ticket_id": ticket_id},
+            )
+            return False
+        return shard.return_car(ticket_id, slot_size)
+
+    def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        shard = self._shard_for(ticket_id)
+        return None if shard is None else shard.locate_car(ticket_id)
+
+    def reserve_slot(
+        self, car_size: Size, duration: float, preferred_shard: int = 0
+    ) -> tuple[str, str]:
+        """Holds a slot in the preferred shard or the nearest one with room."""
+        for shard_id in self._neighbours(preferred_shard):
+            try:
+                return self._shards[shard_id].reserve_slot(car_size, duration)
+            except CarSizeError:
+                continue
+        raise CarSizeError
+
+    def park_reserved(self, ticket_id: str) -> tuple[str, str]:
+        shard = self._shard_for(ticket_id)
+        if shard is None:
+            raise ReservationError(f"Ticket {ticket_id} has no lot.")
+        return shard.park_reserved(ticket_id)
+
+    def cancel_reservation(self, ticket_id: str) -> bool:
+        shard = self._shard_for(ticket_id)
+        return False if shard is None else shard.cancel_reservation(ticket_id)
+
+    def available_slots(self) -> dict[Size, int]:
+        """Returns the free slots of each size summed over all lots."""
+        total = dict.fromkeys(Size, 0)
+        for shard in self._shards:
+            for size, free in shard.available_slots().items():
+                total[size] += free
+        return total
+
+    def availability(self) -> Availability:
+        """Returns the snapshots of all lots added up.
+
+        The version is the sum of the lots' versions, so it grows with a
+        change in any lot.
+        """
+        return Availability.combine([shard.availability() for shard in self._shards])
+
+    def park_cars(
+        self, car_sizes: Iterable[Size], preferred_shard: int = 0
+    ) -> list[CarBatchResult]:
+        """Parks a batch in the preferred shard and spills the rest over."""
+        car_sizes = list(car_sizes)
+        results: list[Optional[CarBatchResult]] = [None] * len(car_sizes)
+        waiting = list(range(len(car_sizes)))
+        for shard_id in self._neighbours(preferred_shard):
+            if not waiting:
+                break
+            batch = self._shards[shard_id].park_cars(car_sizes[i] for i in waiting)
+            still_waiting = []
+            for index, result in zip(waiting, batch):
+                results[index] = result
+                if result.ticket_id is None:
+                    still_waiting.append(index)
+            waiting = still_waiting
+        return results
+
+    def return_cars(
+        self, tickets: Iterable[Union[str, tuple[str, Optional[Size]]]]
+    ) -> list[CarBatchResult]:
+        """Groups the tickets by shard and returns each group in one batch."""
+        tickets = split_tickets(tickets)
+        results: list[Optional[CarBatchResult]] = [None] * len(tickets)
+        groups: dict[int, list[int]] = {}
+        for index, (ticket_id, _) in enumerate(tickets):
+            shard_id = ticket_shard(ticket_id)
+            if shard_id is None or not 0 <= shard_id < len(self._shards):
+                results[index] = CarBatchResult(
+                    ticket_id, None, error=f"Ticket {ticket_id} has no lot"
+                )
+            else:
+                groups.setdefault(shard_id, []).append(index)
+        for shard_id, indexes in groups.items():
+            batch = self._shards[shard_id].return_cars(tickets[i] for i in indexes)
+            for index, result in zip(indexes, batch):
+                results[index] = result
+        return results
+
+    def close(self) -> None:
+        """Stops the shards that run in worker processes."""
+        for shard in self._shards:
+            if isinstance(shard, ShardProcess):
+                shard.close()
+
+    def _shard_for(self, ticket_id: str) -> Optional[ValetParking]:
+        shard_id = ticket_shard(ticket_id)
+        if shard_id is None or not 0 <= shard_id < len(self._shards):
+            return None
+        return self._shards[shard_id]
+
+    def _neighbours(self, preferred_shard: int) -> Iterable[int]:
+        """Yields shard numbers by distance from the preferred one."""
+        count = len(self._shards)
+        yield preferred_shard % count
+        for distance in range(1, count // 2 + 1):
+            yield (preferred_shard + distance) % count
+            if (preferred_shard - distance) % count != (preferred_shard + distance) % count:
+                yield (preferred_shard - distance) % count
+
+
+def cluster_init(
+    shard_slots: Sequence[Slots],
+    storage_factories: Sequence[Callable[[], TicketStorage]],
+    processes: bool = False,
+) -> ParkingCluster:
+    """Builds a cluster with one shard per slot configuration.
+
+    With `processes=True` every shard runs in its own worker process.
+    """
+    if len(shard_slots) != len(storage_factories):
+        raise ParkingInitError("Every shard needs its own storage.")
+    shards: list[ValetParking] = []
+    for shard_id, (slots, storage_factory) in enumerate(
+        zip(shard_slots, storage_factories)
+    ):
+        if processes:
+            shards.append(ShardProcess(shard_id, slots, storage_factory))
+        else:
+            shards.append(_build_shard(shard_id, slots, storage_factory))
+    return ParkingCluster(shards)
@@ -1,5 +1,8 @@
-from typing import Any, Mapping, NamedTuple
+from array import array
+import struct
+from typing import Any, Dict, Mapping, NamedTuple, Optional
 from enum import IntEnum
+import threading
 from src.exceptions import SlotsError
 
 
@@ -19,13 +22,125 @@ class Slots(NamedTuple):
     large_slots: int
 
 
+_WORD_BITS = 64
+_BITMAP_HEADER = struct.Struct("<II")
+
+
+class SlotBitmap:
+    """Free list of numbered slots of one size, kept as a bitmap.
+
+    Bit `n % 64` of word `n // 64` is set while slot `n` is free. A summary
+    integer has bit `w` set while word `w` still has a free slot, so finding a
+    free slot takes two lowest-set-bit lookups and freeing one is O(1).
+    """
+
+    __slots__ = ("_words", "_summary", "_capacity", "_free")
+
+    def __init__(self, capacity: int) -> None:
+        self._words = array("Q")
+        self._summary = 0
+        self._capacity = 0
+        self._free = 0
+        self.grow(capacity)
+
+    @property
+    def capacity(self) -> int:
+        """Returns the number of slots in the bitmap."""
+        return self._capacity
+
+    @property
+    def free(self) -> int:
+        """Returns the number of free slots."""
+        return self._free
+
+    def is_free(self, number: int) -> bool:
+        """Tells whether the given slot is free."""
+        return bool(self._words[number >> 6] >> (number & 63) & 1)
+
+    def acquire(self) -> Optional[int]:
+        """Takes the lowest-numbered free slot and returns its number."""
+        summary = self._summary
+        if not summary:
+            return None
+        index = (summary & -summary).bit_length() - 1
+        word = self._words[index]
+        bit = (word & -word).bit_length() - 1
+        word &= word - 1
+        self._words[index] = word
+        if not word:
+            self._summary = summary ^ (1 << index)
+        self._free -= 1
+        return (index << 6) | bit
+
+    def take(self, number: int) -> None:
+        """Marks a specific free slot as occupied."""
+        if not 0 <= number < self._capacity or not self.is_free(number):
+            raise SlotsError(f"Slot {number} is not free.")
+        index = number >> 6
+        word = self._words[index] & ~(1 << (number & 63))
+        self._words[index] = word
+        if not word:
+            self._summary &= ~(1 << index)
+        self._free -= 1
+
+    def release(self, number: int) -> None:
+        """Marks an occupied slot as free again."""
+        if not 0 <= number < self._capacity or self.is_free(number):
+            raise SlotsError(f"Slot {number} is not occupied.")
+        index = number >> 6
+        self._words[index] |= 1 << (number & 63)
+        self._summary |= 1 << index
+        self._free += 1
+
+    def dump(self) -> bytes:
+        """Serializes the bitmap (words in native byte order)."""
+        return _BITMAP_HEADER.pack(self._capacity, len(self._words)) + self._words.tobytes()
+
+    @classmethod
+    def load(cls, data: bytes, offset: int = 0) -> tuple["SlotBitmap", int]:
+        """Rebuilds a bitmap from `dump` output; returns it and the end offset."""
+        capacity, count = _BITMAP_HEADER.unpack_from(data, offset)
+        start = offset + _BITMAP_HEADER.size
+        end = start + count * 8
+        bitmap = cls(0)
+        bitmap._words.frombytes(data[start:end])
+        bitmap._capacity = capacity
+        bitmap._free = sum(word.bit_count() for word in bitmap._words)
+        bitmap._summary = sum(1 << i for i, word in enumerate(bitmap._words) if word)
+        return bitmap, end
+
+    def grow(self, extra: int) -> None:
+        """Adds `extra` free slots after the existing ones."""
+        start, end = self._capacity, self._capacity + extra
+        while start < end:
+            index, bit = start >> 6, start & 63
+            if index == len(self._words):
+                self._words.append(0)
+            count = min(_WORD_BITS - bit, end - start)
+            self._words[index] |= ((1 << count) - 1) << bit
+            self._summary |= 1 << index
+            start += count
+        self._capacity = end
+        self._free += extra
+
+
 class ParkingSlots(Mapping[Size, int]):
-    """Manages the count of available parking slots for each size."""
+    """Manages the available parking slots of each size.
+
+    Slots are numbered per size, so a parked car can be found by its slot
+    number. The mapping interface reports the number of free slots.
+    """
 
     def __init__(self, slots: Slots) -> None:
-        self._small_slots = slots.small_slots
-        self._medium_slots = slots.medium_slots
-        self._large_slots = slots.large_slots
+        self._bitmaps: Dict[Size, SlotBitmap] = {
+            Size.SMALL: SlotBitmap(slots.small_slots),
+            Size.MEDIUM: SlotBitmap(slots.medium_slots),
+            Size.LARGE: SlotBitmap(slots.large_slots),
+        }
+        self._reserved: Dict[Size, int] = dict.fromkeys(Size, 0)
+        self._held: Dict[Size, int] = dict.fromkeys(Size, 0)
+        # Slots taken for stored tickets that never recorded their number.
+        self._unnumbered: Dict[Size, list[int]] = {size: [] for size in Size}
 
     def __iter__(self) -> Any:
         """Iterates over available slot sizes."""
@@ -37,26 +152,195 @@ class ParkingSlots(Mapping[Size, int]):
 
     def __getitem__(self, key: Size) -> int:
         """Retrieves the number of available slots for a given size."""
-        if key == Size.SMALL:
-            return self._small_slots
-        elif key == Size.MEDIUM:
-            return self._medium_slots
-        elif key == Size.LARGE:
-            return self._large_slots
+        return self._bitmaps[key].free
+
+    def __setitem__(self, name: Size, value: int) -> None:
+        """Sets the number of available slots for a given size.
+
+        Extra slots are added after the existing ones; surplus free slots are
+        taken out of service.
+        """
+        bitmap = self._bitmaps[name]
+        if value > bitmap.free:
+            bitmap.grow(value - bitmap.free)
+        while bitmap.free > value:
+            bitmap.acquire()
+
+    def free_counts(self) -> dict[Size, int]:
+        """Returns the number of free slots of each size, as a new dict."""
+        return {size: bitmap._free for size, bitmap in self._bitmaps.items()}
+
+    def capacity(self, size: Size) -> int:
+        """Returns the total number of slots of the given size."""
+        return self._bitmaps[size].capacity
+
+    def reserve(self, size: Size) -> Optional[int]:
+        """Takes a free slot until it is committed or rolled back.
+
+        Returns the slot number, or None if no slot of this size is free.
+        """
+        number = self._bitmaps[size].acquire()
+        if number is not None:
+            self._reserved[size] += 1
+        return number
+
+    def commit(self, size: Size, number: int) -> None:
+        """Turns a reserved slot into an occupied one."""
+        self._reserved[size] -= 1
+
+    def rollback(self, size: Size, number: int) -> None:
+        """Gives a reserved slot back to the free pool."""
+        self._reserved[size] -= 1
+        self._bitmaps[size].release(number)
+
+    def release(self, size: Size, number: int) -> None:
+        """Frees an occupied slot."""
+        self._bitmaps[size].release(number)
+
+    def reserved(self, size: Size) -> int:
+        """Returns the number of slots reserved but not yet committed."""
+        return self._reserved[size]
+
+    def hold(self, size: Size) -> Optional[int]:
+        """Takes a free slot for a booked car until it is claimed or unheld.
+
+        Held slots are not counted as free. Returns the slot number, or None
+        if no slot of this size is free.
+        """
+        number = self._bitmaps[size].acquire()
+        if number is not None:
+            self._held[size] += 1
+        return number
+
+    def claim(self, size: Size, number: int) -> None:
+        """Turns a held slot into an occupied one."""
+        self._held[size] -= 1
+
+    def unhold(self, size: Size, number: int) -> None:
+        """Gives a held slot back to the free pool."""
+        self._held[size] -= 1
+        self._bitmaps[size].release(number)
+
+    def held(self, size: Size) -> int:
+        """Returns the number of slots held for booked cars."""
+        return self._held[size]
+
+    def occupy(self, size: Size, number: Optional[int]) -> None:
+        """Marks the slot of a known ticket occupied, if it is still free.
+
+        Tickets saved without a slot number take any free slot.
+        """
+        bitmap = self._bitmaps[size]
+        if number is None:
+            number = bitmap.acquire()
+            if number is None:
+                raise SlotsError(f"No free {size.name} slot for a stored ticket.")
+            self._unnumbered[size].append(number)
+        elif number >= bitmap.capacity:
+            raise SlotsError(f"Stored ticket holds missing {size.name} slot {number}.")
+        elif bitmap.is_free(number):
+            bitmap.take(number)
+
+    def vacate(self, size: Size, number: Optional[int]) -> None:
+        """Marks the slot of a retrieved ticket free, if it is still occupied."""
+        bitmap = self._bitmaps[size]
+        if number is not None and number < bitmap.capacity and not bitmap.is_free(number):
+            bitmap.release(number)
+
+    def release_unnumbered(self, size: Size) -> Optional[int]:
+        """Frees a slot taken by `occupy` for a ticket without a slot number.
+
+        Returns the slot number, or None if no such slot is left.
+        """
+        numbers = self._unnumbered[size]
+        if not numbers:
+            return None
+        number = numbers.pop()
+        self._bitmaps[size].release(number)
+        return number
+
+    def dump(self) -> bytes:
+        """Serializes the slot bitmaps of all sizes."""
+        return b"".join(self._bitmaps[size].dump() for size in Size)
+
+    def load(self, data: bytes) -> None:
+        """Replaces the slot bitmaps with ones serialized by `dump`."""
+        offset = 0
+        for size in Size:
+            self._bitmaps[size], offset = SlotBitmap.load(data, offset)
+            self._unnumbered[size].clear()
+
+
+class ConcurrentParkingSlots(ParkingSlots):
+    """ParkingSlots safe to share between threads.
+
+    Each size has its own lock, so operations on different sizes never wait
+    for each other. Locks are held only for the bitmap update itself.
+    """
+
+    def __init__(self, slots: Slots) -> None:
+        super().__init__(slots)
+        self._locks = {size: threading.RLock() for size in Size}
 
     def __setitem__(self, name: Size, value: int) -> None:
-        """Updates the number of available slots for a given size."""
-        if name == Size.SMALL:
-            self._small_slots = value
-        elif name == Size.MEDIUM:
-            self._medium_slots = value
-        elif name == Size.LARGE:
-            self._large_slots = value
+        with self._locks[name]:
+            super().__setitem__(name, value)
+
+    def reserve(self, size: Size) -> Optional[int]:
+        with self._locks[size]:
+            return super().reserve(size)
+
+    def commit(self, size: Size, number: int) -> None:
+        with self._locks[size]:
+            super().commit(size, number)
+
+    def rollback(self, size: Size, number: int) -> None:
+        with self._locks[size]:
+            super().rollback(size, number)
+
+    def release(self, size: Size, number: int) -> None:
+        with self._locks[size]:
+            super().release(size, number)
+
+    def occupy(self, size: Size, number: Optional[int]) -> None:
+        with self._locks[size]:
+            super().occupy(size, number)
+
+    def vacate(self, size: Size, number: Optional[int]) -> None:
+        with self._locks[size]:
+            super().vacate(size, number)
+
+    def release_unnumbered(self, size: Size) -> Optional[int]:
+        with self._locks[size]:
+            return super().release_unnumbered(size)
+
+    def hold(self, size: Size) -> Optional[int]:
+        with self._locks[size]:
+            return super().hold(size)
+
+    def claim(self, size: Size, number: int) -> None:
+        with self._locks[size]:
+            super().claim(size, number)
+
+    def unhold(self, size: Size, number: int) -> None:
+        with self._locks[size]:
+            super().unhold(size, number)
+
+    def dump(self) -> bytes:
+        parts = []
+        for size in Size:
+            with self._locks[size]:
+                parts.append(self._bitmaps[size].dump())
+        return b"".join(parts)
 
 
-def get_parking_slots(small: int, medium: int, large: int) -> ParkingSlots:
+def get_parking_slots(
+    small: int, medium: int, large: int, concurrent: bool = False
+) -> ParkingSlots:
     """Factory function to create a ParkingSlots instance with validation."""
     if small < 0 or medium < 0 or large < 0:
         raise SlotsError
     get_slots_number = Slots(small_slots=small, medium_slots=medium, large_slots=large)
+    if concurrent:
+        return ConcurrentParkingSlots(get_slots_number)
     return ParkingSlots(get_slots_number)
@@ -1,90 +1,586 @@
 import logging
-import re
-import uuid
+import threading
+from contextlib import nullcontext
+from time import perf_counter
 from pathlib import Path
-from typing import Dict, Literal
+from typing import ContextManager, Dict, Iterable, Literal, NamedTuple, Optional, Union
+from src.allocation import AllocationPolicy, best_fit
+from src.availability import Availability
 from src.parking_slots import Size, ParkingSlots
-from src.exceptions import CarSizeError
+from src.exceptions import (
+    CarSizeError,
+    InvalidTicketError,
+    ManageCarError,
+    ReservationError,
+    SlotsError,
+)
+from src.reservations import ReservationBook
+from src.ticket_ids import (
+    TicketIdGenerator,
+    parse_ticket_id,
+    resolve_ticket,
+    split_tickets,
+)
 from src.ticket_storage import (
     save_ticket_id_to_storage,
     retrieve_ticket_id_from_storage,
+    save_ticket_ids_to_storage,
+    retrieve_ticket_ids_from_storage,
+    TicketIdRecord,
+    TicketStorage,
     TicketJsonFileStorage,
 )
 
 logger = logging.getLogger(__name__)
 
+# Stands in for the storage lock when no other process uses the storage.
+_UNSHARED = nullcontext()
+
+
+class CarBatchResult(NamedTuple):
+    """Outcome of one car in a bulk park or return."""
+
+    ticket_id: Optional[str]
+    slot_size: Optional[str]
+    slot_number: Optional[int] = None
+    error: Optional[str] = None
+
 
 class ValetParking:
     """Abstract base class for a valet parking system."""
 
-    def __init__(self, slots: ParkingSlots) -> None:
+    def __init__(
+        self, slots: ParkingSlots, storage: Optional[TicketStorage] = None
+    ) -> None:
         raise NotImplementedError
 
     def park_car(self, car_size: Size) -> tuple[str, str]:
         """Parks a car of the given size and returns a ticket ID."""
         raise NotImplementedError
 
-    def return_car(self, ticket_id: str, slot_size: Size) -> bool:
-        """Returns a car associated with the given ticket ID."""
+    def return_car(self, ticket_id: str, slot_size: Optional[Size] = None) -> bool:
+        """Returns a car associated with the given ticket ID.
+
+        The slot size is only needed for tickets issued before compact IDs.
+        """
+        raise NotImplementedError
+
+    def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        """Returns the slot size and number of the ticket's car."""
+        raise NotImplementedError
+
+    def reserve_slot(self, car_size: Size, duration: float) -> tuple[str, str]:
+        """Holds a slot for a booked car for `duration` seconds.
+
+        Returns the ticket ID the car will park with and the slot size.
+        """
+        raise NotImplementedError
+
+    def park_reserved(self, ticket_id: str) -> tuple[str, str]:
+        """Parks a booked car in the slot held for its ticket."""
+        raise NotImplementedError
+
+    def cancel_reservation(self, ticket_id: str) -> bool:
+        """Gives the slot held for a ticket back before it expires."""
+        raise NotImplementedError
+
+    def available_slots(self) -> dict[Size, int]:
+        """Returns the number of free slots of each size."""
+        raise NotImplementedError
+
+    def availability(self) -> Availability:
+        """Returns the latest published availability snapshot.
+
+        Unlike `available_slots`, this takes no lock and changes nothing, so
+        it can be polled at any rate without slowing parking down.
+        """
+        raise NotImplementedError
+
+    def park_cars(self, car_sizes: Iterable[Size]) -> list[CarBatchResult]:
+        """Parks a batch of cars and returns a result for each of them."""
+        raise NotImplementedError
+
+    def return_cars(
+        self, tickets: Iterable[Union[str, tuple[str, Optional[Size]]]]
+    ) -> list[CarBatchResult]:
+        """Returns a batch of cars and returns a result for each of them.
+
+        Items are ticket IDs, or (ticket ID, slot size) pairs.
+        """
         raise NotImplementedError
 
 
+class SlotKeeper:
+    """Slot bookkeeping shared by the sync and async parkings.
+
+    Picks slots with the allocation policy, frees expired holds and
+    publishes availability, so every front end behaves the same.
+    """
+
+    def __init__(
+        self,
+        slots: ParkingSlots,
+        policy: AllocationPolicy = best_fit,
+        reservations: Optional[ReservationBook] = None,
+    ):
+        self._slots = slots
+        self._policy = policy
+        self._active_tickets: Dict[str, tuple[Size, int]] = {}
+        # Holds are kept in memory only; a restart gives their slots back.
+        self._reservations = ReservationBook() if reservations is None else reservations
+        # Started with the first hold; frees holds as they run out.
+        self._expiry_timer: Optional[threading.Thread] = None
+        self._expiry_wakeup = threading.Event()
+        self._expiry_lock = threading.Lock()
+        # Writers replace the snapshot under this lock; readers just load
+        # the attribute, which is atomic.
+        self._publish_lock = threading.Lock()
+        self._availability = Availability.of(0, slots, policy)
+
+    def available_slots(self) -> dict[Size, int]:
+        self._expire_reservations()
+        return dict(self._slots)
+
+    def availability(self) -> Availability:
+        """Returns the snapshot published by the last change.
+
+        Holds are freed, and published, as they run out. Changes made to
+        the slots directly are published by the next operation, or by
+        `publish_availability`.
+        """
+        return self._availability
+
+    def publish_availability(self) -> Availability:
+        """Publishes a new snapshot if the free slot counts have changed."""
+        with self._publish_lock:
+            current = self._availability
+            free = self._slots.free_counts()
+            if free != current.free:
+                current = current.updated(free, self._policy)
+                self._availability = current
+            return current
+
+    def _expire_reservations(self) -> None:
+        """Gives the slots of expired holds back to the free pool."""
+        expired = self._reservations.expired()
+        for reservation in expired:
+            self._slots.unhold(reservation.slot_size, reservation.slot_number)
+            logger.info(
+                "Reservation %s expired. Freed slot %s #%d.",
+                reservation.ticket_id,
+                reservation.slot_size.name,
+                reservation.slot_number,
+                extra={
+                    "ticket_id": reservation.ticket_id,
+                    "size": reservation.slot_size.name,
+                    "slot_number": reservation.slot_number,
+                },
+            )
+        if expired:
+            self.publish_availability()
+
+    def _schedule_expiry(self) -> None:
+        """Makes the expiry timer wait for the earliest hold."""
+        with self._expiry_lock:
+            if self._expiry_timer is None:
+                self._expiry_timer = threading.Thread(
+                    target=self._expire_on_time, daemon=True
+                )
+                self._expiry_timer.start()
+                return
+        # The new hold may expire before the one the timer waits for.
+        self._expiry_wakeup.set()
+
+    def _expire_on_time(self) -> None:
+        """Sleeps until the earliest hold is due, then frees the expired ones."""
+        while True:
+            self._expiry_wakeup.wait(self._reservations.time_to_next_expiry())
+            self._expiry_wakeup.clear()
+            self._expire_reservations()
+
+    def _reserve_slot(self, car_size: Size) -> Optional[tuple[Size, int]]:
+        """Reserves a free slot of the first size the policy offers."""
+        for slot_size in self._policy(car_size, self._slots):
+            slot_number = self._slots.reserve(slot_size)
+            if slot_number is not None:
+                return (slot_size, slot_number)
+        return None
+
+    def _free_slot(
+        self, ticket_id: str, slot_size: Size, slot: Optional[tuple[Size, int]]
+    ) -> Optional[int]:
+        """Frees the slot held by a retrieved ticket and returns its number."""
+        self._active_tickets.pop(ticket_id, None)
+        if slot is None:
+            # Tickets stored without a slot number got any free slot on restore.
+            return self._slots.release_unnumbered(slot_size)
+        try:
+            self._slots.release(*slot)
+        except SlotsError:
+            # The ticket is already gone from storage, so the return stands.
+            logger.warning(
+                "Slot %s #%d of ticket %s was already free.",
+                slot[0].name,
+                slot[1],
+                ticket_id,
+                extra={"ticket_id": ticket_id, "size": slot[0].name},
+            )
+        return slot[1]
+
+
 # There is only CarParking here now. But we can easily add other
 # parking classes: for example, TruckParking and etc.
-class CarParking(ValetParking):
-    """Concrete implementation of the valet parking system."""
+class CarParking(SlotKeeper, ValetParking):
+    """Concrete implementation of the valet parking system.
 
-    def __init__(self, slots: ParkingSlots):
-        self._slots = slots
-        self._active_tickets: Dict[str, Size] = {}
+    The slot for a car is chosen by the allocation `policy`, by default the
+    smallest free slot that fits.
+    """
+
+    def __init__(
+        self,
+        slots: ParkingSlots,
+        storage: Optional[TicketStorage] = None,
+        shard_id: Optional[int] = None,
+        policy: AllocationPolicy = best_fit,
+        reservations: Optional[ReservationBook] = None,
+    ):
+        SlotKeeper.__init__(self, slots, policy, reservations)
+        self._shard_id = shard_id
+        # One storage instance lives as long as the parking, so its index
+        # is built once instead of re-reading the file on every request.
+        if storage is None:
+            storage = TicketJsonFileStorage(Path.cwd() / "tickets.json")
+        self._storage = storage
+        self._generate_ticket_id = TicketIdGenerator(shard_id)
+        # Gates sharing the storage report their tickets, so the slots
+        # they took or freed are taken or freed here too.
+        self._shared = storage.subscribe(self._apply_shared_change)
 
-    def _generate_ticket_id(self) -> str:
-        """Generates a unique ticket ID."""
-        return str(uuid.uuid4())
+    def locate_car(self, ticket_id: str) -> Optional[tuple[Size, int]]:
+        """Returns the slot size and number where the ticket's car is parked."""
+        slot = self._active_tickets.get(ticket_id)
+        if slot is None:
+            # Tickets issued before a restart are only known to the storage.
+            record = self._storage.get(ticket_id)
+            if record is not None and record["slot_number"] is not None:
+                slot = (Size(record["slot_size"]), record["slot_number"])
+        return slot
 
     def park_car(self, car_size: Size) -> tuple[str, str]:
         """Internal logic to find a slot and park the car."""
-        for slot_size in Size:
-            if slot_size >= car_size and self._slots[slot_size] > 0:
-                ticket_id = self._generate_ticket_id()
-                save_ticket_id = save_ticket_id_to_storage(
-                    TicketJsonFileStorage(Path.cwd() / "tickets.json"),
-                    ticket_id,
-                    slot_size,
+        start = perf_counter()
+        self._expire_reservations()
+        with self._exclusive():
+            # The slot is reserved first, so concurrent terminals can't both
+            # take the last one while the ticket is written to storage.
+            reserved = self._reserve_slot(car_size)
+            if reserved is None:
+                logger.warning(
+                    "Failed to park car size %s: No suitable slots found.",
+                    car_size.name,
+                    extra={"size": car_size.name},
                 )
+                raise CarSizeError
+            slot_size, slot_number = reserved
 
-                if save_ticket_id:
-                    self._slots[slot_size] -= 1
-                    logger.info(
-                        f"Parked car size {car_size.name} in slot {slot_size.name}. Ticket: {ticket_id}"
-                    )
-                return (ticket_id, slot_size.name)
-        logger.warning(
-            f"Failed to park car size {car_size.name}: No suitable slots found."
+            ticket_id = self._generate_ticket_id(slot_size)
+            try:
+                save_ticket_id = save_ticket_id_to_storage(
+                    self._storage, ticket_id, slot_size, slot_number
+                )
+            except Exception as e:
+                # A storage failure must not keep the slot reserved.
+                self._slots.rollback(slot_size, slot_number)
+                raise ManageCarError(f"Ticket {ticket_id} not saved: {e}") from e
+            if not save_ticket_id:
+                self._slots.rollback(slot_size, slot_number)
+                raise ManageCarError(f"Ticket {ticket_id} not saved")
+            self._slots.commit(slot_size, slot_number)
+            self._active_tickets[ticket_id] = reserved
+        self.publish_availability()
+        logger.info(
+            "Parked car size %s in slot %s #%d. Ticket: %s",
+            car_size.name,
+            slot_size.name,
+            slot_number,
+            ticket_id,
+            extra={
+                "ticket_id": ticket_id,
+                "size": slot_size.name,
+                "slot_number": slot_number,
+                "latency": perf_counter() - start,
+            },
         )
-        raise CarSizeError
+        return (ticket_id, slot_size.name)
 
-    def return_car(self, ticket_id: str, slot_size: Size) -> bool:
+    def return_car(self, ticket_id: str, slot_size: Optional[Size] = None) -> bool:
         """Internal logic to retrieve a car and free the slot."""
-        retrieve_ticket_id = retrieve_ticket_id_from_storage(
-            TicketJsonFileStorage(Path.cwd() / "tickets.json"), ticket_id, slot_size
-        )
+        start = perf_counter()
+        slot = self._active_tickets.get(ticket_id)
+        if slot is not None:
+            # Issued here: the ID is canonical and its slot known, so it
+            # needs no parsing.
+            slot_size = slot[0]
+        else:
+            ticket_id, slot_size = resolve_ticket(ticket_id, slot_size)
+            if slot_size is None:
+                logger.warning(
+                    "Failed to return car: Ticket %s is not valid.",
+                    ticket_id,
+                    extra={"ticket_id": ticket_id},
+                )
+                return False
+            slot = self.locate_car(ticket_id)
+        with self._exclusive():
+            retrieve_ticket_id = retrieve_ticket_id_from_storage(
+                self._storage, ticket_id, slot_size
+            )
+            if retrieve_ticket_id:
+                self._free_slot(ticket_id, slot_size, slot)
 
         if retrieve_ticket_id:
-            self._slots[slot_size] += 1
+            self.publish_availability()
             logger.info(
-                f"Returned car with ticket {ticket_id}. Freed slot {slot_size.name}."
+                "Returned car with ticket %s. Freed slot %s.",
+                ticket_id,
+                slot_size.name,
+                extra={
+                    "ticket_id": ticket_id,
+                    "size": slot_size.name,
+                    "latency": perf_counter() - start,
+                },
             )
             return True
-        logger.warning(f"Failed to return car: Ticket {ticket_id} not found.")
+        logger.warning(
+            "Failed to return car: Ticket %s not found.",
+            ticket_id,
+            extra={"ticket_id": ticket_id, "size": slot_size.name},
+        )
         return False
 
+    def park_cars(self, car_sizes: Iterable[Size]) -> list[CarBatchResult]:
+        """Reserves slots for the whole batch and saves its tickets at once."""
+        self._expire_reservations()
+        results: list[CarBatchResult] = []
+        reserved: list[tuple[int, str, Size, int]] = []
+        with self._exclusive():
+            for car_size in car_sizes:
+                slot = self._reserve_slot(car_size)
+                if slot is None:
+                    logger.warning(
+                        "Failed to park car size %s: No suitable slots found.",
+                        car_size.name,
+                        extra={"size": car_size.name},
+                    )
+                    results.append(
+                        CarBatchResult(None, None, error="No suitable slots found.")
+                    )
+                    continue
+                slot_size, slot_number = slot
+                ticket_id = self._generate_ticket_id(slot_size)
+                reserved.append((len(results), ticket_id, slot_size, slot_number))
+                results.append(CarBatchResult(ticket_id, slot_size.name, slot_number))
+
+            try:
+                saved = save_ticket_ids_to_storage(
+                    self._storage, [ticket for _, *ticket in reserved]
+                )
+            except Exception:
+                # Every reserved slot is rolled back below.
+                logger.exception("Failed to save the tickets of a batch.")
+                saved = [False] * len(reserved)
+            for (index, ticket_id, slot_size, slot_number), is_saved in zip(
+                reserved, saved
+            ):
+                if is_saved:
+                    self._slots.commit(slot_size, slot_number)
+                    self._active_tickets[ticket_id] = (slot_size, slot_number)
+                else:
+                    self._slots.rollback(slot_size, slot_number)
+                    results[index] = CarBatchResult(
+                        None, None, error=f"Ticket {ticket_id} not saved"
+                    )
+        self.publish_availability()
+        logger.info("Parked %d of %d cars in a batch.", sum(saved), len(results))
+        return results
+
+    def return_cars(
+        self, tickets: Iterable[Union[str, tuple[str, Optional[Size]]]]
+    ) -> list[CarBatchResult]:
+        """Retrieves the tickets of the whole batch at once and frees their slots."""
+        resolved = [resolve_ticket(*ticket) for ticket in split_tickets(tickets)]
+        # Invalid tickets are answered without touching the storage.
+        valid = [ticket for ticket in resolved if ticket[1] is not None]
+        results: list[CarBatchResult] = []
+        with self._exclusive():
+            slots = [self.locate_car(ticket_id) for ticket_id, _ in valid]
+            retrieved = retrieve_ticket_ids_from_storage(self._storage, valid)
+            outcomes = zip(slots, retrieved)
+            for ticket_id, slot_size in resolved:
+                if slot_size is None:
+                    results.append(
+                        CarBatchResult(
+                            ticket_id, None, error=f"Ticket {ticket_id} is not valid"
+                        )
+                    )
+                    continue
+                slot, is_retrieved = next(outcomes)
+                if is_retrieved:
+                    slot_number = self._free_slot(ticket_id, slot_size, slot)
+                    results.append(
+                        CarBatchResult(ticket_id, slot_size.name, slot_number)
+                    )
+                else:
+                    results.append(
+                        CarBatchResult(
+                            ticket_id, None, error=f"Ticket {ticket_id} not found"
+                        )
+                    )
+        self.publish_availability()
+        logger.info(
+            "Returned %d of %d cars in a batch.",
+            sum(result.error is None for result in results),
+            len(results),
+        )
+        return results
+
+    def reserve_slot(self, car_size: Size, duration: float) -> tuple[str, str]:
+        """Holds the slot the policy picks until the car comes or time is up."""
+        self._expire_reservations()
+        with self._exclusive():
+            for slot_size in self._policy(car_size, self._slots):
+                slot_number = self._slots.hold(slot_size)
+                if slot_number is not None:
+                    break
+            else:
+                logger.warning(
+                    "Failed to reserve slot for car size %s: No suitable slots found.",
+                    car_size.name,
+                    extra={"size": car_size.name},
+                )
+                raise CarSizeError
+        ticket_id = self._generate_ticket_id(slot_size)
+        self._reservations.add(ticket_id, slot_size, slot_number, duration)
+        self._schedule_expiry()
+        self.publish_availability()
+        logger.info(
+            "Reserved slot %s #%d for %.0f s. Ticket: %s",
+            slot_size.name,
+            slot_number,
+            duration,
+            ticket_id,
+            extra={
+                "ticket_id": ticket_id,
+                "size": slot_size.name,
+                "slot_number": slot_number,
+            },
+        )
+        return (ticket_id, slot_size.name)
+
+    def park_reserved(self, ticket_id: str) -> tuple[str, str]:
+        """Saves the ticket of a booked car and occupies its held slot."""
+        self._expire_reservations()
+        ticket_id, _ = resolve_ticket(ticket_id)
+        reservation = self._reservations.take(ticket_id)
+        if reservation is None:
+            logger.warning(
+                "Failed to park reserved car: Ticket %s has no reservation.",
+                ticket_id,
+                extra={"ticket_id": ticket_id},
+            )
+            raise ReservationError(f"Ticket {ticket_id} has no reservation.")
+        _, slot_size, slot_number, _ = reservation
+        with self._exclusive():
+            try:
+                saved = save_ticket_id_to_storage(
+                    self._storage, ticket_id, slot_size, slot_number
+                )
+            except Exception as e:
+                self._reservations.put(reservation)
+                raise ManageCarError(f"Ticket {ticket_id} not saved: {e}") from e
+            if not saved:
+                self._reservations.put(reservation)
+                raise ManageCarError(f"Ticket {ticket_id} not saved")
+            self._slots.claim(slot_size, slot_number)
+            self._active_tickets[ticket_id] = (slot_size, slot_number)
+        logger.info(
+            "Parked reserved car in slot %s #%d. Ticket: %s",
+            slot_size.name,
+            slot_number,
+            ticket_id,
+            extra={
+                "ticket_id": ticket_id,
+                "size": slot_size.name,
+                "slot_number": slot_number,
+            },
+        )
+        return (ticket_id, slot_size.name)
+
+    def cancel_reservation(self, ticket_id: str) -> bool:
+        ticket_id, _ = resolve_ticket(ticket_id)
+        reservation = self._reservations.take(ticket_id)
+        if reservation is None:
+            return False
+        self._slots.unhold(reservation.slot_size, reservation.slot_number)
+        self.publish_availability()
+        logger.info(
+            "Cancelled reservation %s.", ticket_id, extra={"ticket_id": ticket_id}
+        )
+        return True
+
+    def _exclusive(self) -> ContextManager:
+        """Locks a storage shared with other gates for a slot change.
+
+        Other gates' tickets are applied to the slots first, and none can
+        be written until the block's own ticket is.
+        """
+        return self._storage.exclusive() if self._shared else _UNSHARED
+
+    def _apply_shared_change(self, op: str, record: TicketIdRecord) -> None:
+        """Takes or frees the slot of a ticket another gate saved or retrieved."""
+        slot_size = Size(record["slot_size"])
+        slot_number = record["slot_number"]
+        try:
+            if op == "save":
+                self._slots.occupy(slot_size, slot_number)
+            else:
+                self._active_tickets.pop(record["ticket_id"], None)
+                if slot_number is None:
+                    self._slots.release_unnumbered(slot_size)
+                else:
+                    self._slots.vacate(slot_size, slot_number)
+        except SlotsError as e:
+            logger.warning(
+                "Failed to apply ticket %s of another gate: %s",
+                record["ticket_id"],
+                e,
+                extra={"ticket_id": record["ticket_id"], "size": slot_size.name},
+            )
+        self.publish_availability()
+
+
+
+def ticket_shard(ticket_id: str) -> Optional[int]:
+    """Returns the shard encoded in a ticket ID, or None if it has no shard tag."""
+    try:
+        return parse_ticket_id(ticket_id).shard
+    except InvalidTicketError:
+        pass
+    # Tickets issued before compact IDs look like "s2-<uuid>".
+    tag, _, rest = ticket_id.partition("-")
+    if rest and tag[:1] == "s" and tag[1:].isdigit():
+        return int(tag[1:])
+    return None
+
 
 def parking_init(
-    slots: ParkingSlots, parking_class: type[ValetParking]
+    slots: ParkingSlots,
+    parking_class: type[ValetParking],
+    storage: Optional[TicketStorage] = None,
 ) -> ValetParking:
-    """Initializes the parking system with specific slots and class."""
-    return parking_class(slots=slots)
+    """Initializes the parking system with specific slots, class and storage."""
+    return parking_class(slots=slots, storage=storage)
 
 
 def _action_park_car(parking: ValetParking, car_size: Size) -> None:
@@ -95,12 +591,16 @@ def _action_park_car(parking: ValetParking, car_size: Size) -> None:
         f"Your ticket_id is: {ticket_id}\n"
         f"Your parking_slot_size is: {slot_size}"
     )
+    location = parking.locate_car(ticket_id)
+    if location is not None:
+        print(f"Your parking_slot_number is: {location[1]}")
 
 
-def _action_return_car(parking: ValetParking, ticket_id: str, slot_size: Size) -> None:
+def _action_return_car(
+    parking: ValetParking, ticket_id: str, slot_size: Optional[Size]
+) -> None:
     """Returns a car associated with the given ticket ID."""
-    clean_ticket_id = re.sub(r"[^А-Яа-яA-Za-z0-9-]", "", ticket_id)
-    result = parking.return_car(clean_ticket_id, slot_size)
+    result = parking.return_car(ticket_id.strip(), slot_size)
     if result:
         print("Your car is succefully returned!")
     else:
@@ -111,11 +611,13 @@ def _action_return_car(parking: ValetParking, ticket_id: str, slot_size: Size) -
 def manage_car(
     parking: ValetParking,
     action: Literal["park"] | Literal["return"],
-    size: Size,
+    size: Size | None = None,
     ticket_id: str | None = None,
 ) -> None:
 
     if action == "park":
+        if size is None:
+            raise CarSizeError
         _action_park_car(parking, size)
     elif action == "return":
         if ticket_id is not None:
@@ -0,0 +1,86 @@
+import heapq
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+from src.parking_slots import Size
+
+
+class Reservation(NamedTuple):
+    """A slot held for a booked car until `expires_at` (clock seconds)."""
+
+    ticket_id: str
+    slot_size: Size
+    slot_number: int
+    expires_at: float
+
+
+class ReservationBook:
+    """Outstanding slot holds, ordered by expiry in a heap.
+
+    Adding a hold and expiring one take O(log n). A hold that is claimed or
+    cancelled leaves its heap entry behind; stale entries are skipped when
+    they come up and the heap is rebuilt once they outnumber live holds, so
+    nothing ever scans all holds on a tick.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._holds: Dict[str, Reservation] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def add(
+        self, ticket_id: str, slot_size: Size, slot_number: int, duration: float
+    ) -> Reservation:
+        """Holds a slot for `duration` seconds from now."""
+        reservation = Reservation(
+            ticket_id, slot_size, slot_number, self._clock() + duration
+        )
+        self.put(reservation)
+        return reservation
+
+    def put(self, reservation: Reservation) -> None:
+        """Adds a hold, keeping its expiry time."""
+        with self._lock:
+            self._holds[reservation.ticket_id] = reservation
+            heapq.heappush(self._heap, (reservation.expires_at, reservation.ticket_id))
+
+    def take(self, ticket_id: str) -> Optional[Reservation]:
+        """Removes the hold of a ticket (to claim or cancel it) and returns it.
+
+        A hold past its expiry time is not returned, even if `expired` has
+        not collected it yet.
+        """
+        with self._lock:
+            reservation = self._holds.get(ticket_id)
+            if reservation is None or reservation.expires_at <= self._clock():
+                return None
+            del self._holds[ticket_id]
+            if len(self._heap) > 2 * len(self._holds) + 64:
+                self._heap = [(r.expires_at, r.ticket_id) for r in self._holds.values()]
+                heapq.heapify(self._heap)
+            return reservation
+
+    def time_to_next_expiry(self) -> Optional[float]:
+        """Returns the seconds until the earliest hold may expire, or None."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._clock())
+
+    def expired(self) -> list[Reservation]:
+        """Removes and returns the holds whose time is up."""
+        with self._lock:
+            heap, now = self._heap, self._clock()
+            expired = []
+            while heap and heap[0][0] <= now:
+                expires_at, ticket_id = heapq.heappop(heap)
+                reservation = self._holds.get(ticket_id)
+                if reservation is not None and reservation.expires_at == expires_at:
+                    del self._holds[ticket_id]
+                    expired.append(reservation)
+            return expired
+
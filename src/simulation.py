@@ -0,0 +1,194 @@
+"""Discrete-event simulation of a lot for capacity planning.
+
+Replays arrivals (synthetic, or recorded in a CSV file) against a slot mix
+and allocation policies, and reports how many cars each policy turns away,
+how busy each slot size is and how many cars are parked per hour.
+
+Run with:
+    python -m src.simulation --slots 10 20 30 --days 30 --rate 40 --stay 3
+    python -m src.simulation --slots 10 20 30 --trace arrivals.csv --keep-large 5
+"""
+
+import argparse
+import csv
+import heapq
+import random
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, NamedTuple, Optional
+from src.allocation import ALLOCATION_POLICIES, AllocationPolicy, OverflowThreshold, best_fit
+from src.parking_slots import Size, Slots
+from src.exceptions import ParkingInitError
+
+DEFAULT_MIX = {Size.SMALL: 0.5, Size.MEDIUM: 0.35, Size.LARGE: 0.15}
+
+# Car sizes are drawn this many at a time.
+_CHUNK = 4096
+
+
+class Arrival(NamedTuple):
+    """A car arriving `time` hours into the simulation and staying `stay` hours."""
+
+    time: float
+    car_size: Size
+    stay: float
+
+
+class SimulationResult(NamedTuple):
+    """Outcome of one simulation run, per car size and per slot size."""
+
+    hours: float
+    arrivals: dict[Size, int]
+    rejected: dict[Size, int]
+    utilization: dict[Size, float]
+
+    @property
+    def parked(self) -> int:
+        """Returns the number of cars that got a slot."""
+        return sum(self.arrivals.values()) - sum(self.rejected.values())
+
+    @property
+    def rejection_rate(self) -> float:
+        """Returns the share of arriving cars that were turned away."""
+        total = sum(self.arrivals.values())
+        return sum(self.rejected.values()) / total if total else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Returns the cars parked per hour."""
+        return self.parked / self.hours if self.hours else 0.0
+
+
+def synthetic_traffic(
+    hours: float,
+    arrivals_per_hour: float,
+    mean_stay: float = 2.0,
+    mix: Mapping[Size, float] = DEFAULT_MIX,
+    seed: Optional[int] = None,
+) -> Iterator[Arrival]:
+    """Generates Poisson arrivals with exponentially distributed stays.
+
+    `mix` gives the share of each car size.
+    """
+    rng = random.Random(seed)
+    sizes, weights = list(mix), list(mix.values())
+    expovariate, choices = rng.expovariate, rng.choices
+    stay_rate = 1 / mean_stay
+    time = 0.0
+    while True:
+        for car_size in choices(sizes, weights, k=_CHUNK):
+            time += expovariate(arrivals_per_hour)
+            if time >= hours:
+                return
+            yield Arrival(time, car_size, expovariate(stay_rate))
+
+
+def read_arrivals(path: Path) -> Iterator[Arrival]:
+    """Reads arrivals from a CSV file with `time,car_size,stay` columns.
+
+    Times and stays are in hours, sizes are names such as SMALL, and rows
+    must be sorted by time.
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                yield Arrival(
+                    float(row["time"]), Size[row["car_size"].upper()], float(row["stay"])
+                )
+            except (KeyError, ValueError) as e:
+                raise ParkingInitError(f"Invalid arrival {row} in {path}: {e}")
+
+
+def simulate(
+    slots: Slots,
+    arrivals: Iterable[Arrival],
+    policy: AllocationPolicy = best_fit,
+    hours: Optional[float] = None,
+) -> SimulationResult:
+    """Parks the arriving cars in a lot of `slots` and returns the outcome.
+
+    Only the number of free slots of each size is tracked. Departures due by
+    the time a car arrives are processed first. Utilization is the average
+    share of slots of a size occupied over `hours`, which defaults to the
+    time of the last arrival; stays running past it are cut off.
+    """
+    capacity = dict(zip(Size, slots))
+    free = dict(capacity)
+    arrived = dict.fromkeys(Size, 0)
+    rejected = dict.fromkeys(Size, 0)
+    busy_hours = dict.fromkeys(Size, 0.0)
+    departures: list[tuple[float, Size]] = []
+    heappush, heappop = heapq.heappush, heapq.heappop
+    time = 0.0
+
+    for time, car_size, stay in arrivals:
+        while departures and departures[0][0] <= time:
+            free[heappop(departures)[1]] += 1
+        arrived[car_size] += 1
+        for slot_size in policy(car_size, free):
+            if free[slot_size]:
+                free[slot_size] -= 1
+                busy_hours[slot_size] += stay
+                heappush(departures, (time + stay, slot_size))
+                break
+        else:
+            rejected[car_size] += 1
+
+    hours = time if hours is None else hours
+    for left, slot_size in departures:
+        if left > hours:
+            busy_hours[slot_size] -= left - hours
+    utilization = {
+        size: busy_hours[size] / (capacity[size] * hours)
+        if capacity[size] and hours
+        else 0.0
+        for size in Size
+    }
+    return SimulationResult(hours, arrived, rejected, utilization)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--slots", type=int, nargs=3, required=True, metavar=("S", "M", "L"))
+    parser.add_argument(
+        "--policy", nargs="+", choices=ALLOCATION_POLICIES, default=list(ALLOCATION_POLICIES)
+    )
+    parser.add_argument(
+        "--keep-large", type=int, help="also try best fit holding N large slots back"
+    )
+    parser.add_argument("--trace", type=Path, help="CSV of recorded arrivals")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--rate", type=float, default=40, help="arrivals per hour")
+    parser.add_argument("--stay", type=float, default=3, help="mean stay in hours")
+    parser.add_argument(
+        "--mix", type=float, nargs=3, metavar=("S", "M", "L"), default=list(DEFAULT_MIX.values())
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policies = {name: ALLOCATION_POLICIES[name] for name in args.policy}
+    if args.keep_large is not None:
+        policies[f"keep_large={args.keep_large}"] = OverflowThreshold(
+            {Size.LARGE: args.keep_large}
+        )
+    slots = Slots(*args.slots)
+    print(f"{'policy':<16} {'rejected':>9} {'cars/h':>8}   utilization S/M/L")
+    for name, policy in policies.items():
+        if args.trace:
+            arrivals: Iterable[Arrival] = read_arrivals(args.trace)
+            hours = None
+        else:
+            hours = args.days * 24
+            arrivals = synthetic_traffic(
+                hours, args.rate, args.stay, dict(zip(Size, args.mix)), args.seed
+            )
+        result = simulate(slots, arrivals, policy, hours)
+        usage = " / ".join(f"{result.utilization[size]:.0%}" for size in Size)
+        print(
+            f"{name:<16} {result.rejection_rate:>9.2%} {result.throughput:>8.1f}   {usage}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from src.parking_slots import ParkingSlots, Size, Slots, get_parking_slots
+from src.exceptions import SlotsError
+from src.ticket_storage import TicketStorage
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"VPSS"
+_VERSION = 1
+# magic, version, storage generation, storage offset, crc32 of the bitmaps
+_HEADER = struct.Struct("<4sHqqI")
+
+
+def save_slots_snapshot(
+    slots: ParkingSlots, storage: TicketStorage, snapshot: Path
+) -> bool:
+    """Writes a binary snapshot of slot availability and the storage position.
+
+    Returns False if the storage can't replay changes after a position, in
+    which case a snapshot would be of no use at startup.
+    """
+    checkpoint = storage.checkpoint()
+    if checkpoint is None:
+        return False
+    # The checkpoint is taken before the bitmaps, so every change missing from
+    # them is replayed at startup; replaying a change twice is harmless.
+    bitmaps = slots.dump()
+    header = _HEADER.pack(_MAGIC, _VERSION, *checkpoint, zlib.crc32(bitmaps))
+    tmp_path = snapshot.with_name(snapshot.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header + bitmaps)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot)
+    return True
+
+
+def restore_parking_slots(
+    slots: Slots,
+    storage: TicketStorage,
+    snapshot: Optional[Path] = None,
+    concurrent: bool = False,
+) -> ParkingSlots:
+    """Rebuilds slot availability after a restart.
+
+    Loads the snapshot and replays the storage changes written since it. If
+    there is no usable snapshot, or the result disagrees with the active
+    tickets, availability is rebuilt from the active tickets instead, so a
+    slot held by a ticket is never offered again.
+    """
+    active = Counter(Size(record["slot_size"]) for record in storage.records())
+    if snapshot is not None and snapshot.exists():
+        restored = _restore_from_snapshot(slots, storage, snapshot, concurrent)
+        if restored is not None and _matches(restored, slots, active):
+            return restored
+        logger.warning("Slot snapshot is stale, rebuilding from active tickets.")
+    return _restore_from_records(slots, storage, concurrent)
+
+
+class PeriodicSlotSnapshot:
+    """Saves a slot snapshot every `interval` seconds in a background thread.
+
+    A compaction of the storage makes older snapshots useless, so a new one
+    is also saved after each compaction.
+    """
+
+    def __init__(
+        self,
+        slots: ParkingSlots,
+        storage: TicketStorage,
+        snapshot: Path,
+        interval: float = 60.0,
+    ):
+        self._slots = slots
+        self._storage = storage
+        self._snapshot = snapshot
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._storage.on_compact(self.save)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the thread after writing a final snapshot."""
+        self._stopped.set()
+        self._thread.join()
+        self.save()
+
+    def save(self) -> bool:
+        """Saves a snapshot now; returns False if it couldn't be written."""
+        with self._lock:
+            try:
+                return save_slots_snapshot(self._slots, self._storage, self._snapshot)
+            except (OSError, ValueError) as e:
+                # ValueError: the storage was closed before the snapshot.
+                logger.warning("Failed to save slot snapshot: %s", e)
+                return False
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self.save()
+
+
+def _restore_from_snapshot(
+    slots: Slots, storage: TicketStorage, snapshot: Path, concurrent: bool
+) -> Optional[ParkingSlots]:
+    try:
+        data = snapshot.read_bytes()
+        magic, version, generation, offset, crc = _HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+    bitmaps = data[_HEADER.size :]
+    if magic != _MAGIC or version != _VERSION or zlib.crc32(bitmaps) != crc:
+        return None
+    changes = storage.changes_since((generation, offset))
+    if changes is None:
+        return None
+
+    parking_slots = get_parking_slots(0, 0, 0, concurrent=concurrent)
+    parking_slots.load(bitmaps)
+    try:
+        for op, record in changes:
+            size = Size(record["slot_size"])
+            if op == "save":
+                parking_slots.occupy(size, record["slot_number"])
+            elif op == "retrieve":
+                parking_slots.vacate(size, record["slot_number"])
+    except SlotsError:
+        return None
+    return parking_slots
+
+
+def _restore_from_records(
+    slots: Slots, storage: TicketStorage, concurrent: bool
+) -> ParkingSlots:
+    parking_slots = get_parking_slots(*slots, concurrent=concurrent)
+    for record in storage.records():
+        parking_slots.occupy(Size(record["slot_size"]), record["slot_number"])
+    return parking_slots
+
+
+def _matches(parking_slots: ParkingSlots, slots: Slots, active: Counter) -> bool:
+    """Checks capacities against the config and occupied slots against tickets."""
+    for size, capacity in zip(Size, slots):
+        if parking_slots.capacity(size) != capacity:
+            return False
+        if capacity - parking_slots[size] != active[size]:
+            return False
+    return True
@@ -0,0 +1,243 @@
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+from src.parking_slots import Size
+from src.exceptions import InvalidTicketError
+from src.ticket_ids import format_ticket_key, ticket_key
+from src.ticket_storage import ForwardingTicketStorage, TicketIdRecord, TicketStorage
+
+_EMPTY = -1
+_NO_SLOT = -1
+
+
+class TicketColumnStore(TicketStorage):
+    """In-memory ticket store keeping each field in its own typed array.
+
+    A ticket takes one row: its 64-bit ticket key, an epoch timestamp, one
+    byte for the slot size and an int32 slot number. Rows of retrieved
+    tickets go on a free list and are reused. Tickets are found through an
+    open-addressing hash table of row numbers, so no Python object is kept
+    per ticket. Tickets issued before compact IDs have no key and are kept
+    as plain records on the side.
+
+    The store is not persistent; on its own it suits tests and benchmarks,
+    and `CachedTicketStorage` puts it in front of a persistent storage.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._keys = array("Q")
+        self._dates = array("d")
+        self._sizes = array("B")
+        self._numbers = array("i")
+        self._free_rows = array("I")
+        self._index = array("i", [_EMPTY]) * 8
+        self._mask = 7
+        self._count = 0
+        self._legacy: Dict[str, TicketIdRecord] = {}
+
+    def __len__(self) -> int:
+        return self._count + len(self._legacy)
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        return self.add(ticket_id, slot_size, slot_number, time.time())
+
+    def add(
+        self,
+        ticket_id: str,
+        slot_size: Size,
+        slot_number: Optional[int],
+        timestamp: float,
+    ) -> bool:
+        """Saves a ticket with the given epoch timestamp."""
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            return self._add_legacy(ticket_id, slot_size, slot_number, timestamp)
+        with self._lock:
+            slot, row = self._find(key)
+            if row != _EMPTY:
+                return False
+            if (self._count + 1) * 2 > len(self._index):
+                self._resize(len(self._index) * 2)
+                slot, _ = self._find(key)
+            number = _NO_SLOT if slot_number is None else slot_number
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._keys[row] = key
+                self._dates[row] = timestamp
+                self._sizes[row] = slot_size
+                self._numbers[row] = number
+            else:
+                row = len(self._keys)
+                self._keys.append(key)
+                self._dates.append(timestamp)
+                self._sizes.append(slot_size)
+                self._numbers.append(number)
+            self._index[slot] = row
+            self._count += 1
+            return True
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            with self._lock:
+                record = self._legacy.get(ticket_id)
+                if record is None or record["slot_size"] != slot_size:
+                    return False
+                del self._legacy[ticket_id]
+                return True
+        with self._lock:
+            slot, row = self._find(key)
+            if row == _EMPTY or self._sizes[row] != slot_size:
+                return False
+            self._keys[row] = 0
+            self._free_rows.append(row)
+            self._delete_slot(slot)
+            self._count -= 1
+            return True
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            return self._legacy.get(ticket_id)
+        with self._lock:
+            _, row = self._find(key)
+            return None if row == _EMPTY else self._record(row)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        with self._lock:
+            records = [self._record(row) for row in range(len(self._keys)) if self._keys[row]]
+            records.extend(self._legacy.values())
+        return iter(records)
+
+    def _record(self, row: int) -> TicketIdRecord:
+        number = self._numbers[row]
+        return {
+            "date": str(datetime.fromtimestamp(self._dates[row])),
+            "ticket_id": format_ticket_key(self._keys[row]),
+            "slot_size": self._sizes[row],
+            "slot_number": None if number == _NO_SLOT else number,
+        }
+
+    def _add_legacy(
+        self,
+        ticket_id: str,
+        slot_size: Size,
+        slot_number: Optional[int],
+        timestamp: float,
+    ) -> bool:
+        with self._lock:
+            if ticket_id in self._legacy:
+                return False
+            self._legacy[ticket_id] = {
+                "date": str(datetime.fromtimestamp(timestamp)),
+                "ticket_id": ticket_id,
+                "slot_size": slot_size,
+                "slot_number": slot_number,
+            }
+            return True
+
+    @staticmethod
+    def _hash(key: int) -> int:
+        return key ^ key >> 32
+
+    def _find(self, key: int) -> tuple[int, int]:
+        """Returns the hash slot of the key and its row, or an empty slot."""
+        index, keys, mask = self._index, self._keys, self._mask
+        slot = self._hash(key) & mask
+        while True:
+            row = index[slot]
+            if row == _EMPTY or keys[row] == key:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def _delete_slot(self, slot: int) -> None:
+        """Empties a hash slot, moving later entries of its probe run back."""
+        index, keys, mask = self._index, self._keys, self._mask
+        hole, probe = slot, slot
+        while True:
+            probe = (probe + 1) & mask
+            row = index[probe]
+            if row == _EMPTY:
+                break
+            home = self._hash(keys[row]) & mask
+            # The entry stays if its home lies cyclically in (hole, probe].
+            if (hole < home <= probe) or (probe < hole and (home > hole or home <= probe)):
+                continue
+            index[hole] = row
+            hole = probe
+        index[hole] = _EMPTY
+
+    def _resize(self, size: int) -> None:
+        self._index = array("i", [_EMPTY]) * size
+        self._mask = size - 1
+        for row, key in enumerate(self._keys):
+            if key:
+                slot, _ = self._find(key)
+                self._index[slot] = row
+
+
+class CachedTicketStorage(ForwardingTicketStorage):
+    """Keeps the active tickets of another storage in a TicketColumnStore.
+
+    Writes go to the wrapped storage first and reach the cache once they
+    succeed; lookups (`get`, `records`) are answered by the cache. This
+    lets a storage without an in-memory index, such as SQLite, serve
+    lookups from memory at a few dozen bytes per ticket.
+    """
+
+    def __init__(
+        self, storage: TicketStorage, cache: Optional[TicketColumnStore] = None
+    ) -> None:
+        super().__init__(storage)
+        self._cache = TicketColumnStore() if cache is None else cache
+        for record in storage.records():
+            self._cache.add(
+                record["ticket_id"],
+                Size(record["slot_size"]),
+                record["slot_number"],
+                datetime.fromisoformat(record["date"]).timestamp(),
+            )
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        if not self._storage.save(ticket_id, slot_size, slot_number):
+            return False
+        self._cache.save(ticket_id, slot_size, slot_number)
+        return True
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        if not self._storage.retrieve(ticket_id, slot_size):
+            return False
+        self._cache.retrieve(ticket_id, slot_size)
+        return True
+
+    def save_many(
+        self, tickets: list[tuple[str, Size, Optional[int]]]
+    ) -> list[bool]:
+        saved = self._storage.save_many(tickets)
+        for ticket, ok in zip(tickets, saved):
+            if ok:
+                self._cache.save(*ticket)
+        return saved
+
+    def retrieve_many(self, tickets: list[tuple[str, Size]]) -> list[bool]:
+        retrieved = self._storage.retrieve_many(tickets)
+        for ticket, ok in zip(tickets, retrieved):
+            if ok:
+                self._cache.retrieve(*ticket)
+        return retrieved
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        return self._cache.get(ticket_id)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        return self._cache.records()
@@ -0,0 +1,536 @@
+"""Archive of completed parking stays, partitioned by return time.
+
+Every retrieved ticket becomes one fixed-size record holding its park and
+return times (epoch seconds), ticket key, slot size and slot number. Records
+are appended to one file per partition (a day by default), so the archive
+is never rewritten, and a time range only reads the partitions it covers.
+
+A partition is loaded into typed arrays, one per field, and kept in memory
+while its file doesn't change. Its rows are in return-time order, which is
+the time index: a range is found by bisection, and the aggregations run
+over array slices. The header of each partition records the earliest park
+time in it, so an occupancy query only reads the later partitions that hold
+a car parked before its range ends.
+
+Run with:
+    python -m src.ticket_history history/ --start 2024-05-01 --end 2024-05-08
+"""
+
+import argparse
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import compress
+from operator import sub
+from pathlib import Path
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+from src.parking_slots import Size
+from src.exceptions import InvalidTicketError, ParkingInitError
+from src.ticket_ids import format_ticket_key, ticket_key
+from src.ticket_storage import ForwardingTicketStorage, TicketIdRecord, TicketStorage
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"VPHS"
+_VERSION = 1
+# magic, version, partition start, earliest park time (0 in files written
+# before it was kept, which reads as "any time"); padded so records stay
+# 8-byte aligned
+_HEADER = struct.Struct("<4sH2xdd8x")
+_FIRST_PARKED = struct.Struct("<d")
+_FIRST_PARKED_OFFSET = 16
+# parked at, returned at, ticket key (0 = not a compact ID), slot number,
+# slot size
+_RECORD = struct.Struct("<ddQiB3x")
+_SUFFIX = ".history"
+# bytes.translate tables turning a column of sizes into a 0/1 mask per size
+_SIZE_MASKS = {
+    size: bytes(int(value == size) for value in range(256)) for size in Size
+}
+_NO_SLOT = -1
+
+
+class Stay(NamedTuple):
+    """One completed stay. Tickets issued before compact IDs have no ticket_id."""
+
+    ticket_id: Optional[str]
+    slot_size: Size
+    slot_number: Optional[int]
+    parked_at: float
+    returned_at: float
+
+    @property
+    def dwell(self) -> float:
+        """Returns the seconds the car stayed."""
+        return self.returned_at - self.parked_at
+
+
+class _Columns(NamedTuple):
+    """The records of one partition, one array per field, by return time.
+
+    `by_size` holds the park and return times again split by slot size, and
+    `derived` caches what the aggregations compute from them per size.
+    """
+
+    parked: array
+    returned: array
+    keys: array
+    numbers: array
+    sizes: bytes
+    file_size: int
+    by_size: Dict[Size, tuple[array, array]]
+    derived: Dict[tuple[str, Size], array]
+
+
+class TicketHistory:
+    """Append-only archive of completed stays in `directory`.
+
+    Stays are partitioned by return time into files of `partition_hours`
+    each. Appends are buffered; queries and `flush` write them out first.
+    """
+
+    def __init__(self, directory: Path, partition_hours: int = 24) -> None:
+        if partition_hours <= 0:
+            raise ParkingInitError("History partitions must be at least an hour long.")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._span = partition_hours * 3600
+        self._lock = threading.RLock()
+        self._file: Optional[BinaryIO] = None
+        self._file_start: Optional[float] = None
+        self._file_first_parked = float("inf")
+        self._loaded: Dict[float, _Columns] = {}
+        self._starts = sorted(
+            self._start_of(path) for path in self._directory.glob("*" + _SUFFIX)
+        )
+
+    def add(
+        self,
+        ticket_id: str,
+        slot_size: Size,
+        slot_number: Optional[int],
+        parked_at: float,
+        returned_at: Optional[float] = None,
+    ) -> None:
+        """Archives a stay; the return time defaults to now."""
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            key = 0
+        with self._lock:
+            if returned_at is None:
+                returned_at = time.time()
+            start = returned_at - returned_at % self._span
+            if start != self._file_start:
+                self._open(start)
+            if parked_at < self._file_first_parked:
+                self._lower_first_parked(parked_at)
+            self._file.write(
+                _RECORD.pack(
+                    parked_at,
+                    returned_at,
+                    key,
+                    _NO_SLOT if slot_number is None else slot_number,
+                    slot_size,
+                )
+            )
+
+    def flush(self) -> None:
+        """Writes the buffered stays to their partition files."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file, self._file_start = None, None
+
+    def partitions(self) -> list[float]:
+        """Returns the start times of the partitions, oldest first."""
+        with self._lock:
+            return list(self._starts)
+
+    def stays(self, start: float, end: float) -> Iterator[Stay]:
+        """Iterates over the stays returned in [start, end), by return time."""
+        for columns, lo, hi in self._ranges(start, end):
+            for row in range(lo, hi):
+                key = columns.keys[row]
+                number = columns.numbers[row]
+                yield Stay(
+                    format_ticket_key(key) if key else None,
+                    Size(columns.sizes[row]),
+                    None if number == _NO_SLOT else number,
+                    columns.parked[row],
+                    columns.returned[row],
+                )
+
+    def count(self, start: float, end: float) -> int:
+        """Returns the number of stays returned in [start, end)."""
+        return sum(hi - lo for _, lo, hi in self._ranges(start, end))
+
+    def dwell_percentiles(
+        self,
+        start: float,
+        end: float,
+        percentiles: Sequence[float] = (50, 90, 99),
+    ) -> dict[Size, dict[str, float]]:
+        """Returns dwell-time percentiles (seconds) per size of the stays
+        returned in [start, end), with their count, e.g. {"count": 3, "p50": ...}.
+
+        Sizes without stays are left out.
+        """
+        loaded = self._partitions(start, end)
+        summary = {}
+        for size in Size:
+            runs = []
+            for partition, columns in loaded:
+                if start <= partition and partition + self._span <= end:
+                    runs.append(_sorted_dwells(columns, size))
+                    continue
+                parked, returned = columns.by_size[size]
+                lo = bisect_left(returned, start)
+                hi = bisect_left(returned, end, lo)
+                runs.append(sorted(map(sub, returned[lo:hi], parked[lo:hi])))
+            values: list[float] = []
+            for run in runs:
+                values += run
+            # The runs are sorted already, so this sort only merges them.
+            values.sort()
+            if not values:
+                continue
+            stats: dict[str, float] = {"count": len(values)}
+            for p in percentiles:
+                rank = min(len(values) - 1, int(len(values) * p / 100))
+                stats[f"p{p:g}"] = values[rank]
+            summary[size] = stats
+        return summary
+
+    def hourly_occupancy(
+        self, start: float, end: float, step: float = 3600.0
+    ) -> dict[Size, list[int]]:
+        """Returns per size the peak number of archived cars parked at once
+        in each `step`-second bucket of [start, end).
+
+        Only completed stays are counted; cars still parked are not archived.
+        """
+        start, end = float(start), float(end)
+        buckets = max(0, -int((start - end) // step))
+        loaded = self._overlapping(start, end)
+        occupancy = {}
+        for size in Size:
+            # Stays that ended before the range add nothing to it and stays
+            # that began after it come after its buckets, so whole
+            # partitions can be merged without filtering their stays.
+            events: list[int] = []
+            for columns in loaded:
+                events += _sorted_events(columns, size)
+            events.sort()
+            occupancy[size] = _peaks(events, start, step, buckets)
+        return occupancy
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            yield
+
+    def _partitions(self, start: float, end: float) -> list[tuple[float, _Columns]]:
+        """Returns the partitions holding returns in [start, end) with their starts."""
+        with self._locked():
+            first = start - start % self._span
+            return [
+                (partition, self._load(partition))
+                for partition in self._starts
+                if first <= partition < end
+            ]
+
+    def _ranges(self, start: float, end: float) -> Iterator[tuple[_Columns, int, int]]:
+        """Yields each partition with the rows returned in [start, end)."""
+        for _, columns in self._partitions(start, end):
+            lo = bisect_left(columns.returned, start)
+            hi = bisect_left(columns.returned, end, lo)
+            if lo < hi:
+                yield columns, lo, hi
+
+    def _overlapping(self, start: float, end: float) -> list[_Columns]:
+        """Returns the partitions that can hold stays overlapping [start, end).
+
+        A stay parked before `end` can be returned in any later partition;
+        the earliest park time in a partition's header tells which of them
+        to load.
+        """
+        with self._locked():
+            first = start - start % self._span
+            return [
+                self._load(partition)
+                for partition in self._starts
+                if partition >= first and self._first_parked(partition) < end
+            ]
+
+    def _first_parked(self, partition: float) -> float:
+        with open(self._path(partition), "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return float("inf")
+        return _HEADER.unpack(header)[3]
+
+    def _load(self, partition: float) -> _Columns:
+        path = self._path(partition)
+        file_size = path.stat().st_size
+        columns = self._loaded.get(partition)
+        if columns is not None and columns.file_size == file_size:
+            return columns
+        columns = _read_partition(path)
+        self._loaded[partition] = columns
+        return columns
+
+    def _open(self, start: float) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = self._path(start)
+        # Not opened for appending: the header is updated in place.
+        self._file = open(path, "r+b" if path.exists() else "w+b")
+        header = self._file.read(_HEADER.size)
+        if len(header) == _HEADER.size:
+            self._file_first_parked = _HEADER.unpack(header)[3]
+            # A record cut short by a crash is cut off, so new stays start
+            # on a record boundary.
+            end = self._file.seek(0, os.SEEK_END)
+            whole = end - (end - _HEADER.size) % _RECORD.size
+            if whole != end:
+                self._file.truncate(whole)
+                self._file.seek(whole)
+        else:
+            self._file.seek(0)
+            self._file.truncate()
+            self._file_first_parked = float("inf")
+            self._file.write(
+                _HEADER.pack(_MAGIC, _VERSION, start, self._file_first_parked)
+            )
+        self._file_start = start
+        if start not in self._starts:
+            self._starts.append(start)
+            self._starts.sort()
+
+    def _lower_first_parked(self, parked_at: float) -> None:
+        """Records an earlier park time in the header of the open partition.
+
+        Written before the stay itself, so the header never claims a later
+        time than a stay in the file.
+        """
+        end = self._file.tell()
+        self._file.seek(_FIRST_PARKED_OFFSET)
+        self._file.write(_FIRST_PARKED.pack(parked_at))
+        self._file.seek(end)
+        self._file_first_parked = parked_at
+
+    def _path(self, start: float) -> Path:
+        return self._directory / f"{int(start)}{_SUFFIX}"
+
+    def _start_of(self, path: Path) -> float:
+        try:
+            return float(int(path.name[: -len(_SUFFIX)]))
+        except ValueError:
+            raise ParkingInitError(f"{path} is not a history partition.")
+
+
+def _read_partition(path: Path) -> _Columns:
+    """Reads a partition file into one array per field, sorted by return time."""
+    data = path.read_bytes()
+    if len(data) < _HEADER.size or _HEADER.unpack_from(data)[:2] != (_MAGIC, _VERSION):
+        raise ParkingInitError(f"{path} is not a history partition.")
+    # A record cut short by a crash is dropped.
+    usable = len(data) - _HEADER.size
+    usable -= usable % _RECORD.size
+    rows = memoryview(data)[_HEADER.size : _HEADER.size + usable]
+    # Records are 32 bytes, so each field is a strided view of the rows.
+    parked = _column("d", rows.cast("d")[0::4])
+    returned = _column("d", rows.cast("d")[1::4])
+    keys = _column("Q", rows.cast("Q")[2::4])
+    numbers = _column("i", rows.cast("i")[6::8])
+    sizes = rows.cast("B")[28::32].tobytes()
+    if any(map(float.__gt__, returned, returned[1:])):
+        # The clock went back while appending; put the rows in order.
+        order = sorted(range(len(returned)), key=returned.__getitem__)
+        parked = array("d", map(parked.__getitem__, order))
+        returned = array("d", map(returned.__getitem__, order))
+        keys = array("Q", map(keys.__getitem__, order))
+        numbers = array("i", map(numbers.__getitem__, order))
+        sizes = bytes(map(sizes.__getitem__, order))
+    by_size = {}
+    for size in Size:
+        mask = sizes.translate(_SIZE_MASKS[size])
+        by_size[size] = (
+            array("d", compress(parked, mask)),
+            array("d", compress(returned, mask)),
+        )
+    return _Columns(parked, returned, keys, numbers, sizes, len(data), by_size, {})
+
+
+def _column(typecode: str, view: memoryview) -> array:
+    column = array(typecode)
+    column.frombytes(view.tobytes())
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _sorted_dwells(columns: _Columns, size: Size) -> array:
+    dwells = columns.derived.get(("dwells", size))
+    if dwells is None:
+        parked, returned = columns.by_size[size]
+        dwells = array("d", sorted(map(sub, returned, parked)))
+        columns.derived["dwells", size] = dwells
+    return dwells
+
+
+# Park and return events as integers: the time in 2**-20 s ticks, with the
+# low two bits telling a return (1) from a park (3). A return sorts before
+# a park at the same time, and (key & 3) - 2 is the change in occupancy.
+_TICKS = float(1 << 20)
+
+
+def _sorted_events(columns: _Columns, size: Size) -> array:
+    events = columns.derived.get(("events", size))
+    if events is None:
+        parked, returned = columns.by_size[size]
+        events = _event_keys(parked, 3) + _event_keys(returned, 1)
+        events.sort()
+        events = array("q", events)
+        columns.derived["events", size] = events
+    return events
+
+
+def _event_key(when: float, kind: int) -> int:
+    return int(when * _TICKS) << 2 | kind
+
+
+def _event_keys(times: array, kind: int) -> list[int]:
+    """`_event_key` of many times, inlined to save a call per time."""
+    return [int(when * _TICKS) << 2 | kind for when in times]
+
+
+def _peaks(events: list[int], start: float, step: float, buckets: int) -> list[int]:
+    """Returns the peak occupancy per bucket from sorted event keys."""
+    occupancy = []
+    current = 0
+    for event in events:
+        current += (event & 3) - 2
+        occupancy.append(current)
+    peaks = []
+    for bucket in range(buckets):
+        begin = start + bucket * step
+        lo = bisect_right(events, _event_key(begin, 3))
+        hi = bisect_left(events, _event_key(begin + step, 0), lo)
+        at_begin = occupancy[lo - 1] if lo else 0
+        peaks.append(max(at_begin, max(occupancy[lo:hi], default=at_begin)))
+    return peaks
+
+
+class HistoryTicketStorage(ForwardingTicketStorage):
+    """Archives the tickets retrieved from another storage in a TicketHistory.
+
+    The record of a ticket is read before it is retrieved, so its park time
+    and slot go to the history once the retrieve succeeds.
+    """
+
+    def __init__(self, storage: TicketStorage, history: TicketHistory) -> None:
+        super().__init__(storage)
+        self.history = history
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        record = self._storage.get(ticket_id)
+        if not self._storage.retrieve(ticket_id, slot_size):
+            return False
+        self._archive(record)
+        return True
+
+    def retrieve_many(self, tickets: list[tuple[str, Size]]) -> list[bool]:
+        records = [self._storage.get(ticket_id) for ticket_id, _ in tickets]
+        retrieved = self._storage.retrieve_many(tickets)
+        for record, ok in zip(records, retrieved):
+            if ok:
+                self._archive(record)
+        return retrieved
+
+    def close(self) -> None:
+        """Closes the history and the wrapped storage."""
+        self.history.close()
+        super().close()
+
+    def _archive(self, record: Optional[TicketIdRecord]) -> None:
+        """Adds a retrieved ticket's stay to the history.
+
+        The ticket is already retrieved, so a record that can't be archived
+        is logged and skipped instead of failing the return.
+        """
+        if record is None:
+            return
+        try:
+            self.history.add(
+                record["ticket_id"],
+                Size(record["slot_size"]),
+                record.get("slot_number"),
+                datetime.fromisoformat(record["date"]).timestamp(),
+            )
+        except (KeyError, TypeError, ValueError, OSError, struct.error) as e:
+            logger.warning(
+                "Ticket %s was not archived: %s",
+                record.get("ticket_id"),
+                e,
+                extra={"ticket_id": record.get("ticket_id")},
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Dwell times and peak occupancy from a ticket history."
+    )
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--start", type=datetime.fromisoformat, help="ISO date/time")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="ISO date/time")
+    args = parser.parse_args()
+
+    if not args.directory.is_dir():
+        print(f"No history in {args.directory}.")
+        return
+    history = TicketHistory(args.directory)
+    partitions = history.partitions()
+    if not partitions:
+        print(f"No history in {args.directory}.")
+        return
+    start = args.start.timestamp() if args.start else partitions[0]
+    end = args.end.timestamp() if args.end else time.time()
+    dwells = history.dwell_percentiles(start, end)
+    occupancy = history.hourly_occupancy(start, end)
+    print(f"{'size':<7} {'stays':>8} {'p50 min':>8} {'p90 min':>8} {'p99 min':>8} {'peak':>6}")
+    for size in Size:
+        stats = dwells.get(size)
+        if stats is None:
+            continue
+        print(
+            f"{size.name:<7} {stats['count']:>8} {stats['p50'] / 60:>8.1f}"
+            f" {stats['p90'] / 60:>8.1f} {stats['p99'] / 60:>8.1f}"
+            f" {max(occupancy[size], default=0):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
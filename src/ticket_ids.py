@@ -0,0 +1,151 @@
+import itertools
+import random
+import string
+import zlib
+from typing import Iterable, NamedTuple, Optional, Union
+from src.parking_slots import Size
+from src.exceptions import InvalidTicketError, ParkingInitError
+
+# A ticket ID is a 64-bit integer, from the high bits down:
+#   checksum (8) | slot size (2) | shard + 1 (10, 0 = no shard) | serial (44)
+# rendered as 13 characters of Crockford base32.
+_SERIAL_BITS = 44
+_SHARD_BITS = 10
+_SIZE_BITS = 2
+_PAYLOAD_BITS = _SERIAL_BITS + _SHARD_BITS + _SIZE_BITS
+_SERIAL_MASK = (1 << _SERIAL_BITS) - 1
+_SHARD_MASK = (1 << _SHARD_BITS) - 1
+_SIZE_MASK = (1 << _SIZE_BITS) - 1
+
+MAX_SHARD = _SHARD_MASK - 1
+TICKET_ID_LENGTH = 13
+
+# Crockford base32 leaves out I, L, O and U; the first three are read as the
+# digits they look like. Parsing maps the characters to the digits int()
+# accepts in base 32, so validation runs in C.
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_INT_DIGITS = "0123456789abcdefghijklmnopqrstuv"
+_PAIRS = [first + second for first in _CROCKFORD for second in _CROCKFORD]
+_TO_CROCKFORD = str.maketrans(_INT_DIGITS, _CROCKFORD)
+_FROM_CROCKFORD = str.maketrans(
+    {
+        **{char: "!" for char in string.printable},
+        **{c: d for c, d in zip(_CROCKFORD, _INT_DIGITS)},
+        **{c.lower(): d for c, d in zip(_CROCKFORD, _INT_DIGITS)},
+        **{alias: "1" for alias in "IiLl"},
+        **{alias: "0" for alias in "Oo"},
+        "-": None,
+    }
+)
+
+
+class TicketInfo(NamedTuple):
+    """Fields carried by a ticket ID, with the ID in its canonical spelling."""
+
+    ticket_id: str
+    slot_size: Size
+    shard: Optional[int]
+    serial: int
+
+
+def _checksum(payload: int) -> int:
+    return zlib.crc32(payload.to_bytes(7, "big")) & 0xFF
+
+
+def encode_ticket_id(slot_size: Size, shard: Optional[int], serial: int) -> str:
+    """Renders the ticket fields as a 13-character ticket ID."""
+    payload = (
+        slot_size << (_SERIAL_BITS + _SHARD_BITS)
+        | (0 if shard is None else shard + 1) << _SERIAL_BITS
+        | serial & _SERIAL_MASK
+    )
+    return format_ticket_key(_checksum(payload) << _PAYLOAD_BITS | payload)
+
+
+def format_ticket_key(value: int) -> str:
+    """Renders the 64-bit value of a ticket as its ticket ID."""
+    return (
+        _CROCKFORD[value >> 60]
+        + _PAIRS[value >> 50 & 0x3FF]
+        + _PAIRS[value >> 40 & 0x3FF]
+        + _PAIRS[value >> 30 & 0x3FF]
+        + _PAIRS[value >> 20 & 0x3FF]
+        + _PAIRS[value >> 10 & 0x3FF]
+        + _PAIRS[value & 0x3FF]
+    )
+
+
+def ticket_key(ticket_id: str) -> int:
+    """Validates a ticket ID and returns its 64-bit value.
+
+    Case, dashes and surrounding whitespace are ignored, and I, L and O are
+    read as 1, 1 and 0. Raises InvalidTicketError for anything else that is
+    not a ticket ID, including typos caught by the checksum.
+    """
+    digits = ticket_id.strip().translate(_FROM_CROCKFORD)
+    if len(digits) != TICKET_ID_LENGTH or not digits.isascii():
+        raise InvalidTicketError(f"Ticket {ticket_id!r} is not valid.")
+    try:
+        value = int(digits, 32)
+    except ValueError:
+        raise InvalidTicketError(f"Ticket {ticket_id!r} is not valid.")
+    payload = value & ((1 << _PAYLOAD_BITS) - 1)
+    size = payload >> (_SERIAL_BITS + _SHARD_BITS) & _SIZE_MASK
+    if value >> _PAYLOAD_BITS != _checksum(payload) or not size:
+        raise InvalidTicketError(f"Ticket {ticket_id!r} is not valid.")
+    return value
+
+
+def parse_ticket_id(ticket_id: str) -> TicketInfo:
+    """Validates a ticket ID (see `ticket_key`) and returns its fields."""
+    value = ticket_key(ticket_id)
+    shard = value >> _SERIAL_BITS & _SHARD_MASK
+    return TicketInfo(
+        format_ticket_key(value),
+        Size(value >> (_SERIAL_BITS + _SHARD_BITS) & _SIZE_MASK),
+        shard - 1 if shard else None,
+        value & _SERIAL_MASK,
+    )
+
+
+def resolve_ticket(
+    ticket_id: str, slot_size: Optional[Size] = None
+) -> tuple[str, Optional[Size]]:
+    """Returns the canonical ticket ID and the slot size of a ticket.
+
+    Tickets issued before compact IDs don't carry their size, so for them
+    the ID is kept as given and the size given by the caller is used;
+    without one the size is None and the ticket can't be returned.
+    """
+    try:
+        info = parse_ticket_id(ticket_id)
+    except InvalidTicketError:
+        return ticket_id, slot_size
+    return info.ticket_id, info.slot_size
+
+
+def split_tickets(
+    tickets: Iterable[Union[str, tuple[str, Optional[Size]]]],
+) -> list[tuple[str, Optional[Size]]]:
+    """Turns bulk return items (a ticket, or a ticket and size) into pairs."""
+    return [(ticket, None) if isinstance(ticket, str) else ticket for ticket in tickets]
+
+
+class TicketIdGenerator:
+    """Issues ticket IDs of one lot (shard).
+
+    Serials come from a counter scrambled by a random odd multiplier, so
+    they are unique within the process but don't run in sequence.
+    """
+
+    def __init__(self, shard: Optional[int] = None) -> None:
+        if shard is not None and not 0 <= shard <= MAX_SHARD:
+            raise ParkingInitError(f"Shard {shard} is out of range 0..{MAX_SHARD}.")
+        self._shard = shard
+        rng = random.SystemRandom()
+        self._counter = itertools.count(rng.getrandbits(_SERIAL_BITS))
+        self._multiplier = rng.getrandbits(_SERIAL_BITS) | 1
+
+    def __call__(self, slot_size: Size) -> str:
+        serial = next(self._counter) * self._multiplier & _SERIAL_MASK
+        return encode_ticket_id(slot_size, self._shard, serial)
@@ -1,14 +1,28 @@
 from src.parking_slots import Size
+from src.ticket_ids import format_ticket_key, ticket_key
 from src.exceptions import (
-    TicketNotFoundError,
-    NotSavedTicketError,
+    InvalidTicketError,
+    TicketStorageErrors,
     SaveStorageError,
     RetrieveStorageError,
+    StorageLockError,
 )
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, TypedDict
+from typing import Callable, ContextManager, Dict, Iterator, Optional, TypedDict
 from pathlib import Path
 import json
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
 
 
 class TicketStorage:
@@ -17,65 +31,245 @@ class TicketStorage:
     def __init__(self):
         raise NotImplementedError
 
-    def save(self, ticket_id: str, slot_size: Size) -> bool:
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
         raise NotImplementedError
 
     def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
         raise NotImplementedError
 
+    def get(self, ticket_id: str) -> Optional["TicketIdRecord"]:
+        """Returns the record of an active ticket, or None."""
+        raise NotImplementedError
+
+    def records(self) -> Iterator["TicketIdRecord"]:
+        """Iterates over the records of all active tickets."""
+        raise NotImplementedError
+
+    def checkpoint(self) -> Optional[tuple[int, int]]:
+        """Returns a position in the storage history, if the storage has one.
+
+        Changes made after the position can be replayed with `changes_since`.
+        """
+        return None
+
+    def changes_since(
+        self, checkpoint: tuple[int, int]
+    ) -> Optional[Iterator[tuple[str, "TicketIdRecord"]]]:
+        """Iterates over (op, record) pairs saved or retrieved after `checkpoint`.
+
+        Returns None if the history before the checkpoint is no longer known.
+        """
+        return None
+
+    def on_compact(self, listener: Callable[[], None]) -> None:
+        """Calls `listener()` after each rewrite of the storage history.
+
+        Checkpoints taken before a rewrite can't be replayed any more.
+        Storages without a history never rewrite it.
+        """
+
+    def subscribe(self, listener: "ChangeListener") -> bool:
+        """Calls `listener(op, record)` for each change another process makes.
+
+        Changes are reported, inside `exclusive`, before the operation that
+        notices them. Returns False if no other process can use the storage.
+        """
+        return False
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Keeps other processes from changing the storage during the block.
+
+        Storages used by one process only have nothing to lock.
+        """
+        yield
+
+    @contextmanager
+    def batch(self) -> Iterator["TicketStorage"]:
+        """Groups the operations of the block into one write to the storage.
+
+        Storages that can't defer their writes run each operation as usual.
+        """
+        yield self
+
+    def save_many(
+        self, tickets: list[tuple[str, Size, Optional[int]]]
+    ) -> list[bool]:
+        """Saves several tickets in one batch and reports each result."""
+        with self.batch():
+            return [self.save(*ticket) for ticket in tickets]
+
+    def retrieve_many(self, tickets: list[tuple[str, Size]]) -> list[bool]:
+        """Retrieves several tickets in one batch and reports each result."""
+        with self.batch():
+            return [
+                self.retrieve(ticket_id, slot_size) for ticket_id, slot_size in tickets
+            ]
+
 
 class TicketIdRecord(TypedDict):
     date: str
     ticket_id: str
     slot_size: Size
+    slot_number: Optional[int]
+
+
+# Receives ("save" or "retrieve", record) for a change made by another process.
+ChangeListener = Callable[[str, TicketIdRecord], None]
+
 
+def close_storage(storage: TicketStorage) -> None:
+    """Closes a storage if its backend has anything to close."""
+    close = getattr(storage, "close", None)
+    if close is not None:
+        close()
 
-# self._active_tickets: Dict[str, Size] = {}
-# ticket_id = str(uuid.uuid4())
-# self._active_tickets[ticket_id] = size
+
+class ForwardingTicketStorage(TicketStorage):
+    """Base for storages wrapping another one: every call is passed on.
+
+    Subclasses override the operations they change.
+    """
+
+    def __init__(self, storage: TicketStorage) -> None:
+        self._storage = storage
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        return self._storage.save(ticket_id, slot_size, slot_number)
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        return self._storage.retrieve(ticket_id, slot_size)
+
+    def save_many(
+        self, tickets: list[tuple[str, Size, Optional[int]]]
+    ) -> list[bool]:
+        return self._storage.save_many(tickets)
+
+    def retrieve_many(self, tickets: list[tuple[str, Size]]) -> list[bool]:
+        return self._storage.retrieve_many(tickets)
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        return self._storage.get(ticket_id)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        return self._storage.records()
+
+    def checkpoint(self) -> Optional[tuple[int, int]]:
+        return self._storage.checkpoint()
+
+    def changes_since(
+        self, checkpoint: tuple[int, int]
+    ) -> Optional[Iterator[tuple[str, TicketIdRecord]]]:
+        return self._storage.changes_since(checkpoint)
+
+    def on_compact(self, listener: Callable[[], None]) -> None:
+        self._storage.on_compact(listener)
+
+    def subscribe(self, listener: ChangeListener) -> bool:
+        return self._storage.subscribe(listener)
+
+    def exclusive(self) -> ContextManager[None]:
+        return self._storage.exclusive()
+
+    @contextmanager
+    def batch(self) -> Iterator["ForwardingTicketStorage"]:
+        with self._storage.batch():
+            yield self
+
+    def close(self) -> None:
+        """Closes the wrapped storage, if it can be closed."""
+        close_storage(self._storage)
 
 
 class TicketJsonFileStorage(TicketStorage):
+    """Stores active tickets as a JSON list, indexed in memory by ticket_id.
+
+    The file is parsed once when the storage is opened; lookups then go
+    through the in-memory index and only writes touch the file. A lock keeps
+    the index and the file consistent when the storage is shared by threads.
+    """
+
+    _JSON_INDENT: Optional[int] = 4
 
     def __init__(self, jsonfile: Path):
         self._jsonfile = jsonfile
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
         self._init_storage()
+        self._tickets: Dict[str, TicketIdRecord] = {
+            record["ticket_id"]: record for record in self._read_parking_data()
+        }
 
-    def save(self, ticket_id: str, slot_size: Size) -> bool:
-        try:
-            parking_data = self._read_parking_data()
-            parking_data.append(
-                {
-                    "date": str(datetime.now()),
-                    "ticket_id": ticket_id,
-                    "slot_size": slot_size,
-                }
-            )
-            self._write_parking_data(parking_data)
-        except NotSavedTicketError as e:
-            print(e)
-            print(
-                f"\n Ticket: {ticket_id}, Slot_size: {slot_size}, Date: {str(datetime.now())}"
-            )
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        with self._lock:
+            return self._save(ticket_id, slot_size, slot_number)
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        with self._lock:
+            return self._retrieve(ticket_id, slot_size)
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        return self._tickets.get(ticket_id)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        with self._lock:
+            return iter(list(self._tickets.values()))
+
+    @contextmanager
+    def batch(self) -> Iterator["TicketJsonFileStorage"]:
+        """Writes the file once for all operations of the block."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self._dirty = False
+                    self._write_parking_data(list(self._tickets.values()))
+
+    def _save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int]
+    ) -> bool:
+        if ticket_id in self._tickets:
             return False
-        else:
+        self._tickets[ticket_id] = {
+            "date": str(datetime.now()),
+            "ticket_id": ticket_id,
+            "slot_size": slot_size,
+            "slot_number": slot_number,
+        }
+        if self._batch_depth:
+            self._dirty = True
             return True
+        try:
+            self._write_parking_data(list(self._tickets.values()))
+        except OSError:
+            del self._tickets[ticket_id]
+            return False
+        return True
 
-    # def get_ticket_id_from_storage(self, ticket_id: str, slot_size: Size) -> Optional[str]:
-    #     parking_data = self._read_parking_data()
-    #     for record in parking_data:
-    #         if record["ticket_id"] == ticket_id and record["slot_size"] == slot_size:
-    #             return record["ticket_id"]
-    #     return None
-
-    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
-        parking_data = self._read_parking_data()
-        for i, record in enumerate(parking_data):
-            if record["ticket_id"] == ticket_id and record["slot_size"] == slot_size:
-                del parking_data[i]
-                self._write_parking_data(parking_data)
-                return True
-        return False
+    def _retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        record = self._tickets.get(ticket_id)
+        if record is None or record["slot_size"] != slot_size:
+            return False
+        del self._tickets[ticket_id]
+        if self._batch_depth:
+            self._dirty = True
+            return True
+        try:
+            self._write_parking_data(list(self._tickets.values()))
+        except OSError:
+            self._tickets[ticket_id] = record
+            return False
+        return True
 
     def _init_storage(self) -> None:
         if not self._jsonfile.exists():
@@ -83,35 +277,809 @@ class TicketJsonFileStorage(TicketStorage):
 
     def _read_parking_data(self) -> list[TicketIdRecord]:
         with open(self._jsonfile, "r") as f:
-            return json.load(f)
+            records = json.load(f)
+        for record in records:
+            # Files written before slot numbers were recorded lack the key.
+            record.setdefault("slot_number", None)
+        return records
 
     def _write_parking_data(self, parking_data: list[TicketIdRecord]) -> None:
-        with open(self._jsonfile, "w") as f:
-            json.dump(parking_data, f, ensure_ascii=False, indent=4)
-            # self._jsonfile.write_text(str(history))
+        # The new file replaces the old one in a single rename, so a crash
+        # mid-write never leaves a truncated file behind.
+        tmp_path = self._jsonfile.with_name(f"{self._jsonfile.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(
+                    json.dumps(parking_data, ensure_ascii=False, indent=self._JSON_INDENT)
+                )
+            os.replace(tmp_path, self._jsonfile)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+
+class TicketSharedFileStorage(TicketJsonFileStorage):
+    """JSON ticket file that several processes (gates) can use at once.
+
+    Every operation locks `<file>.lock`: shared to read, exclusive to write,
+    so a ticket saved by one process is never lost to another one's write.
+    The index is reloaded only when another process has replaced the file
+    since this one last saw it. A busy lock is retried with exponential
+    backoff for up to `timeout` seconds; saves and retrieves then fail and
+    lookups raise StorageLockError.
+
+    Each process keeps its own slots, brought up to date from the file:
+    a parking system subscribed to the storage is told about the tickets
+    other gates saved or retrieved, inside `exclusive`, before it picks or
+    frees a slot. A ticket for a slot another ticket already holds is
+    refused. Slot holds for booked cars stay local to the gate that made
+    them. The file is written without indentation, which keeps the time
+    the exclusive lock is held short.
+    """
+
+    _JSON_INDENT = None
+    _MIN_BACKOFF = 0.0001
+    _MAX_BACKOFF = 0.005
+
+    def __init__(self, jsonfile: Path, timeout: float = 10.0):
+        if fcntl is None:
+            raise TicketStorageErrors("File locking is not available on this platform.")
+        self._jsonfile = jsonfile
+        self._timeout = timeout
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self._lock_depth = 0
+        self._version: Optional[tuple[int, int, int]] = None
+        self._tickets: Dict[str, TicketIdRecord] = {}
+        # (slot size, slot number) of every stored ticket that has a number
+        self._taken: set[tuple[int, int]] = set()
+        self._listeners: list[ChangeListener] = []
+        self._lock_fd = os.open(
+            jsonfile.with_name(jsonfile.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644
+        )
+        with self._locked(fcntl.LOCK_EX):
+            self._init_storage()
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        try:
+            with self._locked(fcntl.LOCK_EX):
+                return self._save(ticket_id, slot_size, slot_number)
+        except StorageLockError:
+            return False
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        try:
+            with self._locked(fcntl.LOCK_EX):
+                return self._retrieve(ticket_id, slot_size)
+        except StorageLockError:
+            return False
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        with self._locked(fcntl.LOCK_SH):
+            return self._tickets.get(ticket_id)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        with self._locked(fcntl.LOCK_SH):
+            return iter(list(self._tickets.values()))
+
+    def subscribe(self, listener: ChangeListener) -> bool:
+        with self._lock:
+            self._listeners.append(listener)
+        return True
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Holds the exclusive lock for the block; operations write at once."""
+        with self._locked(fcntl.LOCK_EX):
+            yield
+
+    @contextmanager
+    def batch(self) -> Iterator["TicketSharedFileStorage"]:
+        """Holds the exclusive lock and writes the file once for the block."""
+        with self._locked(fcntl.LOCK_EX), super().batch():
+            yield self
+
+    def save_many(
+        self, tickets: list[tuple[str, Size, Optional[int]]]
+    ) -> list[bool]:
+        try:
+            return super().save_many(tickets)
+        except StorageLockError:
+            return [False] * len(tickets)
+
+    def retrieve_many(self, tickets: list[tuple[str, Size]]) -> list[bool]:
+        try:
+            return super().retrieve_many(tickets)
+        except StorageLockError:
+            return [False] * len(tickets)
+
+    def close(self) -> None:
+        os.close(self._lock_fd)
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        """Holds the file lock (and the thread lock) with fresh tickets.
+
+        Nested calls reuse the lock already held.
+        """
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            self._acquire(operation)
+            self._lock_depth = 1
+            try:
+                self._refresh()
+                yield
+            finally:
+                self._lock_depth = 0
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _acquire(self, operation: int) -> None:
+        deadline = time.monotonic() + self._timeout
+        backoff = self._MIN_BACKOFF
+        while True:
+            try:
+                fcntl.flock(self._lock_fd, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise StorageLockError(f"{self._jsonfile} is locked by another process.")
+                # Jitter keeps waiting processes from retrying in lockstep.
+                time.sleep(backoff * random.uniform(0.5, 1.5))
+                backoff = min(backoff * 2, self._MAX_BACKOFF)
+
+    def _refresh(self) -> None:
+        """Reloads the tickets if another process replaced the file."""
+        try:
+            stat = os.stat(self._jsonfile)
+        except FileNotFoundError:
+            return
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if version == self._version:
+            return
+        previous = self._tickets
+        self._tickets = {
+            record["ticket_id"]: record for record in self._read_parking_data()
+        }
+        self._taken = {
+            (record["slot_size"], record["slot_number"])
+            for record in self._tickets.values()
+            if record["slot_number"] is not None
+        }
+        self._version = version
+        if self._listeners:
+            # Retrievals first, so a slot freed and taken again ends up taken.
+            for ticket_id in previous.keys() - self._tickets.keys():
+                self._notify("retrieve", previous[ticket_id])
+            for ticket_id in self._tickets.keys() - previous.keys():
+                self._notify("save", self._tickets[ticket_id])
+
+    def _notify(self, op: str, record: TicketIdRecord) -> None:
+        for listener in self._listeners:
+            listener(op, record)
+
+    def _save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int]
+    ) -> bool:
+        slot = (slot_size, slot_number)
+        if slot_number is not None and slot in self._taken:
+            return False
+        saved = super()._save(ticket_id, slot_size, slot_number)
+        if saved and slot_number is not None:
+            self._taken.add(slot)
+        return saved
+
+    def _retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        record = self._tickets.get(ticket_id)
+        retrieved = super()._retrieve(ticket_id, slot_size)
+        if retrieved:
+            self._taken.discard((record["slot_size"], record["slot_number"]))
+        return retrieved
+
+    def _write_parking_data(self, parking_data: list[TicketIdRecord]) -> None:
+        super()._write_parking_data(parking_data)
+        stat = os.stat(self._jsonfile)
+        self._version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class TicketJournalFileStorage(TicketStorage):
+    """Append-only journal of park/return records.
+
+    Every save or retrieve appends one JSON line, so an operation costs O(1)
+    I/O instead of rewriting the whole file. The log is replayed on open and
+    compacted in a background thread once it grows past `compact_bytes` or
+    once retrieved tickets make up `compact_ratio` of its records. Each
+    compaction starts a new generation of the log, recorded in its first line.
+    """
+
+    def __init__(
+        self,
+        journal: Path,
+        compact_bytes: int = 4 * 1024 * 1024,
+        compact_ratio: float = 0.5,
+        compact_min_records: int = 1000,
+        fsync: bool = False,
+    ):
+        self._journal = journal
+        self._compact_bytes = compact_bytes
+        self._compact_ratio = compact_ratio
+        self._compact_min_records = compact_min_records
+        self._fsync = fsync
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._tickets: Dict[str, TicketIdRecord] = {}
+        self._tombstones = 0
+        self._generation = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._compact_listeners: list[Callable[[], None]] = []
+        self._replay_journal()
+        self._file = open(self._journal, "a", encoding="utf-8")
+        # Characters appended since the log was opened or compacted; the
+        # file's tell() would flush the write buffer a batch defers.
+        self._appended = 0
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        record: TicketIdRecord = {
+            "date": str(datetime.now()),
+            "ticket_id": ticket_id,
+            "slot_size": slot_size,
+            "slot_number": slot_number,
+        }
+        with self._lock:
+            if ticket_id in self._tickets:
+                return False
+            self._append({"op": "save", **record})
+            self._tickets[ticket_id] = record
+        self._maybe_compact()
+        return True
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        with self._lock:
+            record = self._tickets.get(ticket_id)
+            if record is None or record["slot_size"] != slot_size:
+                return False
+            self._append({"op": "retrieve", **record})
+            del self._tickets[ticket_id]
+            self._tombstones += 1
+        self._maybe_compact()
+        return True
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        return self._tickets.get(ticket_id)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        with self._lock:
+            return iter(list(self._tickets.values()))
+
+    def checkpoint(self) -> tuple[int, int]:
+        with self._lock:
+            self._file.flush()
+            return (self._generation, self._file.tell())
+
+    def changes_since(
+        self, checkpoint: tuple[int, int]
+    ) -> Optional[Iterator[tuple[str, TicketIdRecord]]]:
+        generation, offset = checkpoint
+        with self._lock:
+            if generation != self._generation:
+                return None
+            self._file.flush()
+            with open(self._journal, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        return (
+            (entry.pop("op"), entry)
+            for entry in map(json.loads, data.splitlines())
+        )
+
+    @contextmanager
+    def batch(self) -> Iterator["TicketJournalFileStorage"]:
+        """Flushes (and syncs) the journal once for all operations of the block."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._sync()
+
+    def on_compact(self, listener: Callable[[], None]) -> None:
+        with self._lock:
+            self._compact_listeners.append(listener)
+
+    def compact(self) -> None:
+        """Rewrites the journal so it only holds active tickets."""
+        with self._lock:
+            records = list(self._tickets.values())
+            offset = self._file.tell()
+            generation = self._generation + 1
+        tmp_path = self._journal.with_name(self._journal.name + ".compact")
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            tmp.write(self._encode({"op": "generation", "generation": generation}))
+            for record in records:
+                tmp.write(self._encode({"op": "save", **record}))
+            with self._lock:
+                # Records appended while the snapshot was written go after it.
+                with open(self._journal, "r", encoding="utf-8") as f:
+                    f.seek(offset)
+                    tmp.write(f.read())
+                tmp.flush()
+                os.fsync(tmp.fileno())
+                self._file.close()
+                os.replace(tmp_path, self._journal)
+                self._file = open(self._journal, "a", encoding="utf-8")
+                self._appended = 0
+                self._tombstones = 0
+                self._generation = generation
+                listeners = list(self._compact_listeners)
+        for listener in listeners:
+            listener()
+
+    def close(self) -> None:
+        """Waits for a running compaction and closes the journal."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._file.close()
+
+    def _needs_compaction(self) -> bool:
+        if self._appended >= self._compact_bytes:
+            return True
+        total = len(self._tickets) + self._tombstones
+        return (
+            total >= self._compact_min_records
+            and self._tombstones >= total * self._compact_ratio
+        )
+
+    def _maybe_compact(self) -> None:
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if not self._needs_compaction():
+                return
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def _append(self, entry: dict) -> None:
+        self._appended += self._file.write(self._encode(entry))
+        if not self._batch_depth:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+
+    def _replay_journal(self) -> None:
+        if not self._journal.exists():
+            self._journal.touch()
+            return
+        data = self._journal.read_bytes()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            # Drop a torn write at the tail of the log left by a crash.
+            with open(self._journal, "r+b") as f:
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            entry = json.loads(line)
+            op = entry.pop("op")
+            if op == "save":
+                entry.setdefault("slot_number", None)
+                self._tickets[entry["ticket_id"]] = entry
+            elif op == "retrieve":
+                if self._tickets.pop(entry["ticket_id"], None) is not None:
+                    self._tombstones += 1
+            elif op == "generation":
+                self._generation = entry["generation"]
+
+    @staticmethod
+    def _encode(entry: dict) -> str:
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class TicketSqliteStorage(TicketStorage):
+    """Stores active tickets in an SQLite table keyed by ticket_id.
+
+    The database runs in WAL mode, so readers never block the writer.
+    Statements are parameterized and reused from the connection's statement
+    cache. Use `batch()` to group several operations into one transaction.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS tickets (
+            ticket_id TEXT PRIMARY KEY,
+            slot_size INTEGER NOT NULL,
+            slot_number INTEGER,
+            date TEXT NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS tickets_slot_size ON tickets (slot_size)",
+    )
+    _INSERT = (
+        "INSERT OR IGNORE INTO tickets (ticket_id, slot_size, slot_number, date) "
+        "VALUES (?, ?, ?, ?)"
+    )
+    _DELETE = "DELETE FROM tickets WHERE ticket_id = ? AND slot_size = ?"
+    _SELECT = "SELECT date, ticket_id, slot_size, slot_number FROM tickets WHERE ticket_id = ?"
+    _SELECT_ALL = "SELECT date, ticket_id, slot_size, slot_number FROM tickets"
+
+    def __init__(self, database: Path, synchronous: str = "NORMAL"):
+        # Imported here so processes that never use SQLite don't pay for it.
+        import sqlite3
+
+        self._database = database
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._connection = sqlite3.connect(
+            database, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous}")
+        for statement in self._SCHEMA:
+            self._connection.execute(statement)
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                self._INSERT,
+                (ticket_id, int(slot_size), slot_number, str(datetime.now())),
+            )
+        return cursor.rowcount == 1
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                self._DELETE, (ticket_id, int(slot_size))
+            )
+        return cursor.rowcount == 1
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        with self._lock:
+            row = self._connection.execute(self._SELECT, (ticket_id,)).fetchone()
+        return None if row is None else self._to_record(row)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        with self._lock:
+            rows = self._connection.execute(self._SELECT_ALL).fetchall()
+        return map(self._to_record, rows)
+
+    @contextmanager
+    def batch(self) -> Iterator["TicketSqliteStorage"]:
+        """Runs the operations of the block in a single transaction.
+
+        The transaction is rolled back if the block raises. Nested batches
+        join the outermost transaction.
+        """
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._batch_depth -= 1
+                return
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._batch_depth = 1
+            try:
+                yield self
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            else:
+                self._connection.execute("COMMIT")
+            finally:
+                self._batch_depth = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _to_record(row: tuple) -> TicketIdRecord:
+        date, ticket_id, slot_size, slot_number = row
+        return {
+            "date": date,
+            "ticket_id": ticket_id,
+            "slot_size": Size(slot_size),
+            "slot_number": slot_number,
+        }
+
+
+class TicketMmapStorage(TicketStorage):
+    """Stores active tickets as fixed-width records in a memory-mapped file.
+
+    The file is a hash table: a 64-byte header followed by 32-byte records,
+    addressed by the 64-bit key of the compact ticket ID with linear
+    probing. Records never straddle a page, so a save or a retrieve writes
+    a single record page (plus the header with the counters). A retrieve
+    only flips the record's state byte to a tombstone; tombstones are reused
+    by later saves and dropped when the table is rebuilt. The table doubles
+    once live tickets and tombstones fill `max_load` of it.
+
+    Opening maps the file without reading it, so start-up time doesn't
+    depend on the history. Only compact ticket IDs can be stored.
+    """
+
+    _MAGIC = b"VPTM"
+    _VERSION = 1
+    _HEADER = struct.Struct("<4sHHQQQ")  # magic, version, record size, capacity, live, tombstones
+    _HEADER_SIZE = 64
+    _RECORD = struct.Struct("<QBBxxidQ")  # key, state, slot size, slot number, timestamp, reserved
+    _KEY_STATE = struct.Struct("<QB")
+    _EMPTY, _LIVE, _RETRIEVED = 0, 1, 2
+    _NO_SLOT = -1
+
+    def __init__(
+        self,
+        path: Path,
+        initial_capacity: int = 1024,
+        max_load: float = 0.7,
+        fsync: bool = False,
+    ):
+        self._path = path
+        self._max_load = max_load
+        self._fsync = fsync
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        if not path.exists() or path.stat().st_size == 0:
+            capacity = 1 << max(initial_capacity - 1, 1).bit_length()
+            self._create(path, capacity)
+        self._open()
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            return False
+        with self._lock:
+            found, free = self._find(key)
+            if found >= 0:
+                return False
+            if (self._live + self._tombstones + 1) > self._capacity * self._max_load:
+                self._rebuild()
+                found, free = self._find(key)
+            offset = self._offset(free)
+            if self._map[offset + 8] == self._RETRIEVED:
+                self._tombstones -= 1
+            self._RECORD.pack_into(
+                self._map,
+                offset,
+                key,
+                self._LIVE,
+                slot_size,
+                self._NO_SLOT if slot_number is None else slot_number,
+                datetime.now().timestamp(),
+                0,
+            )
+            self._live += 1
+            self._written(offset)
+        return True
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            return False
+        with self._lock:
+            found, _ = self._find(key)
+            if found < 0:
+                return False
+            offset = self._offset(found)
+            if self._map[offset + 9] != slot_size:
+                return False
+            self._map[offset + 8] = self._RETRIEVED
+            self._live -= 1
+            self._tombstones += 1
+            self._written(offset)
+        return True
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        try:
+            key = ticket_key(ticket_id)
+        except InvalidTicketError:
+            return None
+        with self._lock:
+            found, _ = self._find(key)
+            if found < 0:
+                return None
+            return self._to_record(self._RECORD.unpack_from(self._map, self._offset(found)))
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        with self._lock:
+            with memoryview(self._map) as view:
+                rows = [
+                    row
+                    for row in self._RECORD.iter_unpack(view[self._HEADER_SIZE :])
+                    if row[1] == self._LIVE
+                ]
+        return map(self._to_record, rows)
+
+    @contextmanager
+    def batch(self) -> Iterator["TicketMmapStorage"]:
+        """Flushes (and syncs) the mapped file once for all operations of the block."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._fsync:
+                    self._map.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+
+    def _find(self, key: int) -> tuple[int, int]:
+        """Returns the slot holding the key (or -1) and the first reusable slot."""
+        mask = self._capacity - 1
+        slot = (key ^ key >> 32) & mask
+        reusable = -1
+        while True:
+            stored, state = self._KEY_STATE.unpack_from(self._map, self._offset(slot))
+            if state == self._EMPTY:
+                return -1, slot if reusable < 0 else reusable
+            if state == self._RETRIEVED:
+                if reusable < 0:
+                    reusable = slot
+            elif stored == key:
+                return slot, reusable
+            slot = (slot + 1) & mask
+
+    def _offset(self, slot: int) -> int:
+        return self._HEADER_SIZE + slot * self._RECORD.size
+
+    def _written(self, offset: int) -> None:
+        self._HEADER.pack_into(
+            self._map,
+            0,
+            self._MAGIC,
+            self._VERSION,
+            self._RECORD.size,
+            self._capacity,
+            self._live,
+            self._tombstones,
+        )
+        if self._fsync and not self._batch_depth:
+            # Flush ranges start on a page and must not run past the map.
+            page = offset - offset % mmap.PAGESIZE
+            self._map.flush(page, min(offset + self._RECORD.size, len(self._map)) - page)
+            self._map.flush(0, min(mmap.PAGESIZE, len(self._map)))
+
+    def _create(self, path: Path, capacity: int) -> None:
+        with open(path, "wb") as f:
+            f.write(
+                self._HEADER.pack(
+                    self._MAGIC, self._VERSION, self._RECORD.size, capacity, 0, 0
+                ).ljust(self._HEADER_SIZE, b"\0")
+            )
+            f.truncate(self._HEADER_SIZE + capacity * self._RECORD.size)
+
+    def _open(self) -> None:
+        self._file = open(self._path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        header = (b"", 0, 0, 0, 0, 0)
+        if len(self._map) >= self._HEADER_SIZE:
+            header = self._HEADER.unpack_from(self._map, 0)
+        magic, version, record_size, capacity, live, tombstones = header
+        if (magic, version, record_size) != (
+            self._MAGIC,
+            self._VERSION,
+            self._RECORD.size,
+        ) or len(self._map) != self._HEADER_SIZE + capacity * record_size:
+            self._map.close()
+            self._file.close()
+            raise TicketStorageErrors(f"{self._path} is not a ticket file.")
+        self._capacity, self._live, self._tombstones = capacity, live, tombstones
+
+    def _rebuild(self) -> None:
+        """Rewrites the table without tombstones, doubling it if needed."""
+        live = [
+            row
+            for row in self._RECORD.iter_unpack(self._map[self._HEADER_SIZE :])
+            if row[1] == self._LIVE
+        ]
+        capacity = self._capacity
+        while (len(live) + 1) * 2 > capacity * self._max_load:
+            capacity *= 2
+        tmp_path = self._path.with_name(self._path.name + ".rebuild")
+        self._create(tmp_path, capacity)
+        with open(tmp_path, "r+b") as f, mmap.mmap(f.fileno(), 0) as table:
+            mask = capacity - 1
+            for row in live:
+                key = row[0]
+                slot = (key ^ key >> 32) & mask
+                while table[self._offset(slot) + 8] != self._EMPTY:
+                    slot = (slot + 1) & mask
+                self._RECORD.pack_into(table, self._offset(slot), *row)
+            self._HEADER.pack_into(
+                table,
+                0,
+                self._MAGIC,
+                self._VERSION,
+                self._RECORD.size,
+                capacity,
+                len(live),
+                0,
+            )
+            table.flush()
+        self._map.close()
+        self._file.close()
+        os.replace(tmp_path, self._path)
+        self._open()
+
+    @staticmethod
+    def _to_record(row: tuple) -> TicketIdRecord:
+        key, _, slot_size, slot_number, timestamp, _ = row
+        return {
+            "date": str(datetime.fromtimestamp(timestamp)),
+            "ticket_id": format_ticket_key(key),
+            "slot_size": Size(slot_size),
+            "slot_number": None if slot_number == -1 else slot_number,
+        }
 
 
 def save_ticket_id_to_storage(
-    storage: TicketStorage, ticket_id: str, slot_size: Size
+    storage: TicketStorage,
+    ticket_id: str,
+    slot_size: Size,
+    slot_number: Optional[int] = None,
 ) -> bool:
-    """Saves active parking tickets to storage"""
+    """Saves active parking tickets to storage.
+
+    Returns False if the ticket was not saved; the caller reports it.
+    """
     try:
-        if not storage.save(ticket_id, slot_size):
-            raise SaveStorageError(f"Ticket {ticket_id} not saved")
-        return True
-    except SaveStorageError as e:
-        print(e)
+        return storage.save(ticket_id, slot_size, slot_number)
+    except SaveStorageError:
         return False
 
 
 def retrieve_ticket_id_from_storage(
     storage: TicketStorage, ticket_id: str, slot_size: Size
 ) -> bool:
-    """Retrieves active parking tickets from storage"""
+    """Retrieves active parking tickets from storage.
+
+    Returns False if the ticket was not found; the caller reports it.
+    """
     try:
-        if not storage.retrieve(ticket_id, slot_size):
-            raise TicketNotFoundError(f"Ticket {ticket_id} not found")
-        return True
-    except TicketNotFoundError as e:
-        print(e)
+        return storage.retrieve(ticket_id, slot_size)
+    except RetrieveStorageError:
         return False
+
+
+def save_ticket_ids_to_storage(
+    storage: TicketStorage, tickets: list[tuple[str, Size, Optional[int]]]
+) -> list[bool]:
+    """Saves a batch of active parking tickets to storage"""
+    try:
+        return storage.save_many(tickets)
+    except SaveStorageError:
+        return [False] * len(tickets)
+
+
+def retrieve_ticket_ids_from_storage(
+    storage: TicketStorage, tickets: list[tuple[str, Size]]
+) -> list[bool]:
+    """Retrieves a batch of active parking tickets from storage"""
+    try:
+        return storage.retrieve_many(tickets)
+    except RetrieveStorageError:
+        return [False] * len(tickets)
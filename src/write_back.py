@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Dict, Iterator, Optional, Union
+from src.metrics import ALL_SIZES, ParkingMetrics
+from src.exceptions import SaveStorageError, TicketStorageErrors
+from src.parking_slots import Size
+from src.ticket_storage import ForwardingTicketStorage, TicketIdRecord, TicketStorage
+
+# A buffered retrieve is kept as the size the ticket was retrieved with.
+_Pending = Union[TicketIdRecord, Size]
+
+
+class WriteBackTicketStorage(ForwardingTicketStorage):
+    """Buffers saves and retrieves of another storage and writes them in batches.
+
+    Operations are answered from memory and written to the wrapped storage
+    in one batch once `max_pending` tickets are waiting, once the oldest has
+    waited `max_delay` seconds (checked by a background thread), or on
+    `flush`/`close`. A ticket saved and retrieved within the window never
+    reaches the storage. Up to `max_delay` seconds of operations can be lost
+    in a crash; that is the durability window being traded for latency.
+    Operations of a flush the storage fails are kept and written by the next
+    one; `close` raises if some are still not written.
+
+    Recently used records are kept in an LRU cache of `cache_size` entries,
+    so lookups rarely reach the storage either. With `metrics`, each flush
+    records its duration, its lag (age of its oldest operation) and its size.
+    """
+
+    def __init__(
+        self,
+        storage: TicketStorage,
+        max_pending: int = 100,
+        max_delay: float = 0.05,
+        cache_size: int = 10_000,
+        metrics: Optional[ParkingMetrics] = None,
+    ) -> None:
+        super().__init__(storage)
+        self._max_pending = max_pending
+        self._max_delay = max_delay
+        self._cache_size = cache_size
+        self._metrics = metrics
+        self._lock = threading.RLock()
+        # Writes to the storage happen one flush at a time, in order.
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, _Pending] = {}
+        self._in_flight: Dict[str, _Pending] = {}
+        self._oldest: Optional[float] = None
+        self._cache: "OrderedDict[str, TicketIdRecord]" = OrderedDict()
+        self._stats: dict[str, Any] = {
+            "flushes": 0,
+            "flushed": 0,
+            "failed": 0,
+            "last_size": 0,
+            "last_lag": 0.0,
+        }
+        self._closed = threading.Event()
+        # Set when the first operation is buffered, to start the delay clock.
+        self._wakeup = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def save(
+        self, ticket_id: str, slot_size: Size, slot_number: Optional[int] = None
+    ) -> bool:
+        buffered = self._pending.get(ticket_id) or self._in_flight.get(ticket_id)
+        if buffered is not None and not isinstance(buffered, dict):
+            # Saved again after a buffered retrieve: keep the order.
+            self.flush()
+        with self._lock:
+            if ticket_id in self._pending and not isinstance(
+                self._pending[ticket_id], dict
+            ):
+                # The retrieve could not be written, so neither can the save.
+                return False
+            if self._lookup(ticket_id) is not None:
+                return False
+            record: TicketIdRecord = {
+                "date": str(datetime.now()),
+                "ticket_id": ticket_id,
+                "slot_size": slot_size,
+                "slot_number": slot_number,
+            }
+            self._buffer(ticket_id, record)
+            self._remember(record)
+            full = len(self._pending) >= self._max_pending
+        if full:
+            self.flush()
+        return True
+
+    def retrieve(self, ticket_id: str, slot_size: Size) -> bool:
+        with self._lock:
+            record = self._lookup(ticket_id)
+            if record is None or record["slot_size"] != slot_size:
+                return False
+            self._cache.pop(ticket_id, None)
+            if isinstance(self._pending.get(ticket_id), dict):
+                # Never written: the save and the retrieve cancel out.
+                del self._pending[ticket_id]
+                if not self._pending:
+                    self._oldest = None
+                return True
+            self._buffer(ticket_id, slot_size)
+            full = len(self._pending) >= self._max_pending
+        if full:
+            self.flush()
+        return True
+
+    def get(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        with self._lock:
+            return self._lookup(ticket_id)
+
+    def records(self) -> Iterator[TicketIdRecord]:
+        self.flush()
+        return self._storage.records()
+
+    def checkpoint(self) -> Optional[tuple[int, int]]:
+        self.flush()
+        return self._storage.checkpoint()
+
+    # Bulk operations go through the buffer like single ones.
+    save_many = TicketStorage.save_many
+    retrieve_many = TicketStorage.retrieve_many
+
+    @contextmanager
+    def batch(self) -> Iterator["WriteBackTicketStorage"]:
+        # Operations are batched already; the block flushes at most once.
+        yield self
+
+    def flush_stats(self) -> dict[str, Any]:
+        """Returns flush counts, the last flush's size and lag, and the backlog."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+            stats["lag"] = 0.0 if self._oldest is None else time.monotonic() - self._oldest
+        return stats
+
+    def flush(self) -> bool:
+        """Writes the buffered operations to the storage now.
+
+        Returns False if the storage failed; the operations are then kept
+        for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                oldest, self._oldest = self._oldest, None
+                lag = time.monotonic() - oldest
+            start = perf_counter()
+            saves = [
+                (ticket_id, op["slot_size"], op["slot_number"])
+                for ticket_id, op in batch.items()
+                if isinstance(op, dict)
+            ]
+            retrieves = [
+                (ticket_id, op)
+                for ticket_id, op in batch.items()
+                if not isinstance(op, dict)
+            ]
+            written = True
+            try:
+                with self._storage.batch():
+                    done = self._storage.save_many(saves) if saves else []
+                    done += self._storage.retrieve_many(retrieves) if retrieves else []
+            except (TicketStorageErrors, OSError):
+                written = False
+                done = []
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+                    if not written:
+                        self._requeue(batch, oldest)
+            failed = len(batch) - sum(done)
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flushed"] += len(batch)
+                self._stats["failed"] += failed
+                self._stats["last_size"] = len(batch)
+                self._stats["last_lag"] = lag
+            if self._metrics is not None:
+                self._metrics.observe(
+                    "storage_flush", ALL_SIZES, perf_counter() - start, not failed
+                )
+                self._metrics.observe("storage_flush_lag", ALL_SIZES, lag, True)
+                self._metrics.add("storage_flushed_operations", len(batch))
+            return written
+
+    def close(self) -> None:
+        """Stops the background flush, writes what is buffered and closes the storage."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        self._flusher.join()
+        if not self.flush():
+            raise SaveStorageError(
+                f"{len(self._pending)} buffered ticket operations were not written."
+            )
+        super().close()
+
+    def _buffer(self, ticket_id: str, op: _Pending) -> None:
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+            self._wakeup.set()
+        self._pending[ticket_id] = op
+
+    def _requeue(self, batch: Dict[str, _Pending], oldest: float) -> None:
+        """Puts the operations of a failed flush back, ahead of newer ones."""
+        pending: Dict[str, _Pending] = {}
+        for ticket_id, op in batch.items():
+            newer = self._pending.get(ticket_id)
+            if newer is None:
+                pending[ticket_id] = op
+            elif isinstance(op, dict) and not isinstance(newer, dict):
+                # Retrieved while its save was in flight: they cancel out.
+                del self._pending[ticket_id]
+        pending.update(self._pending)
+        self._pending = pending
+        if pending:
+            self._oldest = oldest
+            self._wakeup.set()
+
+    def _lookup(self, ticket_id: str) -> Optional[TicketIdRecord]:
+        """Finds the current record of a ticket, newest source first."""
+        for buffered in (self._pending, self._in_flight):
+            op = buffered.get(ticket_id)
+            if op is not None:
+                return op if isinstance(op, dict) else None
+        record = self._cache.get(ticket_id)
+        if record is not None:
+            self._cache.move_to_end(ticket_id)
+            return record
+        record = self._storage.get(ticket_id)
+        if record is not None:
+            self._remember(record)
+        return record
+
+    def _remember(self, record: TicketIdRecord) -> None:
+        self._cache[record["ticket_id"]] = record
+        self._cache.move_to_end(record["ticket_id"])
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.is_set():
+            with self._lock:
+                oldest = self._oldest
+                if oldest is None:
+                    self._wakeup.clear()
+            if oldest is None:
+                self._wakeup.wait()
+                continue
+            # Sleep until the oldest operation is due, not a fixed tick.
+            delay = oldest + self._max_delay - time.monotonic()
+            if delay > 0:
+                self._closed.wait(delay)
+            elif not self.flush():
+                # Retry a failing storage after a full delay, not in a loop.
+                self._closed.wait(self._max_delay)
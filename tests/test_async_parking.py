@@ -0,0 +1,169 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.allocation import worst_fit
+from src.async_parking import AsyncCarParking, GroupCommitStorage
+from src.exceptions import CarSizeError, ManageCarError
+from src.parking_slots import Size, get_parking_slots
+from src.ticket_storage import TicketJournalFileStorage
+
+
+class CountingStorage(TicketJournalFileStorage):
+    """Journal storage that counts how many batches were committed."""
+
+    batches = 0
+
+    def batch(self):
+        self.batches += 1
+        return super().batch()
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def journal_storage(tmp_path: Path):
+    """Returns a journal storage that counts committed batches."""
+    storage = CountingStorage(tmp_path / "tickets.jsonl")
+    yield storage
+    storage.close()
+
+
+# --- Tests for AsyncCarParking ---
+
+
+def test_async_park_and_return(journal_storage):
+    """Tests a park followed by a return through the async API."""
+
+    async def scenario():
+        storage = GroupCommitStorage(journal_storage)
+        parking = AsyncCarParking(get_parking_slots(1, 1, 1), storage)
+        ticket_id, slot_name = await parking.park_car(Size.MEDIUM)
+        assert slot_name == Size.MEDIUM.name
+        assert await parking.return_car(ticket_id, Size.MEDIUM) is True
+        assert await parking.return_car(ticket_id, Size.MEDIUM) is False
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_async_park_raises_when_full(journal_storage):
+    """Tests that CarSizeError is raised when no slot fits."""
+
+    async def scenario():
+        parking = AsyncCarParking(
+            get_parking_slots(1, 0, 0), GroupCommitStorage(journal_storage)
+        )
+        with pytest.raises(CarSizeError):
+            await parking.park_car(Size.LARGE)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_parks_are_group_committed(journal_storage):
+    """Tests that simultaneous parks share one storage batch."""
+
+    async def scenario():
+        storage = GroupCommitStorage(journal_storage, window=0.05)
+        parking = AsyncCarParking(get_parking_slots(100, 0, 0), storage)
+        tickets = await asyncio.gather(
+            *(parking.park_car(Size.SMALL) for _ in range(100))
+        )
+        await storage.close()
+        return tickets
+
+    tickets = asyncio.run(scenario())
+    assert len({ticket_id for ticket_id, _ in tickets}) == 100
+    assert journal_storage.batches == 1
+
+
+def test_group_is_flushed_when_full(journal_storage):
+    """Tests that a group is split once it reaches max_batch."""
+
+    async def scenario():
+        storage = GroupCommitStorage(journal_storage, window=0.05, max_batch=10)
+        parking = AsyncCarParking(get_parking_slots(30, 0, 0), storage)
+        await asyncio.gather(*(parking.park_car(Size.SMALL) for _ in range(30)))
+        await storage.close()
+
+    asyncio.run(scenario())
+    assert journal_storage.batches == 3
+
+
+def test_cancelled_park_still_settles_its_slot(journal_storage):
+    """Tests that cancelling a park neither leaks its slot nor stalls others."""
+
+    async def scenario():
+        storage = GroupCommitStorage(journal_storage, window=0.05)
+        slots = get_parking_slots(3, 0, 0)
+        parking = AsyncCarParking(slots, storage)
+        cancelled = asyncio.ensure_future(parking.park_car(Size.SMALL))
+        dropped = asyncio.ensure_future(storage.save("dropped", Size.SMALL))
+        others = asyncio.gather(*(parking.park_car(Size.SMALL) for _ in range(2)))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        dropped.cancel()
+        assert len(await others) == 2
+        await storage.close()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return slots
+
+    slots = asyncio.run(scenario())
+    # The cancelled park's ticket was saved, so its slot stays taken.
+    assert slots[Size.SMALL] == 0 and slots.reserved(Size.SMALL) == 0
+    assert len(list(journal_storage.records())) == 3
+    assert journal_storage.get("dropped") is None
+
+
+def test_async_return_frees_slot_of_restored_ticket(journal_storage):
+    """Tests that a ticket from before a restart frees its slot on return."""
+    journal_storage.save("restored", Size.MEDIUM, 0)
+
+    async def scenario():
+        slots = get_parking_slots(0, 1, 0)
+        slots.occupy(Size.MEDIUM, 0)
+        parking = AsyncCarParking(slots, GroupCommitStorage(journal_storage))
+        assert await parking.locate_car("restored") == (Size.MEDIUM, 0)
+        assert await parking.return_car("restored", Size.MEDIUM) is True
+        return slots
+
+    assert asyncio.run(scenario())[Size.MEDIUM] == 1
+
+
+def test_async_park_follows_policy_and_publishes(journal_storage):
+    """Tests that the async parking uses the allocation policy and availability."""
+
+    async def scenario():
+        parking = AsyncCarParking(
+            get_parking_slots(1, 1, 1),
+            GroupCommitStorage(journal_storage),
+            policy=worst_fit,
+        )
+        _, slot_name = await parking.park_car(Size.SMALL)
+        return slot_name, parking.availability()
+
+    slot_name, availability = asyncio.run(scenario())
+    assert slot_name == Size.LARGE.name
+    assert availability.free[Size.LARGE] == 0
+    assert availability.free[Size.SMALL] == 1
+
+
+def test_async_storage_failure_rolls_back_the_slot(journal_storage):
+    """Tests that a save that raises gives the reserved slot back."""
+
+    class FailingStorage(GroupCommitStorage):
+        async def save(self, ticket_id, slot_size, slot_number=None):
+            raise OSError("disk full")
+
+    async def scenario():
+        slots = get_parking_slots(1, 0, 0)
+        parking = AsyncCarParking(slots, FailingStorage(journal_storage))
+        with pytest.raises(ManageCarError, match="disk full"):
+            await parking.park_car(Size.SMALL)
+        return slots
+
+    slots = asyncio.run(scenario())
+    assert slots[Size.SMALL] == 1 and slots.reserved(Size.SMALL) == 0
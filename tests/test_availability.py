@@ -0,0 +1,215 @@
+import pickle
+import threading
+from functools import partial
+
+import pytest
+
+from src.allocation import OverflowThreshold, exact_fit
+from src.availability import Availability
+from src.exceptions import CarSizeError
+from src.parking_cluster import ParkingCluster, cluster_init
+from src.parking_slots import Size, Slots, get_parking_slots
+from src.parking_system import CarParking
+from src.reservations import ReservationBook
+from src.ticket_storage import TicketJournalFileStorage
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Returns a journal storage, closed after the test."""
+    storage = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    yield storage
+    storage.close()
+
+
+# --- Tests for Availability ---
+
+
+def test_can_park_table_is_rebuilt_only_when_it_can_change():
+    """Tests that a size-only policy keeps the table until a size runs out."""
+    first = Availability.of(0, {Size.SMALL: 2, Size.MEDIUM: 0, Size.LARGE: 1}, exact_fit)
+    second = first.updated({Size.SMALL: 1, Size.MEDIUM: 0, Size.LARGE: 1}, exact_fit)
+    assert second.version == 1 and second.can_park is first.can_park
+    third = second.updated({Size.SMALL: 0, Size.MEDIUM: 0, Size.LARGE: 1}, exact_fit)
+    assert not third.can_park[Size.SMALL]
+
+    policy = OverflowThreshold({Size.LARGE: 1})
+    first = Availability.of(0, {Size.SMALL: 0, Size.MEDIUM: 0, Size.LARGE: 2}, policy)
+    second = first.updated({Size.SMALL: 0, Size.MEDIUM: 0, Size.LARGE: 1}, policy)
+    assert first.can_park[Size.SMALL] and not second.can_park[Size.SMALL]
+
+
+def test_snapshots_survive_pickling():
+    """Tests that a snapshot pickles to an equal, still read-only copy."""
+    availability = Availability.of(7, dict.fromkeys(Size, 0), exact_fit)
+    copy = pickle.loads(pickle.dumps(availability))
+    assert copy == availability
+    with pytest.raises(TypeError):
+        copy.can_park[Size.SMALL] = True
+
+
+# --- Tests for CarParking availability ---
+
+
+def test_each_change_publishes_a_new_version(storage):
+    """Tests that each slot change, and only a change, bumps the version."""
+    parking = CarParking(get_parking_slots(1, 0, 1), storage)
+    first = parking.availability()
+    assert first.version == 0
+    assert dict(first.free) == {Size.SMALL: 1, Size.MEDIUM: 0, Size.LARGE: 1}
+    assert dict(first.can_park) == dict.fromkeys(Size, True)
+
+    ticket_id, _ = parking.park_car(Size.MEDIUM)
+    second = parking.availability()
+    assert second.version == 1
+    assert dict(second.free) == {Size.SMALL: 1, Size.MEDIUM: 0, Size.LARGE: 0}
+    assert dict(second.can_park) == {Size.SMALL: True, Size.MEDIUM: False, Size.LARGE: False}
+    # Published snapshots never change.
+    assert first.free[Size.LARGE] == 1
+    with pytest.raises(TypeError):
+        second.free[Size.LARGE] = 5
+
+    with pytest.raises(CarSizeError):
+        parking.park_car(Size.LARGE)
+    assert parking.availability() is second
+
+    parking.return_car(ticket_id)
+    assert parking.availability().version == 2
+    assert parking.availability().free == first.free
+
+
+def test_can_park_follows_the_policy(storage):
+    """Tests that can_park answers as the allocation policy would."""
+    parking = CarParking(get_parking_slots(0, 0, 3), storage, policy=exact_fit)
+    assert dict(parking.availability().can_park) == {
+        Size.SMALL: False,
+        Size.MEDIUM: False,
+        Size.LARGE: True,
+    }
+    parking = CarParking(
+        get_parking_slots(0, 0, 3), storage, policy=OverflowThreshold({Size.LARGE: 2})
+    )
+    assert parking.availability().can_park[Size.SMALL]
+    parking.park_car(Size.SMALL)
+    assert not parking.availability().can_park[Size.SMALL]
+    assert parking.availability().can_park[Size.LARGE]
+
+
+def test_holds_are_published(storage):
+    """Tests that taking, cancelling and expiring holds are published."""
+    now = [0.0]
+    parking = CarParking(
+        get_parking_slots(1, 0, 0), storage, reservations=ReservationBook(lambda: now[0])
+    )
+    ticket_id, _ = parking.reserve_slot(Size.SMALL, 60)
+    assert not parking.availability().can_park[Size.SMALL]
+    assert parking.cancel_reservation(ticket_id)
+    assert parking.availability().free[Size.SMALL] == 1
+
+    parking.reserve_slot(Size.SMALL, 60)
+    now[0] = 61
+    # The expired hold is collected (and published) by the expiry timer or,
+    # if it has not woken yet, by the next operation.
+    parking.available_slots()
+    assert parking.availability().free[Size.SMALL] == 1
+    assert parking.availability().version == 4
+
+
+def test_direct_slot_changes_need_a_publish(storage):
+    """Tests that direct slot changes show up only after a publish."""
+    slots = get_parking_slots(1, 1, 1)
+    parking = CarParking(slots, storage)
+    slots[Size.SMALL] = 4
+    assert parking.availability().free[Size.SMALL] == 1
+    assert parking.publish_availability().free[Size.SMALL] == 4
+    assert parking.publish_availability().version == 1
+
+
+def test_reads_do_not_wait_for_writers(storage):
+    """Tests that a read returns while a writer holds the publish lock."""
+    parking = CarParking(get_parking_slots(1, 1, 1), storage)
+    parking.park_car(Size.SMALL)
+    read = []
+    with parking._publish_lock:
+        reader = threading.Thread(target=lambda: read.append(parking.availability()))
+        reader.start()
+        reader.join(timeout=1)
+    assert read and read[0].free[Size.SMALL] == 0
+
+
+def test_readers_see_consistent_increasing_versions(storage):
+    """Tests that concurrent readers see valid snapshots with rising versions."""
+    parking = CarParking(get_parking_slots(20, 20, 20, concurrent=True), storage)
+    total = 60
+    stop = threading.Event()
+    problems = []
+
+    def read() -> None:
+        last = -1
+        while not stop.is_set():
+            availability = parking.availability()
+            if availability.version < last or not 0 <= sum(availability.free.values()) <= total:
+                problems.append(availability)
+            last = availability.version
+
+    def write(size: Size) -> None:
+        for _ in range(200):
+            ticket_id, _ = parking.park_car(size)
+            parking.return_car(ticket_id)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(size,)) for size in Size]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert problems == []
+    assert dict(parking.availability().free) == parking.available_slots()
+
+
+# --- Tests for cluster availability ---
+
+
+def test_cluster_adds_up_its_lots(storage, tmp_path):
+    """Tests that a cluster's snapshot adds up the snapshots of its lots."""
+    other = TicketJournalFileStorage(tmp_path / "other.jsonl")
+    cluster = ParkingCluster(
+        [
+            CarParking(get_parking_slots(1, 0, 0), storage, shard_id=0),
+            CarParking(get_parking_slots(0, 0, 2), other, shard_id=1),
+        ]
+    )
+    cluster.park_car(Size.SMALL)
+    availability = cluster.availability()
+    assert availability.version == 1
+    assert dict(availability.free) == {Size.SMALL: 0, Size.MEDIUM: 0, Size.LARGE: 2}
+    assert all(availability.can_park.values())
+    other.close()
+
+
+def test_shard_processes_reuse_their_last_snapshot(tmp_path):
+    """Tests that shard processes return the same snapshot until it changes."""
+    cluster = cluster_init(
+        [Slots(1, 0, 0), Slots(0, 0, 1)],
+        [partial(TicketJournalFileStorage, tmp_path / f"shard-{i}.jsonl") for i in range(2)],
+        processes=True,
+    )
+    try:
+        shard = cluster._shards[0]
+        first = shard.availability()
+        assert shard.availability() is first
+        cluster.park_car(Size.SMALL, preferred_shard=0)
+        assert shard.availability().free[Size.SMALL] == 0
+        assert dict(cluster.availability().free) == {
+            Size.SMALL: 0,
+            Size.MEDIUM: 0,
+            Size.LARGE: 1,
+        }
+    finally:
+        cluster.close()
@@ -0,0 +1,97 @@
+import itertools
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from src.batch_commands import run_commands
+from src.parking_slots import get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJsonFileStorage
+
+
+def results(parking, lines, storage=None, **kwargs) -> list[dict]:
+    """Runs the command lines and returns the parsed result of each."""
+    return [json.loads(line) for line in run_commands(parking, lines, storage, **kwargs)]
+
+
+# --- Tests for run_commands ---
+
+
+def test_park_then_return(tmp_path: Path):
+    """Tests a park and a return, with the caller's id echoed back."""
+    storage = TicketJsonFileStorage(tmp_path / "tickets.json")
+    parking = CarParking(get_parking_slots(1, 0, 0), storage)
+    parked = results(parking, ['{"action": "park", "size": "small", "id": "a"}'], storage)
+    assert parked[0]["ok"] and parked[0]["id"] == "a"
+    assert parked[0]["slot_size"] == "SMALL" and parked[0]["slot_number"] == 0
+
+    ticket_id = parked[0]["ticket_id"]
+    returned = results(parking, [json.dumps({"action": "return", "ticket_id": ticket_id})])
+    assert returned == [{"line": 1, "ok": True, "ticket_id": ticket_id}]
+
+
+def test_bad_commands_get_error_results(tmp_path: Path):
+    """Tests that bad lines get an error result and blank lines none."""
+    parking = CarParking(
+        get_parking_slots(0, 0, 0), TicketJsonFileStorage(tmp_path / "tickets.json")
+    )
+    lines = [
+        "not json",
+        "",
+        "[1, 2]",
+        '{"action": "fly"}',
+        '{"action": "park"}',
+        '{"action": "park", "size": "HUGE"}',
+        '{"action": "park", "size": "SMALL"}',
+        '{"action": "return", "ticket_id": "missing", "size": "SMALL"}',
+    ]
+    output = results(parking, lines)
+    assert [r["line"] for r in output] == [1, 3, 4, 5, 6, 7, 8]
+    assert not any(r["ok"] for r in output)
+    assert output[3]["error"] == "Missing or invalid field 'size'."
+    assert output[5]["error"] == "No suitable slots found."
+    assert output[6]["error"] == "Ticket missing not found."
+
+
+def test_commands_run_in_storage_batches(tmp_path: Path):
+    """Tests that each chunk of commands is written in one storage batch."""
+    storage = TicketJsonFileStorage(tmp_path / "tickets.json")
+    parking = CarParking(get_parking_slots(10, 0, 0), storage)
+    lines = ['{"action": "park", "size": "SMALL"}'] * 10
+    with patch.object(storage, "_write_parking_data") as write:
+        assert len(results(parking, lines, storage, chunk_size=4)) == 10
+    assert write.call_count == 3
+
+
+def test_results_stream_without_reading_all_input(tmp_path: Path):
+    """Tests that results come out before the input ends."""
+    parking = CarParking(
+        get_parking_slots(0, 0, 0), TicketJsonFileStorage(tmp_path / "tickets.json")
+    )
+    endless = itertools.repeat('{"action": "return", "ticket_id": "x", "size": "SMALL"}')
+    first = list(itertools.islice(run_commands(parking, endless, chunk_size=5), 3))
+    assert len(first) == 3
+
+
+# --- Tests for the batch command line ---
+
+
+def test_main_batch_mode(tmp_path: Path):
+    """Tests running a command file through `main.py --batch`."""
+    root = Path(__file__).resolve().parent.parent
+    commands = tmp_path / "commands.jsonl"
+    commands.write_text(
+        '{"action": "park", "size": "LARGE"}\n{"action": "return", "ticket_id": "x"}\n'
+    )
+    done = subprocess.run(
+        [sys.executable, str(root / "main.py"), "--batch", str(commands)],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(root)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    output = [json.loads(line) for line in done.stdout.splitlines()]
+    assert [r["ok"] for r in output] == [True, False]
@@ -0,0 +1,38 @@
+from benchmarks.suite import find_regressions, run_case, summarize
+
+
+# --- Tests for the benchmark suite ---
+
+
+def test_summarize_percentiles():
+    """Tests that latencies are reported in microseconds."""
+    stats = summarize([0.001, 0.002, 0.003, 0.004], elapsed=0.01)
+    assert stats["ops"] == 4
+    assert stats["ops_per_s"] == 400
+    assert stats["p50_us"] == 3000
+    assert stats["p99_us"] == 4000
+
+
+def test_find_regressions():
+    """Tests that only cases slower than the tolerance are reported."""
+    baseline = {"a": {"p50_us": 100.0}, "b": {"p50_us": 100.0}}
+    results = {
+        "a": {"p50_us": 140.0},
+        "b": {"p50_us": 160.0},
+        "c": {"p50_us": 999.0},
+    }
+    regressions = find_regressions(results, baseline, tolerance=0.5)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b:")
+
+
+def test_run_case_reports_tracked_operations():
+    """Tests a tiny sweep point end to end."""
+    results = run_case("journal", lot=10, active=5, threads=1, operations=10)
+    assert set(results) == {
+        "park_car",
+        "return_car",
+        "storage.save",
+        "storage.retrieve",
+    }
+    assert results["park_car"]["ops"] == 10
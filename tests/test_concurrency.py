@@ -0,0 +1,127 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.exceptions import CarSizeError, ManageCarError
+from src.parking_slots import ConcurrentParkingSlots, Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJournalFileStorage
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def journal_storage(tmp_path: Path):
+    """Returns a journal storage shared by all threads of a test."""
+    storage = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    yield storage
+    storage.close()
+
+
+# --- Tests for ConcurrentParkingSlots ---
+
+
+def test_get_parking_slots_concurrent():
+    """Tests that the factory builds thread-safe slots on request."""
+    slots = get_parking_slots(1, 2, 3, concurrent=True)
+    assert isinstance(slots, ConcurrentParkingSlots)
+    assert slots[Size.LARGE] == 3
+
+
+def test_reserve_commit_rollback():
+    """Tests the reserve, commit and rollback cycle of a slot."""
+    slots = get_parking_slots(1, 0, 0, concurrent=True)
+    assert slots.reserve(Size.SMALL) == 0
+    assert slots.reserve(Size.SMALL) is None
+    assert slots.reserved(Size.SMALL) == 1
+    slots.rollback(Size.SMALL, 0)
+    assert slots[Size.SMALL] == 1
+    assert slots.reserved(Size.SMALL) == 0
+
+    assert slots.reserve(Size.SMALL) == 0
+    slots.commit(Size.SMALL, 0)
+    assert slots[Size.SMALL] == 0
+    assert slots.reserved(Size.SMALL) == 0
+
+
+def test_concurrent_reserve_never_oversells():
+    """Tests that many threads can't reserve more slots than exist."""
+    slots = get_parking_slots(100, 0, 0, concurrent=True)
+    barrier = threading.Barrier(8)
+
+    def worker() -> list[int]:
+        barrier.wait()
+        numbers = (slots.reserve(Size.SMALL) for _ in range(50))
+        return [number for number in numbers if number is not None]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        reserved = [n for numbers in pool.map(lambda _: worker(), range(8)) for n in numbers]
+
+    assert sorted(reserved) == list(range(100))
+    assert slots[Size.SMALL] == 0
+
+
+# --- Stress test for CarParking ---
+
+
+def test_parking_stress_under_thread_pool(journal_storage):
+    """Tests that concurrent parks and returns keep slot counts exact."""
+    slots = get_parking_slots(20, 20, 20, concurrent=True)
+    parking = CarParking(slots, journal_storage)
+
+    def terminal(car_size: Size) -> int:
+        parked = 0
+        for _ in range(200):
+            try:
+                ticket_id, slot_name = parking.park_car(car_size)
+            except CarSizeError:
+                continue
+            parked += 1
+            assert parking.return_car(ticket_id, Size[slot_name]) is True
+        return parked
+
+    sizes = [Size.SMALL, Size.MEDIUM, Size.LARGE] * 4
+    with ThreadPoolExecutor(max_workers=len(sizes)) as pool:
+        parked = sum(pool.map(terminal, sizes))
+
+    assert parked > 0
+    for size in Size:
+        assert slots[size] == 20
+        assert slots.reserved(size) == 0
+
+
+def test_parking_last_slot_goes_to_one_terminal(journal_storage):
+    """Tests that only one of many terminals gets the last slot."""
+    parking = CarParking(get_parking_slots(0, 0, 1, concurrent=True), journal_storage)
+    barrier = threading.Barrier(10)
+
+    def terminal(_) -> bool:
+        barrier.wait()
+        try:
+            parking.park_car(Size.LARGE)
+        except CarSizeError:
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(terminal, range(10)))
+
+    assert results.count(True) == 1
+
+
+def test_storage_failure_rolls_back_the_reserved_slot(journal_storage):
+    """Tests that a save raising an I/O error gives the reserved slot back."""
+    slots = get_parking_slots(1, 0, 0, concurrent=True)
+    parking = CarParking(slots, journal_storage)
+    with patch.object(journal_storage, "save", side_effect=OSError("disk full")):
+        with pytest.raises(ManageCarError, match="disk full"):
+            parking.park_car(Size.SMALL)
+    with patch.object(journal_storage, "save_many", side_effect=OSError("disk full")):
+        results = parking.park_cars([Size.SMALL])
+    assert results[0].error is not None
+    assert (slots[Size.SMALL], slots.reserved(Size.SMALL)) == (1, 0)
+    assert parking.park_car(Size.SMALL)
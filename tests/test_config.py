@@ -0,0 +1,122 @@
+import atexit
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.config import ParkingConfig, build_parking, configure_logging, load_config
+from src.exceptions import ParkingInitError
+from src.parking_slots import Size
+from src.ticket_storage import TicketSqliteStorage
+
+
+# --- Tests for load_config ---
+
+
+def test_load_config_defaults():
+    """Tests that an empty environment gives the module defaults."""
+    assert load_config(env={}) == ParkingConfig()
+
+
+def test_load_config_precedence(tmp_path: Path):
+    """Tests that arguments beat the environment, which beats the file."""
+    config_file = tmp_path / "parking.json"
+    config_file.write_text(json.dumps({"small_slots": 1, "medium_slots": 2}))
+
+    config = load_config(
+        config_file,
+        env={"VALET_MEDIUM_SLOTS": "5", "VALET_LARGE_SLOTS": "7"},
+        large_slots=9,
+    )
+
+    assert (config.small_slots, config.medium_slots, config.large_slots) == (1, 5, 9)
+
+
+def test_load_config_rejects_bad_values(tmp_path: Path):
+    """Tests that unusable settings raise ParkingInitError."""
+    with pytest.raises(ParkingInitError):
+        load_config(env={"VALET_SMALL_SLOTS": "many"})
+    with pytest.raises(ParkingInitError):
+        load_config(env={}, storage_backend="redis")
+    with pytest.raises(ParkingInitError):
+        load_config(env={}, garage=True)
+    with pytest.raises(ParkingInitError):
+        load_config(tmp_path / "missing.json", env={})
+
+
+# --- Tests for build_parking ---
+
+
+def test_build_parking_with_sqlite(tmp_path: Path):
+    """Tests building a parking system on the configured backend."""
+    config = load_config(
+        env={},
+        storage_backend="sqlite",
+        storage_path=str(tmp_path / "tickets.db"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        small_slots=1,
+    )
+    parking, slots, storage = build_parking(config)
+
+    assert isinstance(storage, TicketSqliteStorage)
+    parking.park_car(Size.SMALL)
+    assert slots[Size.SMALL] == 0
+
+
+def test_build_parking_with_legacy_json_file(tmp_path: Path):
+    """Tests that tickets saved before slot numbers existed still load."""
+    legacy_id = "0b7e6a52-3c1f-4f0e-9a51-6f1d2c8e4b10"
+    jsonfile = tmp_path / "tickets.json"
+    jsonfile.write_text(
+        json.dumps(
+            [{"date": "2024-01-01 08:00:00", "ticket_id": legacy_id, "slot_size": 1}]
+        )
+    )
+    config = load_config(
+        env={},
+        storage_path=str(jsonfile),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        small_slots=1,
+    )
+    parking, slots, _ = build_parking(config)
+
+    assert slots[Size.SMALL] == 0
+    assert parking.locate_car(legacy_id) is None
+    assert parking.return_car(legacy_id, Size.SMALL) is True
+    assert slots[Size.SMALL] == 1
+
+
+# --- Tests for configure_logging ---
+
+
+def test_async_logging_writes_from_background_thread(tmp_path: Path):
+    """Tests that queued records are formatted and written by the listener."""
+    config = load_config(env={}, log_file=str(tmp_path / "parking.log"))
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    listener = configure_logging(config)
+    try:
+        assert listener is not None
+        logging.getLogger("src.test").info("Parked %s", "t1", extra={"ticket_id": "t1"})
+    finally:
+        atexit.unregister(listener.stop)
+        listener.stop()
+        root.handlers[:] = handlers
+        root.setLevel(level)
+
+    assert "src.test - INFO - Parked t1" in (tmp_path / "parking.log").read_text()
+
+
+def test_importing_config_has_no_side_effects(tmp_path: Path):
+    """Tests that importing the config creates no log, storage or parking."""
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run(
+        [sys.executable, "-c", "import src.config"],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(root)},
+        check=True,
+    )
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,160 @@
+import json
+import socket
+import threading
+from http.client import HTTPConnection
+from pathlib import Path
+
+import pytest
+
+from src.http_service import ParkingHTTPServer
+from src.parking_slots import get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJournalFileStorage
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def server(tmp_path: Path):
+    """Runs the service on a free local port with one slot of each size."""
+    storage = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    parking = CarParking(get_parking_slots(1, 1, 1, concurrent=True), storage)
+    server = ParkingHTTPServer(("127.0.0.1", 0), parking, workers=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    storage.close()
+
+
+@pytest.fixture
+def connection(server: ParkingHTTPServer):
+    """Returns a keep-alive connection to the service."""
+    connection = HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    yield connection
+    connection.close()
+
+
+def request(connection: HTTPConnection, method: str, path: str, body=None):
+    """Sends a JSON request and returns the status and decoded body."""
+    data = None if body is None else json.dumps(body)
+    connection.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+# --- Tests for the HTTP service ---
+
+
+def test_park_and_return_over_one_connection(connection):
+    """Tests a full park/return cycle on a single kept-alive connection."""
+    status, parked = request(connection, "POST", "/park", {"size": "SMALL"})
+    assert status == 200
+    assert parked["slot_size"] == "SMALL"
+    assert parked["slot_number"] == 0
+
+    status, availability = request(connection, "GET", "/availability")
+    assert availability == {"SMALL": 0, "MEDIUM": 1, "LARGE": 1}
+
+    ticket = {"ticket_id": parked["ticket_id"], "size": "SMALL"}
+    assert request(connection, "POST", "/return", ticket) == (200, {"returned": True})
+    assert request(connection, "POST", "/return", ticket) == (404, {"returned": False})
+
+
+def test_park_when_full_is_conflict(connection):
+    """Tests that a full lot answers 409."""
+    assert request(connection, "POST", "/park", {"size": "LARGE"})[0] == 200
+    assert request(connection, "POST", "/park", {"size": "LARGE"})[0] == 409
+
+
+def test_bad_requests(connection):
+    """Tests that malformed requests answer 400 or 404."""
+    assert request(connection, "POST", "/park", {"size": "HUGE"})[0] == 400
+    assert request(connection, "POST", "/return", {"size": "SMALL"})[0] == 400
+    assert request(connection, "POST", "/park", ["SMALL"])[0] == 400
+    assert request(connection, "GET", "/tickets")[0] == 404
+
+
+def test_metrics_endpoint(tmp_path: Path):
+    """Tests that /metrics serves Prometheus text when metrics are enabled."""
+    from src.metrics import InstrumentedParking, ParkingMetrics
+
+    metrics = ParkingMetrics()
+    storage = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    parking = InstrumentedParking(CarParking(get_parking_slots(1, 1, 1), storage), metrics)
+    server = ParkingHTTPServer(("127.0.0.1", 0), parking, workers=2, metrics=metrics)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection = HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    try:
+        request(connection, "POST", "/park", {"size": "SMALL"})
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        text = response.read().decode()
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+        storage.close()
+
+    assert response.status == 200
+    assert 'valet_operations_total{operation="park_car",size="SMALL",outcome="success"} 1' in text
+
+
+def test_availability_etag_follows_the_snapshot_version(connection):
+    connection.request("GET", "/availability")
+    response = connection.getresponse()
+    response.read()
+    etag = response.getheader("ETag")
+
+    connection.request("GET", "/availability", headers={"If-None-Match": etag})
+    response = connection.getresponse()
+    assert (response.status, response.read()) == (304, b"")
+
+    request(connection, "POST", "/park", {"size": "LARGE"})
+    connection.request("GET", "/availability", headers={"If-None-Match": etag})
+    response = connection.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read())["LARGE"] == 0
+    assert response.getheader("ETag") != etag
+
+
+def test_idle_connections_do_not_hold_workers(server: ParkingHTTPServer):
+    """Tests that more kept-alive connections than workers are all served."""
+    connections = [
+        HTTPConnection("127.0.0.1", server.server_port, timeout=5) for _ in range(10)
+    ]
+    try:
+        for _ in range(2):
+            for connection in connections:
+                assert request(connection, "GET", "/availability")[0] == 200
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def test_pipelined_requests_are_all_answered(server: ParkingHTTPServer):
+    """Tests that requests sent back to back on one connection get answers."""
+    with socket.create_connection(("127.0.0.1", server.server_port), timeout=5) as sock:
+        sock.sendall(b"GET /availability HTTP/1.1\r\n\r\n" * 2)
+        reader = sock.makefile("rb")
+        for _ in range(2):
+            assert reader.readline().startswith(b"HTTP/1.1 200")
+            length = 0
+            while (line := reader.readline()) != b"\r\n":
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            assert json.loads(reader.read(length))["SMALL"] == 1
+
+
+@pytest.mark.parametrize("length", ["ten", "-5"])
+def test_invalid_content_length_is_bad_request(connection, length):
+    """Tests that a malformed Content-Length answers 400 and closes."""
+    connection.putrequest("POST", "/park")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read()) == {"error": "Invalid Content-Length"}
+    assert response.will_close
@@ -0,0 +1,132 @@
+from pathlib import Path
+
+import pytest
+
+from src.config import build_parking, load_config
+from src.exceptions import CarSizeError
+from src.metrics import (
+    InstrumentedParking,
+    InstrumentedStorage,
+    ParkingMetrics,
+)
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJournalFileStorage
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def metrics():
+    return ParkingMetrics()
+
+
+@pytest.fixture
+def parking(tmp_path: Path, metrics: ParkingMetrics):
+    """Returns an instrumented parking with one slot of each size."""
+    slots = get_parking_slots(1, 1, 1)
+    metrics.track_slots(slots)
+    storage = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    parking = InstrumentedParking(
+        CarParking(slots, InstrumentedStorage(storage, metrics)), metrics
+    )
+    yield parking
+    storage.close()
+
+
+# --- Tests for ParkingMetrics ---
+
+
+def test_histogram_buckets_are_cumulative(metrics: ParkingMetrics):
+    """Tests bucket placement, sum and count of one operation."""
+    metrics.observe("park_car", "SMALL", 0.00002, ok=True)
+    metrics.observe("park_car", "SMALL", 0.3, ok=False)
+
+    stats = metrics.snapshot()["operations"]["park_car"]["SMALL"]
+    assert stats["count"] == 2
+    assert stats["success"] == 1
+    assert stats["failure"] == 1
+    assert stats["sum_seconds"] == pytest.approx(0.30002)
+    assert stats["buckets"][0.00001] == 0
+    assert stats["buckets"][0.000025] == 1
+    assert stats["buckets"][0.25] == 1
+    assert stats["buckets"][0.5] == 2
+    assert stats["buckets"][float("inf")] == 2
+
+
+# --- Tests for the instrumented parking ---
+
+
+def test_parking_operations_are_counted(parking: InstrumentedParking, metrics):
+    """Tests counters and gauges after park, failed park and return."""
+    ticket_id, slot_size = parking.park_car(Size.LARGE)
+    with pytest.raises(CarSizeError):
+        parking.park_car(Size.LARGE)
+    assert not parking.return_car("missing", Size.SMALL)
+
+    operations = metrics.snapshot()["operations"]
+    assert operations["park_car"]["LARGE"]["success"] == 1
+    assert operations["park_car"]["LARGE"]["failure"] == 1
+    assert operations["return_car"]["SMALL"]["failure"] == 1
+    assert operations["storage_save"]["LARGE"]["success"] == 1
+    assert operations["storage_retrieve"]["SMALL"]["failure"] == 1
+    assert metrics.snapshot()["slots"]["LARGE"] == {
+        "free": 0,
+        "reserved": 0,
+        "held": 0,
+        "occupied": 1,
+        "capacity": 1,
+    }
+
+    assert parking.return_car(ticket_id, Size[slot_size])
+    assert metrics.snapshot()["slots"]["LARGE"]["free"] == 1
+
+
+def test_bulk_operations_are_counted_per_size(parking: InstrumentedParking, metrics):
+    """Tests that bulk calls are timed once and counted per car."""
+    results = parking.park_cars([Size.SMALL, Size.SMALL, Size.SMALL, Size.SMALL])
+
+    operations = metrics.snapshot()["operations"]
+    assert operations["park_cars"]["ALL"]["count"] == 1
+    assert operations["park_car"]["SMALL"] == {"success": 3, "failure": 1}
+    assert operations["storage_save"]["SMALL"]["success"] == 1
+    assert operations["storage_save"]["LARGE"]["success"] == 1
+    assert len(results) == 4
+
+
+def test_prometheus_text(parking: InstrumentedParking, metrics):
+    """Tests the exposition format of histograms, counters and gauges."""
+    parking.park_car(Size.MEDIUM)
+
+    text = metrics.to_prometheus()
+    assert "# TYPE valet_operation_duration_seconds histogram" in text
+    assert (
+        'valet_operation_duration_seconds_bucket{operation="park_car",size="MEDIUM",le="+Inf"} 1'
+        in text
+    )
+    assert (
+        'valet_operations_total{operation="park_car",size="MEDIUM",outcome="success"} 1'
+        in text
+    )
+    assert 'valet_slots_occupied{size="MEDIUM"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_build_parking_without_metrics_is_not_wrapped(tmp_path: Path):
+    """Tests that disabled metrics leave the parking system untouched."""
+    config = load_config(
+        env={},
+        storage_backend="journal",
+        storage_path=str(tmp_path / "tickets.jsonl"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        snapshot_interval=0,
+    )
+    parking, _, storage = build_parking(config)
+    assert isinstance(parking, CarParking)
+    storage.close()
+
+    parking, _, storage = build_parking(config._replace(metrics=True))
+    assert isinstance(parking, InstrumentedParking)
+    assert isinstance(storage, InstrumentedStorage)
+    storage.close()
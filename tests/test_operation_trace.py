@@ -0,0 +1,112 @@
+from pathlib import Path
+
+import pytest
+
+from src.config import build_parking, load_config
+from src.exceptions import CarSizeError, ParkingInitError
+from src.operation_trace import (
+    PARK,
+    RETURN,
+    TraceEvent,
+    TraceRecorder,
+    read_trace,
+    replay_trace,
+)
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_storage import TicketJournalFileStorage, TicketJsonFileStorage
+
+
+def new_parking(path: Path, small: int = 1) -> CarParking:
+    """Returns a parking with only small slots, storing tickets at `path`."""
+    return CarParking(get_parking_slots(small, 0, 0), TicketJsonFileStorage(path))
+
+
+# --- Tests for TraceRecorder ---
+
+
+def test_recorder_links_returns_to_parks(tmp_path: Path):
+    """Tests that recorded returns point at the park that issued the ticket."""
+    recorder = TraceRecorder(new_parking(tmp_path / "tickets.json"), tmp_path / "ops.trace")
+    first, _ = recorder.park_car(Size.SMALL)
+    with pytest.raises(CarSizeError):
+        recorder.park_car(Size.SMALL)
+    assert recorder.return_car(first)
+    assert not recorder.return_car("missing", Size.SMALL)
+    recorder.park_cars([Size.SMALL])
+    recorder.close()
+
+    events = list(read_trace(tmp_path / "ops.trace"))
+    assert [(e.operation, e.size, e.park) for e in events] == [
+        (PARK, Size.SMALL, -1),
+        (PARK, Size.SMALL, -1),
+        (RETURN, Size.SMALL, 0),
+        (RETURN, Size.SMALL, -1),
+        (PARK, Size.SMALL, -1),
+    ]
+    assert all(a.time <= b.time for a, b in zip(events, events[1:]))
+
+
+# --- Tests for replay_trace ---
+
+
+def test_replay_returns_its_own_tickets(tmp_path: Path):
+    """Tests that a replay returns the tickets its own parks issued."""
+    events = [
+        TraceEvent(0.0, PARK, Size.SMALL, -1),
+        TraceEvent(0.0, PARK, Size.SMALL, -1),  # lot full
+        TraceEvent(0.0, RETURN, Size.SMALL, 0),
+        TraceEvent(0.0, RETURN, Size.SMALL, 1),  # its park failed
+        TraceEvent(0.0, PARK, Size.SMALL, -1),
+    ]
+    parking = CarParking(
+        get_parking_slots(1, 0, 0), TicketJournalFileStorage(tmp_path / "tickets.log")
+    )
+    result = replay_trace(events, parking)
+
+    assert result.operations["park_car"]["ops"] == 3
+    assert result.operations["park_car"]["failures"] == 1
+    assert result.operations["return_car"]["ops"] == 2
+    assert result.operations["return_car"]["failures"] == 1
+    assert result.throughput > 0
+    assert parking.available_slots()[Size.SMALL] == 0
+
+
+def test_replay_keeps_recorded_pace(tmp_path: Path):
+    """Tests that a replay waits out the recorded gaps, scaled by speed."""
+    events = [
+        TraceEvent(0.0, PARK, Size.SMALL, -1),
+        TraceEvent(0.2, RETURN, Size.SMALL, 0),
+    ]
+    result = replay_trace(events, new_parking(tmp_path / "tickets.json"), speed=2.0)
+    assert result.elapsed >= 0.1
+
+
+# --- Tests for read_trace ---
+
+
+def test_read_trace_rejects_other_files(tmp_path: Path):
+    """Tests that a file without the trace header is refused."""
+    path = tmp_path / "tickets.json"
+    path.write_text("[]")
+    with pytest.raises(ParkingInitError):
+        list(read_trace(path))
+
+
+# --- Tests for build_parking ---
+
+
+def test_build_parking_records_trace(tmp_path: Path):
+    """Tests that a configured trace path wraps the parking in a recorder."""
+    config = load_config(
+        env={},
+        storage_path=str(tmp_path / "tickets.json"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        trace_path=str(tmp_path / "ops.trace"),
+    )
+    parking, _, _ = build_parking(config)
+    assert isinstance(parking, TraceRecorder)
+    ticket_id, _ = parking.park_car(Size.SMALL)
+    parking.return_car(ticket_id)
+    parking.close()
+    assert len(list(read_trace(tmp_path / "ops.trace"))) == 2
@@ -3,9 +3,10 @@ import uuid
 from unittest.mock import patch, MagicMock
 
 # Import classes and functions from the project
-from src.parking_slots import get_parking_slots, Size, ParkingSlots
-from src.exceptions import SlotsError, CarSizeError
+from src.parking_slots import get_parking_slots, Size, ParkingSlots, SlotBitmap
+from src.exceptions import SlotsError, CarSizeError, ManageCarError
 from src.parking_system import CarParking, parking_init
+from src.ticket_storage import TicketJsonFileStorage, TicketSharedFileStorage
 
 
 # --- Fixtures ---
@@ -29,6 +30,14 @@ def limited_slots() -> ParkingSlots:
     return get_parking_slots(1, 1, 1)
 
 
+@pytest.fixture
+def storage() -> MagicMock:
+    """Returns a mocked ticket storage that knows no tickets."""
+    storage = MagicMock()
+    storage.get.return_value = None
+    return storage
+
+
 # --- Tests for parking_slots.py ---
 
 
@@ -78,26 +87,71 @@ def test_parking_slots_iteration_and_length(standard_slots: ParkingSlots):
     assert Size.LARGE in sizes
 
 
+def test_slot_bitmap_allocates_lowest_free_slot():
+    """Tests that slots are handed out lowest number first and reused."""
+    bitmap = SlotBitmap(130)
+    assert [bitmap.acquire() for _ in range(3)] == [0, 1, 2]
+    bitmap.release(1)
+    assert bitmap.acquire() == 1
+    assert bitmap.free == 127
+
+
+def test_slot_bitmap_spans_words():
+    """Tests allocation across 64-bit word boundaries until the bitmap is full."""
+    bitmap = SlotBitmap(130)
+    numbers = [bitmap.acquire() for _ in range(130)]
+    assert numbers == list(range(130))
+    assert bitmap.acquire() is None
+    bitmap.release(129)
+    bitmap.release(64)
+    assert bitmap.acquire() == 64
+    assert bitmap.acquire() == 129
+
+
+def test_slot_bitmap_rejects_double_free():
+    """Tests that freeing a free slot or taking a taken one raises SlotsError."""
+    bitmap = SlotBitmap(10)
+    with pytest.raises(SlotsError):
+        bitmap.release(3)
+    bitmap.take(3)
+    with pytest.raises(SlotsError):
+        bitmap.take(3)
+    assert bitmap.acquire() == 0
+    assert bitmap.free == 8
+
+
 # --- Tests for parking_system.py ---
 
 
-def test_parking_init(standard_slots: ParkingSlots):
+def test_parking_init(standard_slots: ParkingSlots, storage):
     """Tests the parking_init function."""
-    parking = parking_init(slots=standard_slots, parking_class=CarParking)
+    parking = parking_init(
+        slots=standard_slots, parking_class=CarParking, storage=storage
+    )
     assert isinstance(parking, CarParking)
     assert parking._slots is standard_slots
+    assert parking._storage is storage
 
 
 @pytest.fixture
-def parking_system(limited_slots: ParkingSlots) -> CarParking:
+def parking_system(limited_slots: ParkingSlots, storage) -> CarParking:
     """Returns a CarParking system with 1 slot of each size."""
-    return CarParking(limited_slots)
+    return CarParking(limited_slots, storage)
+
+
+def test_parking_uses_one_storage_for_all_operations(tmp_path):
+    """Tests that park and return go through the injected storage."""
+    storage = TicketJsonFileStorage(tmp_path / "tickets.json")
+    parking = CarParking(get_parking_slots(1, 1, 1), storage)
+
+    ticket_id, slot_name = parking.park_car(Size.SMALL)
+    assert parking.return_car(ticket_id, Size[slot_name]) is True
+    assert parking.return_car(ticket_id, Size[slot_name]) is False
 
 
-@patch("src.parking_system.TicketJsonFileStorage")
 @patch("src.parking_system.save_ticket_id_to_storage")
 def test_park_small_car_in_small_slot(
-    mock_save, mock_storage, parking_system: CarParking
+    mock_save, parking_system: CarParking
 ):
     """Tests parking a small car in an available small slot."""
     mock_save.return_value = True
@@ -108,12 +162,11 @@ def test_park_small_car_in_small_slot(
     assert parking_system._slots[Size.SMALL] == 0
 
 
-@patch("src.parking_system.TicketJsonFileStorage")
 @patch("src.parking_system.save_ticket_id_to_storage")
-def test_park_small_car_in_medium_slot(mock_save, mock_storage):
+def test_park_small_car_in_medium_slot(mock_save, storage):
     """Tests parking a small car in a medium slot when small slots are occupied."""
     slots = get_parking_slots(small=0, medium=1, large=1)
-    parking = CarParking(slots)
+    parking = CarParking(slots, storage)
     mock_save.return_value = True
 
     ticket_id, slot_name = parking.park_car(Size.SMALL)
@@ -124,12 +177,11 @@ def test_park_small_car_in_medium_slot(mock_save, mock_storage):
     assert parking._slots[Size.MEDIUM] == 0
 
 
-@patch("src.parking_system.TicketJsonFileStorage")
 @patch("src.parking_system.save_ticket_id_to_storage")
-def test_park_small_car_in_large_slot(mock_save, mock_storage):
+def test_park_small_car_in_large_slot(mock_save, storage):
     """Tests parking a small car in a large slot when small and medium slots are occupied."""
     slots = get_parking_slots(small=0, medium=0, large=1)
-    parking = CarParking(slots)
+    parking = CarParking(slots, storage)
     mock_save.return_value = True
 
     ticket_id, slot_name = parking.park_car(Size.SMALL)
@@ -139,12 +191,11 @@ def test_park_small_car_in_large_slot(mock_save, mock_storage):
     assert parking._slots[Size.LARGE] == 0
 
 
-@patch("src.parking_system.TicketJsonFileStorage")
 @patch("src.parking_system.save_ticket_id_to_storage")
-def test_park_medium_car_in_large_slot(mock_save, mock_storage):
+def test_park_medium_car_in_large_slot(mock_save, storage):
     """Tests parking a medium car in a large slot when medium slots are occupied."""
     slots = get_parking_slots(small=1, medium=0, large=1)
-    parking = CarParking(slots)
+    parking = CarParking(slots, storage)
     mock_save.return_value = True
 
     ticket_id, slot_name = parking.park_car(Size.MEDIUM)
@@ -154,34 +205,33 @@ def test_park_medium_car_in_large_slot(mock_save, mock_storage):
     assert parking._slots[Size.LARGE] == 0
 
 
-def test_no_slots_for_small_car(empty_slots: ParkingSlots):
+def test_no_slots_for_small_car(empty_slots: ParkingSlots, storage):
     """Tests that a small car cannot be parked when all slots are occupied."""
-    parking = CarParking(empty_slots)
+    parking = CarParking(empty_slots, storage)
     with pytest.raises(CarSizeError):
         parking.park_car(Size.SMALL)
 
 
-def test_no_slots_for_medium_car():
+def test_no_slots_for_medium_car(storage):
     """Tests that a medium car cannot be parked when only small slots are available."""
     slots = get_parking_slots(small=1, medium=0, large=0)
-    parking = CarParking(slots)
+    parking = CarParking(slots, storage)
     with pytest.raises(CarSizeError):
         parking.park_car(Size.MEDIUM)
 
 
-def test_no_slots_for_large_car():
+def test_no_slots_for_large_car(storage):
     """Tests that a large car cannot be parked when only small/medium slots are available."""
     slots = get_parking_slots(small=1, medium=1, large=0)
-    parking = CarParking(slots)
+    parking = CarParking(slots, storage)
     with pytest.raises(CarSizeError):
         parking.park_car(Size.LARGE)
 
 
-@patch("src.parking_system.TicketJsonFileStorage")
 @patch("src.parking_system.save_ticket_id_to_storage")
 @patch("src.parking_system.retrieve_ticket_id_from_storage")
 def test_return_car_success(
-    mock_retrieve, mock_save, mock_storage, parking_system: CarParking
+    mock_retrieve, mock_save, parking_system: CarParking
 ):
     """Tests successful car return with a valid ticket."""
     mock_save.return_value = True
@@ -195,10 +245,9 @@ def test_return_car_success(
     assert parking_system._slots[Size.MEDIUM] == 1
 
 
-@patch("src.parking_system.TicketJsonFileStorage")
 @patch("src.parking_system.retrieve_ticket_id_from_storage")
 def test_return_car_invalid_ticket(
-    mock_retrieve, mock_storage, parking_system: CarParking
+    mock_retrieve, parking_system: CarParking
 ):
     """Tests car return with an invalid or non-existent ticket."""
     mock_retrieve.return_value = False
@@ -208,3 +257,149 @@ def test_return_car_invalid_ticket(
     assert result is False
     # Slot count should remain unchanged (1 for limited_slots)
     assert parking_system._slots[Size.SMALL] == 1
+
+
+# --- Tests for bulk park and return ---
+
+
+@pytest.fixture
+def json_parking(tmp_path) -> CarParking:
+    """Returns a CarParking with 1 slot of each size and a real JSON storage."""
+    storage = TicketJsonFileStorage(tmp_path / "tickets.json")
+    return CarParking(get_parking_slots(1, 1, 1), storage)
+
+
+def test_park_cars_reports_each_car(json_parking: CarParking):
+    """Tests that a bulk park allocates slots and reports failures per car."""
+    results = json_parking.park_cars([Size.SMALL, Size.SMALL, Size.LARGE, Size.SMALL])
+
+    assert [result.slot_size for result in results] == ["SMALL", "MEDIUM", "LARGE", None]
+    assert results[3].ticket_id is None
+    assert results[3].error is not None
+    assert all(json_parking._slots[size] == 0 for size in Size)
+
+
+def test_park_cars_uses_one_storage_batch(json_parking: CarParking):
+    """Tests that a bulk park writes the ticket file once."""
+    with patch.object(json_parking._storage, "_write_parking_data") as mock_write:
+        json_parking.park_cars([Size.SMALL, Size.MEDIUM, Size.LARGE])
+    mock_write.assert_called_once()
+
+
+def test_return_cars_frees_slots(json_parking: CarParking):
+    """Tests that a bulk return frees the slots of valid tickets only."""
+    parked = json_parking.park_cars([Size.SMALL, Size.MEDIUM])
+    tickets = [(result.ticket_id, Size[result.slot_size]) for result in parked]
+    tickets.append((str(uuid.uuid4()), Size.LARGE))
+
+    results = json_parking.return_cars(tickets)
+
+    assert [result.error is None for result in results] == [True, True, False]
+    assert json_parking._slots[Size.SMALL] == 1
+    assert json_parking._slots[Size.MEDIUM] == 1
+    assert json_parking._slots[Size.LARGE] == 1
+
+
+@patch("src.parking_system.save_ticket_ids_to_storage")
+def test_park_cars_rolls_back_unsaved_tickets(mock_save, parking_system: CarParking):
+    """Tests that slots of tickets the storage rejected are given back."""
+    mock_save.return_value = [True, False]
+
+    results = parking_system.park_cars([Size.SMALL, Size.MEDIUM])
+
+    assert results[0].error is None
+    assert results[1].error is not None
+    assert parking_system._slots[Size.SMALL] == 0
+    assert parking_system._slots[Size.MEDIUM] == 1
+
+
+def test_locate_car_returns_slot_number(json_parking: CarParking):
+    """Tests that a parked car can be located by its ticket until it is returned."""
+    first, _ = json_parking.park_car(Size.LARGE)
+    assert json_parking.locate_car(first) == (Size.LARGE, 0)
+
+    assert json_parking.return_car(first, Size.LARGE) is True
+    assert json_parking.locate_car(first) is None
+
+
+def test_slot_number_is_saved_with_ticket(tmp_path):
+    """Tests that the storage record keeps the slot number of the car."""
+    storage = TicketJsonFileStorage(tmp_path / "tickets.json")
+    parking = CarParking(get_parking_slots(3, 0, 0), storage)
+    parking.park_car(Size.SMALL)
+    ticket_id, _ = parking.park_car(Size.SMALL)
+
+    reopened = TicketJsonFileStorage(tmp_path / "tickets.json")
+    assert reopened._tickets[ticket_id]["slot_number"] == 1
+
+
+def test_park_and_return_log_structured_fields(json_parking: CarParking, caplog):
+    """Tests that log records carry the ticket, size and latency as fields."""
+    with caplog.at_level("INFO", logger="src.parking_system"):
+        ticket_id, _ = json_parking.park_car(Size.SMALL)
+        json_parking.return_car(ticket_id, Size.SMALL)
+
+    parked, returned = caplog.records
+    assert parked.args[-1] == ticket_id
+    assert (parked.ticket_id, parked.size, parked.slot_number) == (ticket_id, "SMALL", 0)
+    assert parked.latency >= 0
+    assert (returned.ticket_id, returned.size) == (ticket_id, "SMALL")
+
+
+def test_storage_helpers_do_not_print(capsys, storage):
+    """Tests that storage failures are reported by the return value only."""
+    from src.ticket_storage import save_ticket_id_to_storage
+
+    storage.save.return_value = False
+    assert save_ticket_id_to_storage(storage, "t1", Size.SMALL) is False
+    assert capsys.readouterr().out == ""
+
+
+# --- Tests for gates sharing a ticket file ---
+
+
+def test_gates_sharing_a_file_share_its_slots(tmp_path):
+    """Tests that a car parked at one gate can be returned at the other."""
+    jsonfile = tmp_path / "tickets.json"
+    gate_a = CarParking(get_parking_slots(1, 0, 0), TicketSharedFileStorage(jsonfile))
+    gate_b = CarParking(get_parking_slots(1, 0, 0), TicketSharedFileStorage(jsonfile))
+
+    ticket_id, _ = gate_a.park_car(Size.SMALL)
+    with pytest.raises(CarSizeError):
+        gate_b.park_car(Size.SMALL)
+    assert gate_b.available_slots()[Size.SMALL] == 0
+
+    assert gate_b.return_car(ticket_id) is True
+    assert gate_b.available_slots()[Size.SMALL] == 1
+    # Gate A learns about the return with its next operation.
+    second, _ = gate_a.park_car(Size.SMALL)
+    assert gate_a.locate_car(second) == (Size.SMALL, 0)
+    assert gate_a.locate_car(ticket_id) is None
+    assert [r["ticket_id"] for r in gate_b._storage.records()] == [second]
+    gate_a._storage.close()
+    gate_b._storage.close()
+
+
+def test_shared_file_refuses_a_taken_slot(tmp_path):
+    """Tests that a gate can't save a ticket for a slot another gate's ticket holds."""
+    jsonfile = tmp_path / "tickets.json"
+    gate_a = CarParking(get_parking_slots(1, 0, 0), TicketSharedFileStorage(jsonfile))
+    gate_b = CarParking(get_parking_slots(1, 0, 0), TicketSharedFileStorage(jsonfile))
+    # A hold is only known to the gate that made it.
+    held, _ = gate_a.reserve_slot(Size.SMALL, 60)
+    gate_b.park_car(Size.SMALL)
+
+    with pytest.raises(ManageCarError):
+        gate_a.park_reserved(held)
+    assert len(list(gate_a._storage.records())) == 1
+    gate_a._storage.close()
+    gate_b._storage.close()
+
+
+def test_returning_a_free_slot_does_not_fail(json_parking: CarParking, caplog):
+    """Tests that a return whose slot was already freed still succeeds."""
+    ticket_id, _ = json_parking.park_car(Size.SMALL)
+    json_parking._slots.release(Size.SMALL, 0)
+
+    assert json_parking.return_car(ticket_id) is True
+    assert "was already free" in caplog.text
@@ -0,0 +1,113 @@
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from src.exceptions import CarSizeError, ParkingInitError
+from src.parking_cluster import ParkingCluster, cluster_init
+from src.parking_slots import Size, Slots
+from src.parking_system import ticket_shard
+from src.ticket_storage import TicketJournalFileStorage
+
+
+def journal_factories(tmp_path: Path, count: int) -> list:
+    """Returns picklable storage factories, one journal per shard."""
+    return [
+        partial(TicketJournalFileStorage, tmp_path / f"shard-{i}.jsonl")
+        for i in range(count)
+    ]
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def cluster(tmp_path: Path) -> ParkingCluster:
+    """Returns a three-shard in-process cluster with one slot of each size per shard."""
+    return cluster_init([Slots(1, 1, 1)] * 3, journal_factories(tmp_path, 3))
+
+
+# --- Tests for ParkingCluster ---
+
+
+def test_ticket_encodes_owning_shard(cluster: ParkingCluster):
+    """Tests that tickets carry the shard that issued them."""
+    ticket_id, _ = cluster.park_car(Size.SMALL, preferred_shard=2)
+    assert ticket_shard(ticket_id) == 2
+
+
+def test_ticket_shard_of_untagged_ticket():
+    """Tests that plain UUID tickets have no shard."""
+    assert ticket_shard("1d89ab4d-7bd8-4a76-8a7e-7a8e398260a0") is None
+
+
+def test_park_spills_over_to_neighbour(cluster: ParkingCluster):
+    """Tests that a full preferred shard sends the car to the nearest one."""
+    first, _ = cluster.park_car(Size.LARGE, preferred_shard=1)
+    second, _ = cluster.park_car(Size.LARGE, preferred_shard=1)
+    third, _ = cluster.park_car(Size.LARGE, preferred_shard=1)
+    assert [ticket_shard(t) for t in (first, second, third)] == [1, 2, 0]
+    with pytest.raises(CarSizeError):
+        cluster.park_car(Size.LARGE, preferred_shard=1)
+
+
+def test_return_routes_to_owning_shard(cluster: ParkingCluster):
+    """Tests that a return frees the slot in the shard that issued the ticket."""
+    ticket_id, slot_name = cluster.park_car(Size.MEDIUM, preferred_shard=2)
+    assert cluster.locate_car(ticket_id) == (Size.MEDIUM, 0)
+    assert cluster.return_car(ticket_id, Size[slot_name]) is True
+    assert cluster.return_car(ticket_id, Size[slot_name]) is False
+    assert cluster.return_car("s9-unknown", Size.MEDIUM) is False
+
+
+def test_bulk_park_and_return_across_shards(cluster: ParkingCluster):
+    """Tests that bulk parks spill over and bulk returns are grouped by shard."""
+    parked = cluster.park_cars([Size.LARGE] * 4, preferred_shard=0)
+    assert sorted(ticket_shard(r.ticket_id) for r in parked[:3]) == [0, 1, 2]
+    assert parked[3].error is not None
+
+    returned = cluster.return_cars(
+        [(r.ticket_id, Size[r.slot_size]) for r in parked[:3]]
+    )
+    assert all(result.error is None for result in returned)
+
+
+def test_cluster_needs_shards():
+    """Tests that an empty cluster is rejected."""
+    with pytest.raises(ParkingInitError):
+        ParkingCluster([])
+
+
+def test_shards_in_worker_processes(tmp_path: Path):
+    """Tests parking and returning through shards running in processes."""
+    cluster = cluster_init(
+        [Slots(1, 0, 0), Slots(1, 0, 0)], journal_factories(tmp_path, 2), processes=True
+    )
+    try:
+        first, _ = cluster.park_car(Size.SMALL, preferred_shard=1)
+        second, _ = cluster.park_car(Size.SMALL, preferred_shard=1)
+        assert (ticket_shard(first), ticket_shard(second)) == (1, 0)
+        with pytest.raises(CarSizeError):
+            cluster.park_car(Size.SMALL)
+        assert cluster.return_car(first, Size.SMALL) is True
+    finally:
+        cluster.close()
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_restarted_cluster_keeps_parked_cars(tmp_path: Path, processes: bool):
+    """Tests that shards take back the slots of tickets stored before a restart."""
+    factories = journal_factories(tmp_path, 2)
+    cluster = cluster_init([Slots(1, 0, 0)] * 2, factories)
+    ticket_id, _ = cluster.park_car(Size.SMALL, preferred_shard=1)
+
+    restarted = cluster_init([Slots(1, 0, 0)] * 2, factories, processes=processes)
+    try:
+        assert restarted.available_slots()[Size.SMALL] == 1
+        restarted.park_car(Size.SMALL)
+        with pytest.raises(CarSizeError):
+            restarted.park_car(Size.SMALL)
+        assert restarted.return_car(ticket_id) is True
+        assert restarted.available_slots()[Size.SMALL] == 1
+    finally:
+        restarted.close()
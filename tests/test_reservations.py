@@ -0,0 +1,168 @@
+import time
+
+import pytest
+
+from src.exceptions import CarSizeError, ReservationError
+from src.parking_cluster import ParkingCluster
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.reservations import ReservationBook
+from src.ticket_storage import TicketJsonFileStorage
+
+
+# --- Fixtures ---
+
+
+class FakeClock:
+    """Clock that only moves when a test moves it."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Returns a fake clock for a test."""
+    return FakeClock()
+
+
+@pytest.fixture
+def parking(tmp_path, clock) -> CarParking:
+    """Returns a parking with one slot per size and a fake-clock book."""
+    return CarParking(
+        get_parking_slots(1, 1, 1),
+        TicketJsonFileStorage(tmp_path / "tickets.json"),
+        reservations=ReservationBook(clock),
+    )
+
+
+# --- Tests for ReservationBook ---
+
+
+def test_book_expires_holds_in_time_order(clock):
+    """Tests that holds expire by deadline, not by insertion order."""
+    book = ReservationBook(clock)
+    book.add("late", Size.SMALL, 0, 30)
+    book.add("early", Size.SMALL, 1, 10)
+    assert book.expired() == []
+    clock.now += 20
+    assert [r.ticket_id for r in book.expired()] == ["early"]
+    clock.now += 20
+    assert [r.ticket_id for r in book.expired()] == ["late"]
+    assert len(book) == 0
+
+
+def test_book_skips_taken_holds(clock):
+    """Tests that taken holds are neither taken again nor expired."""
+    book = ReservationBook(clock)
+    for number in range(200):
+        book.add(f"t{number}", Size.SMALL, number, 10)
+    for number in range(199):
+        assert book.take(f"t{number}").slot_number == number
+    assert book.take("t0") is None
+    clock.now += 10
+    assert [r.ticket_id for r in book.expired()] == ["t199"]
+    assert book.take("t199") is None
+
+
+def test_book_does_not_hand_out_expired_holds(clock):
+    """Tests that a hold past its deadline can't be taken."""
+    book = ReservationBook(clock)
+    book.add("ticket", Size.SMALL, 0, 10)
+    clock.now += 10
+    assert book.take("ticket") is None
+    assert len(book.expired()) == 1
+
+
+# --- Tests for ParkingSlots holds ---
+
+
+def test_held_slots_are_not_free():
+    """Tests that held slots leave the free count until unheld."""
+    slots = get_parking_slots(2, 0, 0)
+    number = slots.hold(Size.SMALL)
+    assert slots[Size.SMALL] == 1
+    assert slots.held(Size.SMALL) == 1
+    slots.claim(Size.SMALL, number)
+    assert slots[Size.SMALL] == 1
+    assert slots.held(Size.SMALL) == 0
+    other = slots.hold(Size.SMALL)
+    slots.unhold(Size.SMALL, other)
+    assert slots[Size.SMALL] == 1
+    assert slots.held(Size.SMALL) == 0
+
+
+# --- Tests for CarParking reservations ---
+
+
+def test_reserved_slot_is_kept_for_booked_car(parking: CarParking):
+    """Tests that a held slot goes to its booked car only."""
+    ticket_id, slot_size = parking.reserve_slot(Size.LARGE, 600)
+    assert slot_size == "LARGE"
+    assert parking.available_slots()[Size.LARGE] == 0
+    with pytest.raises(CarSizeError):
+        parking.park_car(Size.LARGE)
+
+    assert parking.park_reserved(ticket_id) == (ticket_id, "LARGE")
+    assert parking.locate_car(ticket_id) == (Size.LARGE, 0)
+    assert parking.return_car(ticket_id)
+    assert parking.available_slots()[Size.LARGE] == 1
+
+
+def test_expired_reservation_frees_slot(parking: CarParking, clock):
+    """Tests that an expired hold frees its slot and voids its ticket."""
+    ticket_id, _ = parking.reserve_slot(Size.LARGE, 600)
+    clock.now += 600
+    assert parking.available_slots()[Size.LARGE] == 1
+    with pytest.raises(ReservationError):
+        parking.park_reserved(ticket_id)
+    parking.park_car(Size.LARGE)
+
+
+def test_expired_holds_are_freed_without_further_calls(tmp_path):
+    """Tests that the timer frees and publishes holds on an idle lot."""
+    parking = CarParking(
+        get_parking_slots(1, 0, 1),
+        TicketJsonFileStorage(tmp_path / "tickets.json"),
+    )
+    parking.reserve_slot(Size.LARGE, 600)
+    # Due before the hold the timer already waits for.
+    parking.reserve_slot(Size.SMALL, 0.05)
+    deadline = time.monotonic() + 5
+    while parking.availability().free[Size.SMALL] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert parking.availability().free[Size.LARGE] == 0
+
+
+def test_cancel_reservation(parking: CarParking):
+    """Tests that a cancelled hold frees its slot once."""
+    ticket_id, _ = parking.reserve_slot(Size.SMALL, 600)
+    assert parking.cancel_reservation(ticket_id)
+    assert not parking.cancel_reservation(ticket_id)
+    assert parking.available_slots()[Size.SMALL] == 1
+    with pytest.raises(ReservationError):
+        parking.park_reserved(ticket_id)
+
+
+def test_cluster_routes_reservations_to_their_shard(tmp_path):
+    """Tests that a cluster parks and cancels holds on their own shard."""
+    shards = [
+        CarParking(
+            get_parking_slots(0, 0, 1),
+            TicketJsonFileStorage(tmp_path / f"tickets{shard_id}.json"),
+            shard_id=shard_id,
+        )
+        for shard_id in range(2)
+    ]
+    cluster = ParkingCluster(shards)
+    first, _ = cluster.reserve_slot(Size.LARGE, 600)
+    second, _ = cluster.reserve_slot(Size.LARGE, 600)
+    with pytest.raises(CarSizeError):
+        cluster.reserve_slot(Size.LARGE, 600)
+    assert cluster.park_reserved(second) == (second, "LARGE")
+    assert shards[1].locate_car(second) == (Size.LARGE, 0)
+    assert cluster.cancel_reservation(first)
@@ -0,0 +1,104 @@
+import pytest
+
+from src.allocation import OverflowThreshold, best_fit, exact_fit, worst_fit
+from src.exceptions import ParkingInitError
+from src.parking_slots import Size, Slots, get_parking_slots
+from src.parking_system import CarParking
+from src.simulation import Arrival, read_arrivals, simulate, synthetic_traffic
+from src.ticket_storage import TicketJsonFileStorage
+
+
+# --- Tests for allocation policies ---
+
+
+def test_policies_order_fitting_sizes():
+    """Tests the order in which each policy offers fitting sizes."""
+    free = dict.fromkeys(Size, 1)
+    assert list(best_fit(Size.SMALL, free)) == [Size.SMALL, Size.MEDIUM, Size.LARGE]
+    assert list(worst_fit(Size.SMALL, free)) == [Size.LARGE, Size.MEDIUM, Size.SMALL]
+    assert list(exact_fit(Size.MEDIUM, free)) == [Size.MEDIUM]
+
+
+def test_overflow_threshold_keeps_slots_for_own_size():
+    """Tests that smaller cars can't take the last slots kept for a size."""
+    policy = OverflowThreshold({Size.LARGE: 2})
+    assert policy(Size.SMALL, {Size.SMALL: 0, Size.MEDIUM: 1, Size.LARGE: 3}) == [
+        Size.SMALL,
+        Size.MEDIUM,
+        Size.LARGE,
+    ]
+    assert policy(Size.SMALL, {Size.SMALL: 0, Size.MEDIUM: 1, Size.LARGE: 2}) == [
+        Size.SMALL,
+        Size.MEDIUM,
+    ]
+    assert policy(Size.LARGE, {Size.SMALL: 0, Size.MEDIUM: 0, Size.LARGE: 1}) == [
+        Size.LARGE
+    ]
+
+
+def test_car_parking_uses_policy(tmp_path):
+    """Tests that CarParking picks the slot offered by its policy."""
+    parking = CarParking(
+        get_parking_slots(1, 1, 1),
+        TicketJsonFileStorage(tmp_path / "tickets.json"),
+        policy=worst_fit,
+    )
+    _, slot_size = parking.park_car(Size.SMALL)
+    assert slot_size == "LARGE"
+
+
+# --- Tests for the simulation ---
+
+
+def test_simulate_frees_slots_on_departure():
+    """Tests that a departed car's slot is free for later arrivals."""
+    arrivals = [
+        Arrival(0.0, Size.SMALL, 1.0),
+        Arrival(0.5, Size.SMALL, 1.0),  # the only slot is taken
+        Arrival(1.0, Size.SMALL, 1.0),  # the first car has left
+    ]
+    result = simulate(Slots(1, 0, 0), arrivals, hours=2.0)
+    assert result.arrivals[Size.SMALL] == 3
+    assert result.rejected[Size.SMALL] == 1
+    assert result.parked == 2
+    assert result.rejection_rate == pytest.approx(1 / 3)
+    assert result.throughput == pytest.approx(1.0)
+    assert result.utilization[Size.SMALL] == pytest.approx(1.0)
+
+
+def test_simulate_cuts_stays_at_the_horizon():
+    """Tests that stays running past the horizon count only up to it."""
+    result = simulate(Slots(0, 0, 2), [Arrival(0.0, Size.LARGE, 10.0)], hours=4.0)
+    assert result.utilization[Size.LARGE] == pytest.approx(0.5)
+    assert result.utilization[Size.SMALL] == 0.0
+
+
+def test_reserving_large_bays_helps_large_cars():
+    """Tests that keeping a large bay back stops small cars from taking it."""
+    arrivals = [Arrival(0.0, Size.SMALL, 5.0), Arrival(1.0, Size.LARGE, 5.0)]
+    slots = Slots(0, 0, 1)
+    assert simulate(slots, arrivals, best_fit).rejected[Size.LARGE] == 1
+    kept = simulate(slots, arrivals, OverflowThreshold({Size.LARGE: 1}))
+    assert kept.rejected == {Size.SMALL: 1, Size.MEDIUM: 0, Size.LARGE: 0}
+
+
+def test_synthetic_traffic_is_reproducible_and_sorted():
+    """Tests that a seed gives the same arrivals, in time order."""
+    first = list(synthetic_traffic(24, 50, seed=7))
+    assert first == list(synthetic_traffic(24, 50, seed=7))
+    assert 900 < len(first) < 1500
+    assert all(a.time <= b.time for a, b in zip(first, first[1:]))
+    assert first[-1].time < 24
+
+
+def test_read_arrivals(tmp_path):
+    """Tests reading arrivals from a CSV trace and rejecting unknown sizes."""
+    trace = tmp_path / "arrivals.csv"
+    trace.write_text("time,car_size,stay\n0.5,small,2\n1.0,LARGE,0.25\n")
+    assert list(read_arrivals(trace)) == [
+        Arrival(0.5, Size.SMALL, 2.0),
+        Arrival(1.0, Size.LARGE, 0.25),
+    ]
+    trace.write_text("time,car_size,stay\n0.5,HUGE,2\n")
+    with pytest.raises(ParkingInitError):
+        list(read_arrivals(trace))
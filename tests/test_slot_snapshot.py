@@ -0,0 +1,171 @@
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.config import build_parking, load_config
+from src.exceptions import SlotsError
+from src.parking_slots import Size, Slots, get_parking_slots
+from src.parking_system import CarParking
+from src.slot_snapshot import (
+    PeriodicSlotSnapshot,
+    restore_parking_slots,
+    save_slots_snapshot,
+)
+from src.ticket_storage import TicketJournalFileStorage, TicketJsonFileStorage
+
+SLOTS = Slots(small_slots=3, medium_slots=2, large_slots=1)
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def journal_path(tmp_path: Path) -> Path:
+    """Returns a path for a fresh journal file."""
+    return tmp_path / "tickets.jsonl"
+
+
+@pytest.fixture
+def snapshot_path(tmp_path: Path) -> Path:
+    """Returns a path for the slot snapshot."""
+    return tmp_path / "slots.snapshot"
+
+
+def restart(journal_path: Path, snapshot_path: Path) -> CarParking:
+    """Opens the journal again and restores the slots like a fresh process."""
+    storage = TicketJournalFileStorage(journal_path)
+    slots = restore_parking_slots(SLOTS, storage, snapshot=snapshot_path)
+    return CarParking(slots, storage)
+
+
+# --- Tests for restore_parking_slots ---
+
+
+def test_restore_without_snapshot_keeps_parked_cars(journal_path, snapshot_path):
+    """Tests that active tickets keep their slots after a restart."""
+    parking = restart(journal_path, snapshot_path)
+    parking.park_car(Size.SMALL)
+    parking.park_car(Size.LARGE)
+
+    restarted = restart(journal_path, snapshot_path)
+    assert restarted._slots[Size.SMALL] == 2
+    assert restarted._slots[Size.LARGE] == 0
+    ticket_id, _ = restarted.park_car(Size.SMALL)
+    assert restarted.locate_car(ticket_id) == (Size.SMALL, 1)
+
+
+def test_restore_from_snapshot_and_later_changes(journal_path, snapshot_path):
+    """Tests that changes written after the snapshot are replayed."""
+    storage = TicketJournalFileStorage(journal_path)
+    slots = restore_parking_slots(SLOTS, storage, snapshot=snapshot_path)
+    parking = CarParking(slots, storage)
+    first, _ = parking.park_car(Size.SMALL)
+    assert save_slots_snapshot(slots, storage, snapshot_path) is True
+
+    parking.return_car(first, Size.SMALL)
+    parking.park_car(Size.MEDIUM)
+    parking.park_car(Size.MEDIUM)
+    storage.close()
+
+    restarted = restart(journal_path, snapshot_path)
+    assert restarted._slots[Size.SMALL] == 3
+    assert restarted._slots[Size.MEDIUM] == 0
+
+
+def test_returned_car_after_restart_frees_its_slot(journal_path, snapshot_path):
+    """Tests that a ticket from before a restart frees its own slot."""
+    parking = restart(journal_path, snapshot_path)
+    parking.park_car(Size.SMALL)
+    ticket_id, _ = parking.park_car(Size.SMALL)
+
+    restarted = restart(journal_path, snapshot_path)
+    assert restarted.return_car(ticket_id, Size.SMALL) is True
+    new_ticket, _ = restarted.park_car(Size.SMALL)
+    assert restarted.locate_car(new_ticket) == (Size.SMALL, 1)
+
+
+def test_stale_snapshot_falls_back_to_tickets(journal_path, snapshot_path):
+    """Tests that a snapshot of an older journal generation is not trusted."""
+    storage = TicketJournalFileStorage(journal_path)
+    slots = restore_parking_slots(SLOTS, storage, snapshot=snapshot_path)
+    parking = CarParking(slots, storage)
+    parking.park_car(Size.LARGE)
+    save_slots_snapshot(slots, storage, snapshot_path)
+    storage.compact()
+    parking.park_car(Size.SMALL)
+    storage.close()
+
+    restarted = restart(journal_path, snapshot_path)
+    assert restarted._slots[Size.SMALL] == 2
+    assert restarted._slots[Size.LARGE] == 0
+
+
+def test_corrupt_snapshot_is_ignored(journal_path, snapshot_path):
+    """Tests that a damaged snapshot never frees an occupied slot."""
+    parking = restart(journal_path, snapshot_path)
+    parking.park_car(Size.LARGE)
+    save_slots_snapshot(parking._slots, parking._storage, snapshot_path)
+    data = bytearray(snapshot_path.read_bytes())
+    data[-1] ^= 0xFF
+    snapshot_path.write_bytes(bytes(data))
+
+    restarted = restart(journal_path, snapshot_path)
+    assert restarted._slots[Size.LARGE] == 0
+
+
+def test_snapshot_needs_storage_history(tmp_path, snapshot_path):
+    """Tests that storages without a history don't write snapshots."""
+    storage = TicketJsonFileStorage(tmp_path / "tickets.json")
+    assert save_slots_snapshot(get_parking_slots(1, 1, 1), storage, snapshot_path) is False
+    assert not snapshot_path.exists()
+
+
+def test_restore_rejects_tickets_beyond_capacity(journal_path):
+    """Tests that a shrunk lot can't silently drop parked cars."""
+    storage = TicketJournalFileStorage(journal_path)
+    storage.save("ticket-1", Size.LARGE, 0)
+    with pytest.raises(SlotsError):
+        restore_parking_slots(Slots(1, 1, 0), storage)
+
+
+# --- Tests for PeriodicSlotSnapshot ---
+
+
+def test_compaction_saves_a_fresh_snapshot(journal_path, snapshot_path):
+    """Tests that a snapshot taken after a compaction is still used on restart."""
+    storage = TicketJournalFileStorage(journal_path)
+    slots = restore_parking_slots(SLOTS, storage, snapshot=snapshot_path)
+    parking = CarParking(slots, storage)
+    snapshots = PeriodicSlotSnapshot(slots, storage, snapshot_path, interval=3600)
+    snapshots.start()
+    parking.park_car(Size.LARGE)
+    assert snapshots.save()
+    storage.compact()
+    parking.park_car(Size.SMALL)
+    storage.close()
+
+    restored = TicketJournalFileStorage(journal_path)
+    with patch("src.slot_snapshot._restore_from_records") as rebuild:
+        slots = restore_parking_slots(SLOTS, restored, snapshot=snapshot_path)
+    rebuild.assert_not_called()
+    assert (slots[Size.SMALL], slots[Size.LARGE]) == (2, 0)
+    restored.close()
+
+
+def test_build_parking_saves_snapshots(tmp_path):
+    """Tests that a parking built from the config saves snapshots on its own."""
+    config = load_config(
+        env={},
+        storage_backend="journal",
+        storage_path=str(tmp_path / "tickets.jsonl"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        snapshot_interval=0.01,
+    )
+    parking, _, _ = build_parking(config)
+    parking.park_car(Size.MEDIUM)
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "slots.snapshot").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (tmp_path / "slots.snapshot").exists()
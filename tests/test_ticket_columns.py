@@ -0,0 +1,110 @@
+import random
+from pathlib import Path
+
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_columns import CachedTicketStorage, TicketColumnStore
+from src.ticket_ids import TicketIdGenerator
+from src.ticket_storage import TicketSqliteStorage
+
+
+# --- Tests for TicketColumnStore ---
+
+
+def test_column_store_save_get_retrieve():
+    """Tests the full life of a ticket in the column store."""
+    store = TicketColumnStore()
+    ticket_id = TicketIdGenerator(2)(Size.MEDIUM)
+
+    assert store.save(ticket_id, Size.MEDIUM, 4)
+    assert not store.save(ticket_id, Size.MEDIUM, 4)
+    record = store.get(ticket_id)
+    assert (record["ticket_id"], record["slot_size"], record["slot_number"]) == (
+        ticket_id,
+        Size.MEDIUM,
+        4,
+    )
+    assert not store.retrieve(ticket_id, Size.LARGE)
+    assert store.retrieve(ticket_id, Size.MEDIUM)
+    assert store.get(ticket_id) is None
+    assert len(store) == 0
+
+
+def test_column_store_reuses_free_rows():
+    """Tests that rows of retrieved tickets are handed to new tickets."""
+    store = TicketColumnStore()
+    generate = TicketIdGenerator()
+    first, second = generate(Size.SMALL), generate(Size.SMALL)
+    store.save(first, Size.SMALL)
+    store.retrieve(first, Size.SMALL)
+    store.save(second, Size.SMALL)
+
+    assert len(store._keys) == 1
+    assert [r["ticket_id"] for r in store.records()] == [second]
+
+
+def test_column_store_matches_a_dict_under_churn():
+    """Tests lookups after many saves and retrieves, including table growth."""
+    store = TicketColumnStore()
+    generate = TicketIdGenerator()
+    rng = random.Random(7)
+    expected: dict[str, int] = {}
+    for step in range(20_000):
+        if expected and rng.random() < 0.45:
+            ticket_id = rng.choice(list(expected)) if step % 50 == 0 else next(iter(expected))
+            assert store.retrieve(ticket_id, Size.LARGE)
+            del expected[ticket_id]
+        else:
+            ticket_id = generate(Size.LARGE)
+            assert store.save(ticket_id, Size.LARGE, step)
+            expected[ticket_id] = step
+
+    assert len(store) == len(expected)
+    for ticket_id, number in expected.items():
+        assert store.get(ticket_id)["slot_number"] == number
+    assert {r["ticket_id"] for r in store.records()} == set(expected)
+
+
+def test_column_store_keeps_legacy_tickets():
+    """Tests that tickets without compact IDs are stored too."""
+    store = TicketColumnStore()
+    assert store.save("1d89ab4d-7bd8-4a76-8a7e-7a8e398260a0", Size.SMALL, None)
+    assert store.get("1d89ab4d-7bd8-4a76-8a7e-7a8e398260a0")["slot_number"] is None
+    assert store.retrieve("1d89ab4d-7bd8-4a76-8a7e-7a8e398260a0", Size.SMALL)
+
+
+# --- Tests for CachedTicketStorage ---
+
+
+def test_cache_is_loaded_and_kept_in_step(tmp_path: Path):
+    """Tests that the cache mirrors the storage across a restart."""
+    storage = TicketSqliteStorage(tmp_path / "tickets.db")
+    parking = CarParking(get_parking_slots(2, 0, 0), CachedTicketStorage(storage))
+    kept, _ = parking.park_car(Size.SMALL)
+    returned, _ = parking.park_car(Size.SMALL)
+    parking.return_car(returned)
+    storage.close()
+
+    cached = CachedTicketStorage(TicketSqliteStorage(tmp_path / "tickets.db"))
+    assert cached.get(kept)["slot_number"] == 0
+    assert cached.get(returned) is None
+    assert [r["ticket_id"] for r in cached.records()] == [kept]
+    cached.close()
+
+
+def test_build_parking_with_ticket_cache(tmp_path: Path):
+    """Tests that the ticket_cache option puts the cache in front of the backend."""
+    from src.config import build_parking, load_config
+
+    config = load_config(
+        env={"VALET_TICKET_CACHE": "true"},
+        storage_backend="sqlite",
+        storage_path=str(tmp_path / "tickets.db"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+    )
+    parking, _, storage = build_parking(config)
+
+    assert isinstance(storage, CachedTicketStorage)
+    ticket_id, _ = parking.park_car(Size.LARGE)
+    assert storage.get(ticket_id)["slot_size"] == Size.LARGE
+    storage.close()
@@ -0,0 +1,179 @@
+import random
+
+import pytest
+
+from src.config import build_parking, load_config
+from src.exceptions import ParkingInitError
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking
+from src.ticket_history import HistoryTicketStorage, TicketHistory
+from src.ticket_ids import TicketIdGenerator
+from src.ticket_storage import TicketJournalFileStorage
+
+DAY = 86400.0
+T0 = 1_700_006_400.0  # midnight UTC
+
+
+def random_stays(count: int, seed: int = 7) -> list[tuple[Size, float, float]]:
+    """Returns `count` random stays over three days, ordered by return time."""
+    rng = random.Random(seed)
+    stays = []
+    for _ in range(count):
+        parked = T0 + rng.randrange(0, 3 * 86400 * 2) / 2
+        stays.append((Size(rng.randint(1, 3)), parked, parked + rng.randrange(1, 20000)))
+    return sorted(stays, key=lambda stay: stay[2])
+
+
+# --- Tests for TicketHistory ---
+
+
+def test_range_queries_across_partitions_and_reopen(tmp_path):
+    """Tests range queries over several partitions, before and after a reopen."""
+    history = TicketHistory(tmp_path)
+    ticket_id = TicketIdGenerator()(Size.MEDIUM)
+    history.add(ticket_id, Size.MEDIUM, 4, T0 - 600, T0 + 60)
+    history.add("legacy-ticket", Size.SMALL, None, T0 + DAY, T0 + DAY + 30)
+    history.add(ticket_id, Size.LARGE, 9, T0, T0 + 2 * DAY + 5)
+    history.close()
+
+    history = TicketHistory(tmp_path)
+    assert history.partitions() == [T0, T0 + DAY, T0 + 2 * DAY]
+    assert history.count(T0, T0 + 3 * DAY) == 3
+    assert history.count(T0 + 61, T0 + 2 * DAY + 5) == 1
+    first, second = history.stays(T0, T0 + 2 * DAY)
+    assert first.ticket_id == ticket_id
+    assert (first.slot_size, first.slot_number, first.dwell) == (Size.MEDIUM, 4, 660)
+    assert second.ticket_id is None and second.slot_number is None
+
+    # New stays land in the partition of their return time.
+    history.add(ticket_id, Size.SMALL, 1, T0, T0 + 120)
+    assert [stay.returned_at for stay in history.stays(T0, T0 + DAY)] == [T0 + 60, T0 + 120]
+
+
+def test_dwell_percentiles_match_sorted_dwells(tmp_path):
+    """Tests that dwell percentiles match those of the sorted dwells."""
+    history = TicketHistory(tmp_path, partition_hours=6)
+    stays = random_stays(3000)
+    for size, parked, returned in stays:
+        history.add("", size, None, parked, returned)
+    start, end = T0 + 5000, T0 + 2 * DAY  # partial first partition
+    summary = history.dwell_percentiles(start, end, percentiles=(50, 99))
+    for size in Size:
+        dwells = sorted(r - p for s, p, r in stays if s == size and start <= r < end)
+        assert summary[size] == {
+            "count": len(dwells),
+            "p50": dwells[len(dwells) // 2],
+            "p99": dwells[int(len(dwells) * 0.99)],
+        }
+    assert history.dwell_percentiles(T0 - DAY, T0) == {}
+
+
+def test_hourly_occupancy_matches_a_scan(tmp_path):
+    """Tests that hourly occupancy matches a scan of every stay."""
+    history = TicketHistory(tmp_path, partition_hours=12)
+    stays = random_stays(2000)
+    for size, parked, returned in stays:
+        history.add("", size, None, parked, returned)
+    start, end = T0 + DAY + 1800, T0 + 2 * DAY
+    occupancy = history.hourly_occupancy(start, end)
+
+    for size in Size:
+        own = [(p, r) for s, p, r in stays if s == size]
+        expected = []
+        for hour in range(24):
+            begin = start + hour * 3600
+            times = [begin] + [p for p, _ in own if begin < p < begin + 3600]
+            expected.append(max(sum(p <= t < r for p, r in own) for t in times))
+        assert occupancy[size] == expected
+
+
+def test_short_record_and_clock_going_back(tmp_path):
+    """Tests that a torn record is skipped and cut off, and late returns are kept."""
+    history = TicketHistory(tmp_path)
+    history.add("", Size.SMALL, 1, T0, T0 + 100)
+    history.add("", Size.SMALL, 2, T0, T0 + 50)
+    history.close()
+    partition = next(tmp_path.glob("*.history"))
+    with open(partition, "ab") as f:
+        f.write(b"\x01" * 7)
+
+    history = TicketHistory(tmp_path)
+    assert [stay.slot_number for stay in history.stays(T0, T0 + DAY)] == [2, 1]
+    # The torn record is cut off before new stays are appended.
+    history.add("", Size.SMALL, 3, T0, T0 + 200)
+    history.close()
+    history = TicketHistory(tmp_path)
+    assert [stay.slot_number for stay in history.stays(T0, T0 + DAY)] == [2, 1, 3]
+
+
+def test_occupancy_reads_later_partitions_only_for_long_stays(tmp_path):
+    """Tests that occupancy loads later partitions only when stays span them."""
+    history = TicketHistory(tmp_path)
+    history.add("", Size.SMALL, 1, T0 + 100, T0 + 200)
+    history.add("", Size.SMALL, 2, T0 + 150, T0 + 2 * DAY)  # returned on day 3
+    history.add("", Size.SMALL, 3, T0 + 3 * DAY, T0 + 3 * DAY + 60)
+    history.close()
+
+    history = TicketHistory(tmp_path)
+    assert history.hourly_occupancy(T0, T0 + 3600)[Size.SMALL] == [2]
+    assert sorted(history._loaded) == [T0, T0 + 2 * DAY]
+
+
+def test_partitions_must_be_an_hour_or_more(tmp_path):
+    """Tests that partitions shorter than an hour are refused."""
+    with pytest.raises(ParkingInitError, match="at least an hour"):
+        TicketHistory(tmp_path, partition_hours=0)
+
+
+# --- Tests for HistoryTicketStorage ---
+
+
+def test_returned_tickets_are_archived(tmp_path):
+    """Tests that returned tickets, single or batched, are archived once."""
+    journal = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    storage = HistoryTicketStorage(journal, TicketHistory(tmp_path / "history"))
+    parking = CarParking(get_parking_slots(2, 2, 2), storage)
+    ticket_id, _ = parking.park_car(Size.MEDIUM)
+    kept, _ = parking.park_car(Size.SMALL)
+    assert parking.return_car(ticket_id)
+    assert not parking.return_car(ticket_id)
+    assert parking.return_cars([kept])[0].error is None
+
+    stays = list(storage.history.stays(0, float("inf")))
+    assert [(stay.ticket_id, stay.slot_size) for stay in stays] == [
+        (ticket_id, Size.MEDIUM),
+        (kept, Size.SMALL),
+    ]
+    assert all(0 <= stay.dwell < 60 for stay in stays)
+    storage.close()
+
+
+def test_unarchivable_record_does_not_fail_the_return(tmp_path, caplog):
+    """Tests that a record that can't be archived is logged, not raised."""
+    journal = TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+    storage = HistoryTicketStorage(journal, TicketHistory(tmp_path / "history"))
+    journal.save("legacy", Size.SMALL)
+    del journal.get("legacy")["slot_number"]
+    journal.get("legacy")["date"] = "yesterday"
+    assert storage.retrieve("legacy", Size.SMALL)
+    assert journal.get("legacy") is None
+    assert "legacy was not archived" in caplog.text
+    storage.close()
+
+
+# --- Tests for build_parking ---
+
+
+def test_build_parking_with_history(tmp_path):
+    """Tests that a configured history path archives returns."""
+    config = load_config(
+        env={},
+        storage_path=str(tmp_path / "tickets.json"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        history_path=str(tmp_path / "history"),
+    )
+    parking, _, storage = build_parking(config)
+    ticket_id, _ = parking.park_car(Size.LARGE)
+    parking.return_car(ticket_id)
+    assert [stay.ticket_id for stay in storage.history.stays(0, float("inf"))] == [ticket_id]
+    storage.close()
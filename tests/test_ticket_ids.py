@@ -0,0 +1,120 @@
+import pytest
+
+from src.exceptions import InvalidTicketError, ParkingInitError
+from src.parking_slots import Size, get_parking_slots
+from src.parking_system import CarParking, ticket_shard
+from src.ticket_ids import (
+    TICKET_ID_LENGTH,
+    TicketIdGenerator,
+    encode_ticket_id,
+    parse_ticket_id,
+)
+from src.ticket_storage import TicketJsonFileStorage
+
+
+# --- Tests for the ticket ID format ---
+
+
+def test_ticket_id_round_trip():
+    """Tests that the size, shard and serial survive encoding."""
+    ticket_id = encode_ticket_id(Size.MEDIUM, 7, 123456789)
+
+    assert len(ticket_id) == TICKET_ID_LENGTH
+    assert parse_ticket_id(ticket_id) == (ticket_id, Size.MEDIUM, 7, 123456789)
+    assert parse_ticket_id(encode_ticket_id(Size.LARGE, None, 1)).shard is None
+
+
+def test_ticket_id_spelling_is_forgiving():
+    """Tests that case, dashes and look-alike letters give the canonical ID."""
+    ticket_id = encode_ticket_id(Size.SMALL, 0, 0x1011)
+    sloppy = " " + ticket_id.lower().replace("1", "l").replace("0", "O") + "\n"
+
+    assert parse_ticket_id(sloppy).ticket_id == ticket_id
+    assert parse_ticket_id(ticket_id[:6] + "-" + ticket_id[6:]).ticket_id == ticket_id
+
+
+@pytest.mark.parametrize(
+    "ticket_id",
+    [
+        "",
+        "1d89ab4d-7bd8-4a76-8a7e-7a8e398260a0",
+        "U" * TICKET_ID_LENGTH,
+        "1_1_1_1_1_1_1",
+        "٣" * TICKET_ID_LENGTH,
+        "Z" * TICKET_ID_LENGTH,
+    ],
+)
+def test_parse_rejects_malformed_ids(ticket_id: str):
+    """Tests that wrong lengths, characters and ranges are rejected."""
+    with pytest.raises(InvalidTicketError):
+        parse_ticket_id(ticket_id)
+
+
+def test_checksum_catches_typos():
+    """Tests that almost all one-character typos are rejected."""
+    ticket_id = encode_ticket_id(Size.LARGE, 3, 987654321)
+    typos = [
+        ticket_id[:i] + c + ticket_id[i + 1 :]
+        for i in range(TICKET_ID_LENGTH)
+        for c in "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+        if c != ticket_id[i]
+    ]
+    accepted = 0
+    for typo in typos:
+        try:
+            parse_ticket_id(typo)
+            accepted += 1
+        except InvalidTicketError:
+            pass
+    assert accepted / len(typos) < 0.01
+
+
+def test_generator_issues_unique_tagged_ids():
+    """Tests that one generator never repeats an ID and tags its shard."""
+    generate = TicketIdGenerator(5)
+    ticket_ids = {generate(Size.SMALL) for _ in range(10_000)}
+
+    assert len(ticket_ids) == 10_000
+    assert {ticket_shard(ticket_id) for ticket_id in ticket_ids} == {5}
+    with pytest.raises(ParkingInitError):
+        TicketIdGenerator(5000)
+
+
+# --- Tests for returns by ticket only ---
+
+
+@pytest.fixture
+def parking(tmp_path) -> CarParking:
+    return CarParking(
+        get_parking_slots(1, 1, 1), TicketJsonFileStorage(tmp_path / "tickets.json")
+    )
+
+
+def test_return_needs_only_the_ticket(parking: CarParking):
+    """Tests that the slot size is read from the ticket."""
+    ticket_id, slot_size = parking.park_car(Size.MEDIUM)
+
+    assert parse_ticket_id(ticket_id).slot_size == Size[slot_size]
+    assert parking.return_car(ticket_id.lower()) is True
+    assert parking.available_slots()[Size.MEDIUM] == 1
+
+
+def test_invalid_ticket_is_rejected_before_storage(parking: CarParking):
+    """Tests that a mistyped ticket never reaches the storage."""
+    ticket_id, _ = parking.park_car(Size.SMALL)
+    parking._storage = None  # any storage access would fail
+
+    assert parking.return_car(ticket_id[:-1]) is False
+    assert parking.return_car(ticket_id + "Q") is False
+
+
+def test_return_cars_with_bare_tickets(parking: CarParking):
+    """Tests bulk returns given ticket IDs only."""
+    first, _ = parking.park_car(Size.SMALL)
+    second, _ = parking.park_car(Size.LARGE)
+
+    results = parking.return_cars([first, "not-a-ticket", (second, None)])
+
+    assert [r.error is None for r in results] == [True, False, True]
+    assert results[1].error == "Ticket not-a-ticket is not valid"
+    assert dict(parking.available_slots()) == dict.fromkeys(Size, 1)
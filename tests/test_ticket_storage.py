@@ -0,0 +1,383 @@
+import fcntl
+import json
+import multiprocessing
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.exceptions import TicketStorageErrors
+from src.parking_slots import Size
+from src.ticket_ids import TicketIdGenerator, ticket_key
+from src.ticket_storage import (
+    TicketJsonFileStorage,
+    TicketJournalFileStorage,
+    TicketMmapStorage,
+    TicketSharedFileStorage,
+    TicketSqliteStorage,
+    save_ticket_id_to_storage,
+    retrieve_ticket_id_from_storage,
+)
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def journal_path(tmp_path: Path) -> Path:
+    """Returns a path for a fresh journal file."""
+    return tmp_path / "tickets.jsonl"
+
+
+# --- Tests for TicketJsonFileStorage ---
+
+
+def test_json_storage_builds_index_on_open(tmp_path: Path):
+    """Tests that tickets written by one instance are indexed by the next."""
+    jsonfile = tmp_path / "tickets.json"
+    storage = TicketJsonFileStorage(jsonfile)
+    assert storage.save("ticket-1", Size.SMALL) is True
+    assert storage.save("ticket-1", Size.SMALL) is False
+
+    reopened = TicketJsonFileStorage(jsonfile)
+    assert reopened.retrieve("ticket-1", Size.LARGE) is False
+    assert reopened.retrieve("ticket-1", Size.SMALL) is True
+    assert TicketJsonFileStorage(jsonfile).retrieve("ticket-1", Size.SMALL) is False
+
+
+def test_json_storage_retrieve_miss_skips_file_io(tmp_path: Path):
+    """Tests that an unknown ticket is rejected without touching the file."""
+    jsonfile = tmp_path / "tickets.json"
+    storage = TicketJsonFileStorage(jsonfile)
+    jsonfile.unlink()
+    assert storage.retrieve("missing", Size.SMALL) is False
+    assert not jsonfile.exists()
+
+
+def test_json_storage_batch_writes_once(tmp_path: Path):
+    """Tests that a batch writes the file once, when it ends."""
+    jsonfile = tmp_path / "tickets.json"
+    storage = TicketJsonFileStorage(jsonfile)
+    with patch.object(storage, "_write_parking_data") as mock_write:
+        with storage.batch():
+            storage.save("ticket-1", Size.SMALL)
+            storage.save("ticket-2", Size.SMALL)
+            storage.retrieve("ticket-1", Size.SMALL)
+            assert mock_write.call_count == 0
+    mock_write.assert_called_once()
+
+
+def test_json_storage_write_leaves_file_intact_on_error(tmp_path: Path):
+    """Tests that a failed write keeps the previous file and no temp files."""
+    jsonfile = tmp_path / "tickets.json"
+    storage = TicketJsonFileStorage(jsonfile)
+    storage.save("ticket-1", Size.SMALL)
+    with patch("src.ticket_storage.json.dumps", side_effect=OSError):
+        assert storage.save("ticket-2", Size.SMALL) is False
+    assert [r["ticket_id"] for r in json.loads(jsonfile.read_text())] == ["ticket-1"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tickets.json"]
+
+
+# --- Tests for TicketSharedFileStorage ---
+
+
+def _gate(jsonfile: Path, gate: int, count: int) -> None:
+    """Parks and returns cars through its own storage, like a gate process."""
+    storage = TicketSharedFileStorage(jsonfile)
+    for number in range(count):
+        assert storage.save(f"g{gate}-{number}", Size.SMALL, gate * count + number)
+        if number % 2:
+            assert storage.retrieve(f"g{gate}-{number - 1}", Size.SMALL)
+    storage.close()
+
+
+def test_shared_storage_keeps_every_ticket_across_processes(tmp_path: Path):
+    """Tests that concurrent gate processes don't lose each other's tickets."""
+    jsonfile = tmp_path / "tickets.json"
+    TicketSharedFileStorage(jsonfile).close()
+    gates = [
+        multiprocessing.Process(target=_gate, args=(jsonfile, gate, 40))
+        for gate in range(6)
+    ]
+    for gate in gates:
+        gate.start()
+    for gate in gates:
+        gate.join()
+    assert all(gate.exitcode == 0 for gate in gates)
+
+    expected = {f"g{gate}-{n}" for gate in range(6) for n in range(1, 40, 2)}
+    assert {r["ticket_id"] for r in json.loads(jsonfile.read_text())} == expected
+    storage = TicketSharedFileStorage(jsonfile)
+    assert {r["ticket_id"] for r in storage.records()} == expected
+    storage.close()
+
+
+def test_shared_storage_sees_other_writers(tmp_path: Path):
+    """Tests that each instance reloads tickets written by another one."""
+    jsonfile = tmp_path / "tickets.json"
+    first, second = TicketSharedFileStorage(jsonfile), TicketSharedFileStorage(jsonfile)
+    assert first.save("ticket-1", Size.SMALL)
+    assert second.get("ticket-1")["slot_size"] == Size.SMALL
+    assert second.retrieve("ticket-1", Size.SMALL)
+    assert first.get("ticket-1") is None
+    assert first.retrieve("ticket-1", Size.SMALL) is False
+    first.close()
+    second.close()
+
+
+def test_shared_storage_gives_up_on_busy_lock(tmp_path: Path):
+    """Tests that a held lock makes writes fail after the timeout."""
+    jsonfile = tmp_path / "tickets.json"
+    storage = TicketSharedFileStorage(jsonfile, timeout=0.05)
+    with open(tmp_path / "tickets.json.lock", "rb") as holder:
+        fcntl.flock(holder, fcntl.LOCK_EX)
+        assert storage.save("ticket-1", Size.SMALL) is False
+        assert storage.save_many([("ticket-2", Size.SMALL, None)]) == [False]
+    assert storage.save("ticket-1", Size.SMALL)
+    storage.close()
+
+
+# --- Tests for TicketJournalFileStorage ---
+
+
+def test_journal_save_and_retrieve(journal_path: Path):
+    """Tests that a saved ticket can be retrieved exactly once."""
+    storage = TicketJournalFileStorage(journal_path)
+    assert storage.save("ticket-1", Size.SMALL) is True
+    assert storage.retrieve("ticket-1", Size.MEDIUM) is False
+    assert storage.retrieve("ticket-1", Size.SMALL) is True
+    assert storage.retrieve("ticket-1", Size.SMALL) is False
+    storage.close()
+
+
+def test_journal_appends_one_line_per_operation(journal_path: Path):
+    """Tests that park and return each append a single record."""
+    storage = TicketJournalFileStorage(journal_path)
+    storage.save("ticket-1", Size.SMALL)
+    storage.save("ticket-2", Size.LARGE)
+    storage.retrieve("ticket-1", Size.SMALL)
+    storage.close()
+    assert len(journal_path.read_text().splitlines()) == 3
+
+
+def test_journal_batch_defers_writes(journal_path: Path):
+    """Tests that records of a batch reach the file when the batch ends."""
+    storage = TicketJournalFileStorage(journal_path)
+    with storage.batch():
+        for i in range(10):
+            storage.save(f"ticket-{i}", Size.SMALL)
+        assert journal_path.stat().st_size == 0
+    assert len(journal_path.read_text().splitlines()) == 10
+    storage.close()
+
+
+def test_journal_replays_on_open(journal_path: Path):
+    """Tests that active tickets survive reopening the journal."""
+    storage = TicketJournalFileStorage(journal_path)
+    storage.save("ticket-1", Size.SMALL)
+    storage.save("ticket-2", Size.LARGE)
+    storage.retrieve("ticket-1", Size.SMALL)
+    storage.close()
+
+    reopened = TicketJournalFileStorage(journal_path)
+    assert reopened.retrieve("ticket-1", Size.SMALL) is False
+    assert reopened.retrieve("ticket-2", Size.LARGE) is True
+    reopened.close()
+
+
+def test_journal_ignores_torn_tail(journal_path: Path):
+    """Tests that a partial record left by a crash is dropped on open."""
+    storage = TicketJournalFileStorage(journal_path)
+    storage.save("ticket-1", Size.SMALL)
+    storage.close()
+    with open(journal_path, "a") as f:
+        f.write('{"op":"save","ticket')
+
+    reopened = TicketJournalFileStorage(journal_path)
+    assert reopened.save("ticket-2", Size.MEDIUM) is True
+    reopened.close()
+
+    reopened = TicketJournalFileStorage(journal_path)
+    assert reopened.retrieve("ticket-1", Size.SMALL) is True
+    assert reopened.retrieve("ticket-2", Size.MEDIUM) is True
+    reopened.close()
+
+
+def test_journal_compaction_keeps_only_active_tickets(journal_path: Path):
+    """Tests that compaction drops retrieved tickets from the log."""
+    storage = TicketJournalFileStorage(
+        journal_path, compact_ratio=0.5, compact_min_records=10
+    )
+    for i in range(20):
+        storage.save(f"ticket-{i}", Size.SMALL)
+    for i in range(15):
+        storage.retrieve(f"ticket-{i}", Size.SMALL)
+    storage.close()
+
+    assert len(journal_path.read_text().splitlines()) < 35
+    reopened = TicketJournalFileStorage(journal_path)
+    for i in range(15, 20):
+        assert reopened.retrieve(f"ticket-{i}", Size.SMALL) is True
+    reopened.close()
+
+
+def test_storage_helpers_with_journal(journal_path: Path):
+    """Tests that the storage helpers work with the journal backend."""
+    storage = TicketJournalFileStorage(journal_path)
+    assert save_ticket_id_to_storage(storage, "ticket-1", Size.LARGE) is True
+    assert retrieve_ticket_id_from_storage(storage, "ticket-1", Size.LARGE) is True
+    assert retrieve_ticket_id_from_storage(storage, "ticket-1", Size.LARGE) is False
+    storage.close()
+
+
+# --- Tests for TicketSqliteStorage ---
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path: Path):
+    """Returns an SQLite storage in a temporary database."""
+    storage = TicketSqliteStorage(tmp_path / "tickets.db")
+    yield storage
+    storage.close()
+
+
+def test_sqlite_uses_wal_journal(sqlite_storage: TicketSqliteStorage):
+    """Tests that the database is opened in WAL mode."""
+    mode = sqlite_storage._connection.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_sqlite_save_and_retrieve(sqlite_storage: TicketSqliteStorage):
+    """Tests that a saved ticket can be retrieved exactly once."""
+    assert sqlite_storage.save("ticket-1", Size.MEDIUM) is True
+    assert sqlite_storage.save("ticket-1", Size.MEDIUM) is False
+    assert sqlite_storage.retrieve("ticket-1", Size.SMALL) is False
+    assert sqlite_storage.retrieve("ticket-1", Size.MEDIUM) is True
+    assert sqlite_storage.retrieve("ticket-1", Size.MEDIUM) is False
+
+
+def test_sqlite_batch_commits(sqlite_storage: TicketSqliteStorage, tmp_path: Path):
+    """Tests that a batch is visible to other connections once committed."""
+    with sqlite_storage.batch() as batch:
+        for i in range(10):
+            batch.save(f"ticket-{i}", Size.SMALL)
+
+    other = TicketSqliteStorage(tmp_path / "tickets.db")
+    assert other.retrieve("ticket-9", Size.SMALL) is True
+    other.close()
+
+
+def test_sqlite_batch_rolls_back_on_error(sqlite_storage: TicketSqliteStorage):
+    """Tests that a failing batch leaves no tickets behind."""
+    with pytest.raises(RuntimeError):
+        with sqlite_storage.batch() as batch:
+            batch.save("ticket-1", Size.SMALL)
+            raise RuntimeError
+    assert sqlite_storage.retrieve("ticket-1", Size.SMALL) is False
+
+
+def test_storage_helpers_with_sqlite(sqlite_storage: TicketSqliteStorage):
+    """Tests that the storage helpers work with the SQLite backend."""
+    assert save_ticket_id_to_storage(sqlite_storage, "ticket-1", Size.LARGE) is True
+    assert (
+        retrieve_ticket_id_from_storage(sqlite_storage, "ticket-1", Size.LARGE)
+        is True
+    )
+
+
+# --- Tests for TicketMmapStorage ---
+
+
+@pytest.fixture
+def mmap_path(tmp_path: Path) -> Path:
+    """Returns a path for a fresh memory-mapped ticket file."""
+    return tmp_path / "tickets.bin"
+
+
+def test_mmap_save_retrieve_and_reopen(mmap_path: Path):
+    """Tests that tickets survive closing and reopening the file."""
+    generate = TicketIdGenerator()
+    kept, returned = generate(Size.SMALL), generate(Size.LARGE)
+    storage = TicketMmapStorage(mmap_path)
+    assert storage.save(kept, Size.SMALL, 3) is True
+    assert storage.save(kept, Size.SMALL, 3) is False
+    assert storage.save(returned, Size.LARGE) is True
+    assert storage.retrieve(returned, Size.SMALL) is False
+    assert storage.retrieve(returned, Size.LARGE) is True
+    storage.close()
+
+    reopened = TicketMmapStorage(mmap_path)
+    assert reopened.get(kept)["slot_number"] == 3
+    assert reopened.get(returned) is None
+    assert [r["ticket_id"] for r in reopened.records()] == [kept]
+    reopened.close()
+
+
+def test_mmap_retrieve_writes_tombstone_in_place(mmap_path: Path):
+    """Tests that a retrieve flips one state byte and keeps the file size."""
+    ticket_id = TicketIdGenerator()(Size.MEDIUM)
+    storage = TicketMmapStorage(mmap_path)
+    storage.save(ticket_id, Size.MEDIUM)
+    storage.close()
+    before = mmap_path.read_bytes()
+
+    storage = TicketMmapStorage(mmap_path)
+    storage.retrieve(ticket_id, Size.MEDIUM)
+    storage.close()
+    after = mmap_path.read_bytes()
+
+    changed = [i for i, (a, b) in enumerate(zip(before, after)) if a != b]
+    assert len(before) == len(after)
+    # One state byte in the record, plus the live/tombstone counters.
+    assert len([i for i in changed if i >= TicketMmapStorage._HEADER_SIZE]) == 1
+
+
+def test_mmap_grows_and_reuses_tombstones(mmap_path: Path):
+    """Tests lookups across table growth and tombstone reuse."""
+    generate = TicketIdGenerator()
+    storage = TicketMmapStorage(mmap_path, initial_capacity=8)
+    active = [generate(Size.SMALL) for _ in range(100)]
+    for number, ticket_id in enumerate(active):
+        assert storage.save(ticket_id, Size.SMALL, number)
+    for ticket_id in active[:50]:
+        assert storage.retrieve(ticket_id, Size.SMALL)
+    for _ in range(200):
+        ticket_id = generate(Size.SMALL)
+        assert storage.save(ticket_id, Size.SMALL)
+        assert storage.retrieve(ticket_id, Size.SMALL)
+
+    assert storage._capacity >= 128
+    assert all(storage.get(t)["slot_number"] == n for n, t in enumerate(active) if n >= 50)
+    assert len(list(storage.records())) == 50
+    storage.close()
+
+
+def test_mmap_fsync_flushes_records_at_the_end_of_the_file(mmap_path: Path):
+    """Tests that flushing the last page never runs past the mapping."""
+    generate = TicketIdGenerator()
+    storage = TicketMmapStorage(mmap_path, initial_capacity=1024, fsync=True)
+    mask = storage._capacity - 1
+    # A ticket hashed to the last slot is written in the file's partial last page.
+    ticket_id = next(
+        ticket_id
+        for ticket_id in iter(lambda: generate(Size.MEDIUM), None)
+        if (ticket_key(ticket_id) ^ ticket_key(ticket_id) >> 32) & mask == mask
+    )
+    assert storage.save(ticket_id, Size.MEDIUM, 7)
+    assert storage.retrieve(ticket_id, Size.MEDIUM)
+    storage.close()
+
+
+def test_mmap_rejects_other_files(tmp_path: Path):
+    """Tests that a file in another format is not opened as a ticket table."""
+    path = tmp_path / "tickets.json"
+    path.write_text("[]")
+    with pytest.raises(TicketStorageErrors):
+        TicketMmapStorage(path)
+
+
+def test_mmap_only_stores_compact_ids(mmap_path: Path):
+    """Tests that IDs without a ticket key are refused."""
+    storage = TicketMmapStorage(mmap_path)
+    assert storage.save("ticket-1", Size.SMALL) is False
+    assert storage.get("ticket-1") is None
+    storage.close()
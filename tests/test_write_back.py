@@ -0,0 +1,160 @@
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.config import build_parking, load_config
+from src.exceptions import SaveStorageError
+from src.metrics import ParkingMetrics
+from src.parking_slots import Size
+from src.ticket_storage import TicketJournalFileStorage
+from src.write_back import WriteBackTicketStorage
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def journal(tmp_path: Path) -> TicketJournalFileStorage:
+    """Returns the journal storage that the write-back buffer wraps."""
+    return TicketJournalFileStorage(tmp_path / "tickets.jsonl")
+
+
+# --- Tests for WriteBackTicketStorage ---
+
+
+def test_operations_are_buffered_until_flush(journal):
+    """Tests that writes reach the storage only on flush or close."""
+    storage = WriteBackTicketStorage(journal, max_pending=10, max_delay=60)
+    assert storage.save("ticket-1", Size.SMALL, 3)
+    assert storage.save("ticket-2", Size.LARGE)
+    assert storage.get("ticket-1")["slot_number"] == 3
+    assert journal.get("ticket-1") is None
+
+    storage.flush()
+    assert journal.get("ticket-1")["slot_number"] == 3
+    assert storage.retrieve("ticket-1", Size.SMALL)
+    assert storage.get("ticket-1") is None
+    assert journal.get("ticket-1") is not None
+    storage.close()
+    assert journal.get("ticket-1") is None
+    assert journal.get("ticket-2") is not None
+
+
+def test_flushes_after_max_pending(journal):
+    """Tests that a flush starts once max_pending operations are buffered."""
+    storage = WriteBackTicketStorage(journal, max_pending=3, max_delay=60)
+    storage.save("ticket-1", Size.SMALL)
+    storage.save("ticket-2", Size.SMALL)
+    assert len(list(journal.records())) == 0
+    storage.save("ticket-3", Size.SMALL)
+    assert len(list(journal.records())) == 3
+    assert storage.flush_stats()["last_size"] == 3
+    storage.close()
+
+
+def test_flushes_after_max_delay(journal):
+    """Tests that the background flusher writes after max_delay."""
+    storage = WriteBackTicketStorage(journal, max_pending=100, max_delay=0.02)
+    storage.save("ticket-1", Size.SMALL)
+    deadline = time.monotonic() + 2
+    while journal.get("ticket-1") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.get("ticket-1") is not None
+    assert storage.flush_stats()["last_lag"] >= 0.02
+    storage.close()
+
+
+def test_save_and_retrieve_within_window_cancel_out(journal):
+    """Tests that a ticket saved and retrieved before a flush is never written."""
+    storage = WriteBackTicketStorage(journal, max_delay=60)
+    with patch.object(journal, "save_many") as save_many:
+        storage.save("ticket-1", Size.SMALL)
+        assert storage.retrieve("ticket-1", Size.SMALL)
+        storage.flush()
+    save_many.assert_not_called()
+    assert storage.flush_stats()["pending"] == 0
+    storage.close()
+
+
+def test_rejects_what_the_storage_would(journal):
+    """Tests that buffered writes are checked like the storage checks them."""
+    journal.save("ticket-1", Size.MEDIUM)
+    storage = WriteBackTicketStorage(journal, max_delay=60)
+    assert storage.save("ticket-1", Size.MEDIUM) is False
+    assert storage.retrieve("ticket-1", Size.SMALL) is False
+    assert storage.retrieve("missing", Size.SMALL) is False
+    assert storage.retrieve("ticket-1", Size.MEDIUM)
+    assert storage.retrieve("ticket-1", Size.MEDIUM) is False
+    storage.close()
+
+
+def test_lookups_are_cached(journal):
+    """Tests that lookups are served from an LRU cache of `cache_size` entries."""
+    journal.save("ticket-1", Size.SMALL)
+    journal.save("ticket-2", Size.SMALL)
+    storage = WriteBackTicketStorage(journal, max_delay=60, cache_size=1)
+    with patch.object(journal, "get", wraps=journal.get) as get:
+        storage.get("ticket-1")
+        storage.get("ticket-1")
+        assert get.call_count == 1
+        storage.get("ticket-2")  # evicts ticket-1
+        storage.get("ticket-1")
+        assert get.call_count == 3
+    storage.close()
+
+
+def test_failed_flush_keeps_operations(journal):
+    """Tests that a failed flush keeps its operations, in order, for the next one."""
+    storage = WriteBackTicketStorage(journal, max_delay=60)
+    storage.save("ticket-1", Size.SMALL)
+    storage.save("ticket-2", Size.SMALL)
+    with patch.object(journal, "save_many", side_effect=OSError("disk full")):
+        assert storage.flush() is False
+    assert storage.flush_stats()["pending"] == 2
+    # Newer operations are written after the ones that failed.
+    assert storage.retrieve("ticket-1", Size.SMALL)
+    storage.save("ticket-3", Size.MEDIUM)
+    assert storage.flush() is True
+    assert [record["ticket_id"] for record in journal.records()] == ["ticket-2", "ticket-3"]
+    assert storage.flush_stats()["failed"] == 2
+
+    storage.retrieve("ticket-2", Size.SMALL)
+    with patch.object(journal, "retrieve_many", side_effect=OSError("disk full")):
+        with pytest.raises(SaveStorageError):
+            storage.close()
+
+
+def test_flush_metrics(journal):
+    """Tests that flushes are reported to the metrics."""
+    metrics = ParkingMetrics()
+    storage = WriteBackTicketStorage(journal, max_delay=60, metrics=metrics)
+    storage.save("ticket-1", Size.SMALL)
+    storage.save("ticket-2", Size.SMALL)
+    storage.flush()
+    snapshot = metrics.snapshot()
+    assert snapshot["operations"]["storage_flush"]["ALL"]["success"] == 1
+    assert snapshot["operations"]["storage_flush_lag"]["ALL"]["count"] == 1
+    assert snapshot["totals"]["storage_flushed_operations"] == 2
+    assert "valet_storage_flushed_operations_total 2" in metrics.to_prometheus()
+    storage.close()
+
+
+# --- Tests for build_parking ---
+
+
+def test_build_parking_with_write_back(tmp_path: Path):
+    """Tests that VALET_WRITE_BACK_OPS wraps the storage in a write-back buffer."""
+    config = load_config(
+        env={"VALET_WRITE_BACK_OPS": "50"},
+        storage_backend="journal",
+        storage_path=str(tmp_path / "tickets.jsonl"),
+        snapshot_path=str(tmp_path / "slots.snapshot"),
+        snapshot_interval=0,
+    )
+    parking, _, storage = build_parking(config)
+    assert isinstance(storage, WriteBackTicketStorage)
+    ticket_id, _ = parking.park_car(Size.SMALL)
+    storage.close()
+    assert TicketJournalFileStorage(tmp_path / "tickets.jsonl").get(ticket_id)